@@ -0,0 +1,298 @@
+#!/usr/bin/env python
+#=========================================================================
+# run-simpoints.py
+#=========================================================================
+# Restore all SimPoint checkpoints of a workload in parallel and merge
+# their stats into one weighted result.
+#
+# The checkpoints are the cpt.simpoint_* directories written by
+# --take-simpoint-checkpoints. Every simpoint is restored in its own gem5
+# process with --restore-simpoint-checkpoint, up to --jobs at a time, and
+# optionally with a shorter detailed warmup (--warmup). A run only counts
+# if it completed its measured interval, i.e. printed "Done running
+# SimPoint" and dumped stats after the warmup dump. The stats of the
+# measured intervals (the last dump of every run) are then combined:
+#
+#   mean  = sum( w_i * x_i ) / sum( w_i )
+#   stdev = weighted standard deviation over the simpoints
+#   ci95  = 1.96 * stdev / sqrt( n_eff ),  n_eff = sum( w_i )^2 / sum( w_i^2 )
+#
+# The weighted means are written as <output>/stats.txt in the gem5 format,
+# so gem5_stats_to_dict.py and collect_gem5_stats.py read it like the
+# stats of a full run. <output>/simpoints.json has the per-simpoint runs,
+# the covered weight and the error bounds of every stat.
+#
+# Example:
+#
+#   ./run-simpoints.py -c m5out/cpts -o simpoints -j 16 --warmup 1000000 \
+#     -- configs/example/se.py --cpu-type=DerivO3CPU --caches \
+#        --restore-with-cpu=AtomicSimpleCPU -c <binary>
+#
+
+import os
+import re
+import sys
+import json
+import math
+import argparse
+import subprocess
+from multiprocessing.pool import ThreadPool
+
+#-------------------------------------------------------------------------
+# Script configs
+#-------------------------------------------------------------------------
+
+script_path = os.path.dirname(os.path.realpath(__file__))
+gem5_path   = os.path.abspath(os.path.join(script_path, '..'))
+
+# same pattern as findCptDir in configs/common/Simulation.py
+cpt_expr = re.compile( 'cpt\.simpoint_(\d+)_inst_(\d+)'
+                       '_weight_([\d\.e\-]+)_interval_(\d+)_warmup_(\d+)' )
+
+#-------------------------------------------------------------------------
+# find_simpoints
+#-------------------------------------------------------------------------
+# returns the simpoint checkpoints in the order --checkpoint-restore
+# numbers them (starting at 1)
+
+def find_simpoints( cpt_dir ):
+  cpts = sorted( d for d in os.listdir( cpt_dir ) if cpt_expr.match( d ) )
+
+  simpoints = []
+  for i, d in enumerate( cpts ):
+    m = cpt_expr.match( d )
+    simpoints.append( { 'restore'   : i + 1,
+                        'index'     : int( m.group(1) ),
+                        'start'     : int( m.group(2) ),
+                        'weight'    : float( m.group(3) ),
+                        'interval'  : int( m.group(4) ),
+                        'warmup'    : int( m.group(5) ),
+                        'checkpoint': d } )
+  return simpoints
+
+#-------------------------------------------------------------------------
+# read_last_dump
+#-------------------------------------------------------------------------
+# returns { stat : value } of the last stats dump in a stats file
+
+def read_last_dump( stats_file ):
+  stats = {}
+  with open( stats_file ) as f:
+    for line in f:
+      if line.startswith( '---------- Begin' ):
+        stats = {}
+        continue
+
+      l = line.split('#')[0].split()
+      if len(l) < 2:
+        continue
+
+      try:
+        value = float( l[1] )
+      except ValueError:
+        continue
+      if math.isnan( value ) or math.isinf( value ):
+        continue
+
+      stats[ l[0] ] = value
+
+  return stats
+
+#-------------------------------------------------------------------------
+# interval_completed
+#-------------------------------------------------------------------------
+# True if the run in outdir reached the end of its measured interval. A
+# restore that ends early (program exit, maxtick) also exits with 0, but
+# then its last dump holds the warmup stats.
+
+def interval_completed( outdir ):
+  simout     = os.path.join( outdir, 'simout' )
+  stats_file = os.path.join( outdir, 'stats.txt' )
+  if not os.path.isfile( simout ) or not os.path.isfile( stats_file ):
+    return False
+
+  with open( simout ) as f:
+    if 'Done running SimPoint' not in f.read():
+      return False
+
+  with open( stats_file ) as f:
+    dumps = sum( 1 for line in f if line.startswith( '---------- Begin' ) )
+  return dumps >= 2
+
+#-------------------------------------------------------------------------
+# run_simpoint
+#-------------------------------------------------------------------------
+
+def run_simpoint( args_and_simpoint ):
+  args, simpoint = args_and_simpoint
+
+  outdir = os.path.join( args.output, 'simpoint_%02d' % simpoint['index'] )
+  simpoint['outdir'] = outdir
+
+  if args.reuse and interval_completed( outdir ):
+    simpoint['status'] = 'reused'
+    return simpoint
+
+  if not os.path.isdir( outdir ):
+    os.makedirs( outdir )
+
+  cmd = [ args.gem5_bin,
+          '--outdir=' + outdir,
+          '--redirect-stdout',
+          '--redirect-stderr',
+          '--listener-mode=off' ] + args.config + \
+        [ '--checkpoint-dir=' + args.cpt_dir,
+          '--restore-simpoint-checkpoint',
+          '--checkpoint-restore=%d' % simpoint['restore'] ]
+  if args.warmup is not None:
+    cmd += [ '--simpoint-warmup=%d' % min( args.warmup, simpoint['warmup'] ) ]
+
+  if args.verbose:
+    print ' '.join( cmd )
+
+  if args.dry:
+    simpoint['status'] = 'dry'
+    return simpoint
+
+  returncode = subprocess.call( cmd )
+  if returncode != 0:
+    simpoint['status'] = 'failed (%d)' % returncode
+  elif not interval_completed( outdir ):
+    simpoint['status'] = 'failed (interval not completed)'
+  else:
+    simpoint['status'] = 'done'
+  return simpoint
+
+#-------------------------------------------------------------------------
+# merge_stats
+#-------------------------------------------------------------------------
+
+def merge_stats( simpoints ):
+  runs = [ ( s['weight'], read_last_dump( os.path.join( s['outdir'],
+                                                        'stats.txt' ) ) )
+           for s in simpoints ]
+  runs = [ ( w, stats ) for ( w, stats ) in runs if stats ]
+
+  total = sum( w for ( w, _ ) in runs )
+  if total <= 0:
+    return {}, 0.0
+
+  names = set()
+  for ( _, stats ) in runs:
+    names.update( stats.keys() )
+
+  merged = {}
+  for name in names:
+    samples = [ ( w, stats[name] ) for ( w, stats ) in runs
+                if name in stats ]
+    weight = sum( w for ( w, _ ) in samples )
+    if weight <= 0:
+      continue
+
+    mean = sum( w * x for ( w, x ) in samples ) / weight
+    var  = sum( w * ( x - mean ) ** 2 for ( w, x ) in samples ) / weight
+    n_eff = weight ** 2 / sum( w ** 2 for ( w, _ ) in samples )
+
+    merged[name] = { 'mean'     : mean,
+                     'stdev'    : math.sqrt( var ),
+                     'ci95'     : 1.96 * math.sqrt( var / n_eff ),
+                     'simpoints': len( samples ) }
+
+  return merged, total
+
+#-------------------------------------------------------------------------
+# write_results
+#-------------------------------------------------------------------------
+
+def write_results( output, simpoints, merged, weight ):
+  with open( os.path.join( output, 'stats.txt' ), 'w' ) as f:
+    f.write( '\n---------- Begin Simulation Statistics ----------\n' )
+    for name in sorted( merged ):
+      s = merged[name]
+      f.write( '%-60s %20.6f  # weighted over %d simpoints, ci95 %g\n'
+               % ( name, s['mean'], s['simpoints'], s['ci95'] ) )
+    f.write( '\n---------- End Simulation Statistics   ----------\n' )
+
+  with open( os.path.join( output, 'simpoints.json' ), 'w' ) as f:
+    json.dump( { 'weight'   : weight,
+                 'simpoints': simpoints,
+                 'stats'    : merged }, f, indent = 2, sort_keys = True )
+
+#-------------------------------------------------------------------------
+# Command-line options
+#-------------------------------------------------------------------------
+
+parser = argparse.ArgumentParser(
+  description = 'Restore SimPoint checkpoints in parallel and merge stats' )
+parser.add_argument( '-c', '--cpt-dir', required = True,
+                     help = 'Directory with the cpt.simpoint_* checkpoints' )
+parser.add_argument( '-o', '--output', default = 'simpoints',
+                     help = 'Output directory' )
+parser.add_argument( '-j', '--jobs', type = int, default = 1,
+                     help = 'Simpoints restored in parallel' )
+parser.add_argument( '-w', '--warmup', type = int, default = None,
+                     help = 'Detailed warmup instructions per simpoint, '
+                            'needs --restore-with-cpu '
+                            '(default: the warmup of the checkpoints)' )
+parser.add_argument( '--gem5-bin',
+                     default = os.path.join( gem5_path,
+                                             'build/RISCV/gem5.opt' ),
+                     help = 'gem5 binary' )
+parser.add_argument( '--reuse', action = 'store_true',
+                     help = 'Do not rerun simpoints that completed' )
+parser.add_argument( '-v', '--verbose', action = 'store_true',
+                     help = 'Verbose mode' )
+parser.add_argument( '-d', '--dry', action = 'store_true',
+                     help = 'Dry run' )
+parser.add_argument( 'config', nargs = argparse.REMAINDER,
+                     help = 'Config script and its options, after --' )
+
+#-------------------------------------------------------------------------
+# Main script
+#-------------------------------------------------------------------------
+
+if __name__ == '__main__':
+  args = parser.parse_args()
+
+  if args.config and args.config[0] == '--':
+    args.config = args.config[1:]
+  if not args.config:
+    parser.error( 'no config script given' )
+  # the shortened warmup runs on the restore cpu, gem5 rejects it without
+  if args.warmup is not None and \
+     not any( o.startswith( '--restore-with-cpu' ) for o in args.config ):
+    parser.error( '--warmup needs --restore-with-cpu in the config options' )
+
+  args.cpt_dir = os.path.abspath( args.cpt_dir )
+  args.output  = os.path.abspath( args.output )
+
+  simpoints = find_simpoints( args.cpt_dir )
+  if not simpoints:
+    print "No SimPoint checkpoints in " + args.cpt_dir
+    exit(1)
+
+  print "Restoring %d simpoints, %d at a time" % ( len( simpoints ),
+                                                   args.jobs )
+
+  pool = ThreadPool( args.jobs )
+  simpoints = pool.map( run_simpoint, [ ( args, s ) for s in simpoints ] )
+  pool.close()
+  pool.join()
+
+  if args.dry:
+    exit(0)
+
+  failed = [ s for s in simpoints if s['status'].startswith( 'failed' ) ]
+  for s in failed:
+    print "Simpoint %d %s, see %s" % ( s['index'], s['status'], s['outdir'] )
+
+  ok = [ s for s in simpoints if s not in failed ]
+  merged, weight = merge_stats( ok )
+  write_results( args.output, simpoints, merged, weight )
+
+  print "Merged %d of %d simpoints covering %.1f%% of the weight into %s" \
+        % ( len( ok ), len( simpoints ), 100.0 * weight,
+            os.path.join( args.output, 'stats.txt' ) )
+
+  if failed:
+    exit(1)
@@ -207,6 +207,11 @@ assert(np == num_tiny_cpus + num_big_cpus)
 warmup_cpu_list = None
 main_cpu_list = None
 cooldown_cpu_list = None
+sample_cpu_list = None
+
+# Sampling switches CPUs at the timing region like fast-forward does
+if options.brg_sampling:
+  options.brg_fast_forward = True
 
 main_switched_out = False
 
@@ -396,6 +401,10 @@ if options.brg_fast_forward:
   switch_cooldown_cpu_pairs = [ ( main_cpu_list[i], cooldown_cpu_list[i] ) \
                                         for i in xrange(np) ]
 
+  if options.brg_sampling:
+    sample_cpu_list = Simulation.makeSamplingCpus(options, main_cpu_list)
+    system.sample_cpu = sample_cpu_list
+
 #------------------------------------------------------------------------------
 # Instantiate all m5 objects
 #------------------------------------------------------------------------------
@@ -420,7 +429,16 @@ def checkExitEvent(exit_event):
               (m5.curTick(), exit_event.getCause(), exit_event.getCode()))
     sys.exit(exit_event.getCode())
 
-if options.brg_fast_forward:
+if options.brg_sampling:
+  exit_event, _ = Simulation.runBrgSampling(options, system, warmup_cpu_list,
+                                            sample_cpu_list, main_cpu_list,
+                                            maxtick)
+  checkExitEvent(exit_event)
+
+  # same as --brg-fast-forward below
+  if exit_event.getCause() == "switchcpu":
+    warn("Cooldown phase that may contain verification code is off\n")
+elif options.brg_fast_forward:
   print("\n\n----- Entering warmup simulation -----\n")
   exit_event = m5.simulate(maxtick)
   print("\n\n----- Exiting warmup simulation @ tick %i because %s -----\n\n" %\
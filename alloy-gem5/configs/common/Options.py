@@ -261,6 +261,10 @@ def addCommonOptions(parser):
     parser.add_option("--restore-simpoint-checkpoint", action="store_true",
         help="restore from a simpoint checkpoint taken with " +
              "--take-simpoint-checkpoints")
+    parser.add_option("--simpoint-warmup", type="int", default=None,
+        help="detailed warmup in instructions before a restored simpoint, "
+             "at most the warmup of its checkpoint (default: all of it), "
+             "requires --restore-with-cpu")
 
     # Checkpointing options
     ###Note that performing checkpointing via python script files will override
@@ -284,6 +288,14 @@ def addCommonOptions(parser):
     parser.add_option("--restore-with-cpu", action="store", type="choice",
                       default="AtomicSimpleCPU", choices=CpuConfig.cpu_names(),
                       help = "cpu type for restoring from a checkpoint")
+    parser.add_option("--shared-memory-image", action="store_true",
+                      help="restore memory by mapping an uncompressed image "
+                           "copy-on-write, shared by all restores of the "
+                           "checkpoint")
+    parser.add_option("--memory-image-dir", action="store", type="string",
+                      default="",
+                      help="directory of the uncompressed memory images "
+                           "(default: the checkpoint directory)")
 
 
     # CPU Switching - default switch model goes from a checkpoint
@@ -410,6 +422,26 @@ def addBRGOptions(parser):
                       help="Skip cooldown phase (valid only if \
                             brg-fast-forward is set)")
 
+    # SMARTS-style sampling of the timing region (implies fast-forward)
+    parser.add_option('--brg-sampling', action='store_true',
+                      help="Sample the timing region periodically instead \
+                            of simulating all of it in detail")
+    parser.add_option('--brg-sample-period', type='int', default=1000000,
+                      help="Cycles between the starts of two samples")
+    parser.add_option('--brg-sample-warmup', type='int', default=2000,
+                      help="Cycles of detailed warmup before a sample")
+    parser.add_option('--brg-sample-window', type='int', default=10000,
+                      help="Cycles measured in detail per sample")
+    parser.add_option('--brg-sample-warm-cpu-type', type='choice',
+                      default='TimingSimpleCPU',
+                      choices=CpuConfig.cpu_names(),
+                      help="CPU keeping the caches warm between samples")
+    parser.add_option('--brg-sample-error', type='float', default=0.03,
+                      help="Stop once the 95%% confidence interval of the \
+                            IPC is within this relative error")
+    parser.add_option('--brg-sample-min', type='int', default=30,
+                      help="Minimum number of samples before stopping")
+
     # Enable CPU activity trace
     parser.add_option("--activity-trace", action="store_true",
                       help="Turn on activity trace")
@@ -181,6 +181,23 @@ def findCptDir(options, cptdir, testsys):
         if testsys.switch_cpus != None:
             testsys.switch_cpus[0].simpoint_start_insts = simpoint_start_insts
 
+            # Shorten the detailed warmup by running the start of the
+            # checkpointed warmup on the restore cpu
+            if options.simpoint_warmup != None:
+                if options.simpoint_warmup > warmup_length:
+                    fatal('--simpoint-warmup %d exceeds the warmup %d of '
+                          'the checkpoint', options.simpoint_warmup,
+                          warmup_length)
+                skip = warmup_length - options.simpoint_warmup
+                if skip > 0:
+                    testsys.cpu[0].max_insts_any_thread = skip
+                    testsys.switch_cpus[0].simpoint_start_insts = \
+                        [options.simpoint_warmup,
+                         options.simpoint_warmup + interval_length]
+        elif options.simpoint_warmup != None:
+            fatal('--simpoint-warmup needs --restore-with-cpu, the '
+                  'shortened warmup runs on the restore cpu')
+
         print("Resuming from SimPoint", end=' ')
         print("#%d, start_inst:%d, weight:%f, interval:%d, warmup:%d" %
             (index, start_inst, weight_inst, interval_length, warmup_length))
@@ -404,6 +421,8 @@ def restoreSimpointCheckpoint():
 
         if exit_cause == "simpoint starting point found":
             print("Done running SimPoint!")
+            # stats are not dumped at exit, dump the measured interval
+            m5.stats.dump()
             sys.exit(exit_event.getCode())
 
     print('Exiting @ tick %i because %s' % (m5.curTick(), exit_cause))
@@ -602,7 +621,8 @@ def run(options, root, testsys, cpu_class):
     if options.checkpoint_restore:
         cpt_starttick, checkpoint_dir = findCptDir(options, cptdir, testsys)
     root.apply_config(options.param)
-    m5.instantiate(checkpoint_dir)
+    m5.instantiate(checkpoint_dir, options.shared_memory_image,
+                   options.memory_image_dir)
 
     # Initialization is complete.  If we're not in control of simulation
     # (that is, if we're a slave simulator acting as a component in another
@@ -651,7 +671,10 @@ def run(options, root, testsys, cpu_class):
             print("Switch at instruction count:%s" %
                     str(testsys.cpu[0].max_insts_any_thread))
             exit_event = m5.simulate()
-        elif cpu_class and options.fast_forward:
+        elif cpu_class and (options.fast_forward or
+                            (options.restore_simpoint_checkpoint and
+                             options.simpoint_warmup != None and
+                             testsys.cpu[0].max_insts_any_thread)):
             print("Switch at instruction count:%s" %
                     str(testsys.cpu[0].max_insts_any_thread))
             exit_event = m5.simulate()
@@ -763,6 +786,134 @@ def copy_cpu_configs(old_cpu, new_cpu):
 #    new_cpu.dcache_port           = old_cpu.dcache_port
 #    new_cpu._cache_ports          = old_cpu._cache_ports
 
+#---------------------------------------------------------------------------
+# SMARTS-style sampling of the timing region (--brg-sampling)
+#---------------------------------------------------------------------------
+# Before the timing region the warmup CPUs run as with --brg-fast-forward.
+# Inside it the simulation alternates between warming CPUs, which are fast
+# but keep the caches and Ruby warm, and the main CPUs, which run a short
+# detailed warmup followed by a measured window. Every window is dumped as
+# its own stats block and its IPC is recorded in samples.json. Sampling
+# stops at the end of the timing region, or as soon as the confidence
+# interval of the IPC is within --brg-sample-error, in which case the rest
+# of the region runs on the warming CPUs. A window cut short by the end of
+# the region or of the run is dumped too, but marked as partial in
+# samples.json and left out of the IPC estimate. After the region the
+# cooldown CPUs finish the run as with --brg-fast-forward.
+
+def makeSamplingCpus(options, cpus):
+    """Returns switched out warming CPUs configured like cpus"""
+    WarmCPUClass, _ = getCPUClass(options.brg_sample_warm_cpu_type)
+    warm_cpus = [WarmCPUClass(switched_out=True, cpu_id=(i))
+                 for i in xrange(len(cpus))]
+    for i in xrange(len(cpus)):
+        copy_cpu_configs(cpus[i], warm_cpus[i])
+    return warm_cpus
+
+def sampleStats(ipcs, error):
+    """Returns the mean, the 95% confidence half-width and whether the
+    relative error is within error"""
+    n = len(ipcs)
+    mean = sum(ipcs) / n
+    if n < 2:
+        return mean, float('inf'), False
+    var = sum((x - mean) ** 2 for x in ipcs) / (n - 1)
+    half = 1.96 * (var / n) ** 0.5
+    return mean, half, mean > 0 and half / mean <= error
+
+def runBrgSampling(options, system, warmup_cpus, warm_cpus, main_cpus,
+                   maxtick):
+    """Runs the simulation with sampling, returns the last exit event and
+    the CPUs that were running when it happened"""
+    import json
+
+    limit = "simulate() limit reached"
+    np = len(main_cpus)
+    period = main_cpus[0].clk_domain.clock[0].getValue()
+    window = options.brg_sample_window * period
+    warmup = options.brg_sample_warmup * period
+    functional = max(options.brg_sample_period * period - window - warmup,
+                     period)
+
+    to_warm = [(warmup_cpus[i], warm_cpus[i]) for i in xrange(np)]
+    warm_to_main = [(warm_cpus[i], main_cpus[i]) for i in xrange(np)]
+    main_to_warm = [(main_cpus[i], warm_cpus[i]) for i in xrange(np)]
+
+    def simulate(ticks):
+        return m5.simulate(min(ticks, maxtick - m5.curTick()))
+
+    print(">>>>>>>>>>>> Entering warmup simulation")
+    exit_event = m5.simulate(maxtick)
+    print("<<<<<<<<<<<< Warmup simulation exited @ tick %i because %s" %
+                                  (m5.curTick(), exit_event.getCause()))
+    if exit_event.getCause() != "switchcpu":
+        return exit_event, warmup_cpus
+
+    print("Switching to warming CPUs, sampling every %d cycles" %
+          options.brg_sample_period)
+    m5.switchCpus(system, to_warm, verbose=False)
+    cpus = warm_cpus
+
+    samples = []
+    ipcs = []
+    while m5.curTick() < maxtick:
+        exit_event = simulate(functional)
+        if exit_event.getCause() != limit:
+            break
+
+        m5.switchCpus(system, warm_to_main, verbose=False)
+        cpus = main_cpus
+        exit_event = simulate(warmup)
+        if exit_event.getCause() != limit:
+            break
+
+        m5.stats.reset()
+        start_tick = m5.curTick()
+        start_insts = sum(cpu.totalInsts() for cpu in main_cpus)
+        exit_event = simulate(window)
+        m5.stats.dump()
+
+        cycles = (m5.curTick() - start_tick) / float(period)
+        insts = sum(cpu.totalInsts() for cpu in main_cpus) - start_insts
+        sample = { "tick": start_tick, "cycles": cycles, "insts": insts,
+                   "ipc": insts / cycles if cycles else 0.0 }
+        samples.append(sample)
+        if exit_event.getCause() != limit:
+            sample["partial"] = True
+            print("Partial sample @ tick %i: IPC %.4f over %d cycles" %
+                  (start_tick, sample["ipc"], cycles))
+            break
+        ipcs.append(sample["ipc"])
+
+        m5.switchCpus(system, main_to_warm, verbose=False)
+        cpus = warm_cpus
+
+        mean, half, done = sampleStats(ipcs, options.brg_sample_error)
+        print("Sample %d @ tick %i: IPC %.4f, mean %.4f +- %.4f" %
+              (len(ipcs), start_tick, ipcs[-1], mean, half))
+        if done and len(ipcs) >= options.brg_sample_min:
+            print("IPC within %.1f%% after %d samples, finishing the "
+                  "timing region on the warming CPUs" %
+                  (100 * options.brg_sample_error, len(ipcs)))
+            exit_event = m5.simulate(maxtick - m5.curTick())
+            break
+
+    print("<<<<<<<<<<<< Sampling exited @ tick %i because %s" %
+                                  (m5.curTick(), exit_event.getCause()))
+
+    summary = { "samples": samples }
+    if ipcs:
+        mean, half, done = sampleStats(ipcs, options.brg_sample_error)
+        summary.update({ "ipc_mean": mean, "ipc_ci95": half,
+                         "converged": done and
+                                      len(ipcs) >= options.brg_sample_min })
+        print("Sampled IPC %.4f +- %.4f (95%%) over %d samples" %
+              (mean, half, len(ipcs)))
+    with open(joinpath(m5.options.outdir, "samples.json"), "w") as f:
+        json.dump(summary, f, indent=2)
+
+    return exit_event, cpus
+
 def run_brg(options, root, testsys, CPUClass = None, CooldownCPUClass = None):
 
     assert(buildEnv['TARGET_ISA'] == 'riscv')
@@ -779,6 +930,9 @@ def run_brg(options, root, testsys, CPUClass = None, CooldownCPUClass = None):
     switch_warmup_cpu_lists = None
     switch_cooldown_cpu_lists = None
 
+    if options.brg_sampling:
+        options.brg_fast_forward = True
+
     if options.brg_fast_forward:
         main_cpus = [CPUClass(switched_out=True, cpu_id=(i))
                           for i in xrange(np)]
@@ -805,6 +959,12 @@ def run_brg(options, root, testsys, CPUClass = None, CooldownCPUClass = None):
         switch_cooldown_cpu_list = [(main_cpus[i], cooldown_cpus[i])
                                         for i in xrange(np)]
 
+    if options.brg_sampling:
+        sample_cpus = makeSamplingCpus(options, main_cpus)
+        for cpu in sample_cpus:
+            cpu.system = testsys
+        testsys.sample_cpu = sample_cpus
+
     checkpoint_dir = None
 
     # Instantiate all m5 objects
@@ -852,7 +1012,22 @@ def run_brg(options, root, testsys, CPUClass = None, CooldownCPUClass = None):
     # simulation
     #------------------------------------------------------------------------
 
-    if options.brg_fast_forward:
+    if options.brg_sampling:
+        exit_event, cpus = runBrgSampling(options, testsys, testsys.cpu,
+                                          sample_cpus, main_cpus, maxtick)
+
+        # the end of the timing region, run the cooldown like
+        # --brg-fast-forward
+        if exit_event.getCause() == "switchcpu":
+            print("Switching to cooldown CPUs.")
+            m5.switchCpus(testsys, [(cpus[i], cooldown_cpus[i])
+                                    for i in xrange(np)])
+
+            print(">>>>>>>>>>>> Entering cooldown simulation")
+            exit_event = m5.simulate(maxtick - m5.curTick())
+            print("<<<<<<<<<<<< Cooldown simulation exited @ tick %i "
+                  "because %s" % (m5.curTick(), exit_event.getCause()))
+    elif options.brg_fast_forward:
         print(">>>>>>>>>>>> Entering warmup simulation")
         exit_event = m5.simulate(maxtick)
         print("<<<<<<<<<<<< Warmup simulation exited @ tick %i because %s" %\
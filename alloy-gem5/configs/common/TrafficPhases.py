@@ -0,0 +1,199 @@
+#------------------------------------------------------------------------------
+# TrafficPhases
+#------------------------------------------------------------------------------
+# Phase tables for PyTrafficGen.startPhases.
+#
+# A phase table has one row per traffic generator phase and the columns of
+# the create methods of PyTrafficGen (see PyTrafficGen::PhaseColumn). It is
+# built once from NumPy columns and then executed entirely in C++, so long
+# phased studies do not call into Python on every phase transition:
+#
+#   phases = phase_table(type=np.tile(['LINEAR', 'RANDOM'], 500),
+#                        duration=10000000, end_addr=np.arange(1, 1001) << 16,
+#                        blocksize=64, min_period=1000, max_period=1000,
+#                        read_percent=np.linspace(0, 100, 1000))
+#   system.tgen.startPhases(phases)
+#
+# synthesize_trace() writes the same phases as a gem5 packet trace instead,
+# e.g. to replay them with a TraceGen or the TrafficGen state machine.
+
+from __future__ import print_function
+
+import os
+import subprocess
+import sys
+
+import numpy as np
+
+from m5.util import fatal
+
+# Codes of the type column, in PyTrafficGen::PhaseType order
+phase_types = ('IDLE', 'EXIT', 'LINEAR', 'RANDOM', 'DRAM', 'DRAM_ROT')
+
+# Columns in PyTrafficGen::PhaseColumn order
+phase_columns = ('type', 'duration', 'start_addr', 'end_addr', 'blocksize',
+                 'min_period', 'max_period', 'read_percent', 'data_limit',
+                 'num_seq_pkts', 'page_size', 'nbr_of_banks_DRAM',
+                 'nbr_of_banks_util', 'addr_mapping', 'nbr_of_ranks',
+                 'max_seq_count_per_rank')
+
+column_index = dict((name, i) for (i, name) in enumerate(phase_columns))
+
+#------------------------------------------------------------------------------
+# Building tables
+#------------------------------------------------------------------------------
+
+def type_codes(types):
+    """ Returns the type column for an array of type names or codes """
+    types = np.atleast_1d(types)
+    if types.dtype.kind in 'iu':
+        codes = types
+    else:
+        names = np.char.upper(types.astype(str))
+        codes = np.full(names.shape, -1, dtype=np.int64)
+        for (code, name) in enumerate(phase_types):
+            codes[names == name] = code
+    if np.any((codes < 0) | (codes >= len(phase_types))):
+        fatal("Unknown traffic phase types %s" %
+              sorted(set(types[(codes < 0) | (codes >= len(phase_types))])))
+    return codes
+
+def phase_table(type, **columns):
+    """ Returns the phase table of the given columns. Every column is an
+        array with one value per phase or a scalar used for all phases,
+        the columns which are not given are 0. type holds either the
+        names in phase_types or their codes.
+    """
+    unknown = set(columns) - set(phase_columns)
+    if unknown:
+        fatal("Unknown traffic phase columns %s" % sorted(unknown))
+
+    values = [ type_codes(type) ] + \
+             [ np.asarray(v) for v in columns.values() ]
+    num_phases = max(v.size for v in values)
+
+    table = np.zeros((num_phases, len(phase_columns)), dtype=np.uint64)
+    table[:, column_index['type']] = values[0]
+    for (name, value) in columns.items():
+        value = np.asarray(value)
+        if np.any(value < 0):
+            fatal("Traffic phase column %s has negative values" % name)
+        table[:, column_index[name]] = value
+
+    if np.any(table[:, column_index['read_percent']] > 100):
+        fatal("Traffic phases with a read percentage above 100")
+    return table
+
+def concat(*tables):
+    """ Returns the phases of the given tables, one after the other """
+    return np.concatenate(tables)
+
+def total_duration(table):
+    """ Returns the ticks until the first EXIT phase ends, or until the
+        last phase ends if there is none
+    """
+    durations = table[:, column_index['duration']]
+    exits = np.nonzero(table[:, column_index['type']] ==
+                       phase_types.index('EXIT'))[0]
+    if exits.size:
+        durations = durations[:exits[0] + 1]
+    return int(durations.sum())
+
+#------------------------------------------------------------------------------
+# Synthesizing traces
+#------------------------------------------------------------------------------
+
+def phase_packets(row, start_tick, rng):
+    """ Returns the ticks, addresses and read flags of the packets of a
+        LINEAR or RANDOM phase starting at start_tick, following LinearGen
+        and RandomGen
+    """
+    col = lambda name: int(row[column_index[name]])
+    duration = col('duration')
+    start_addr, end_addr = col('start_addr'), col('end_addr')
+    blocksize = col('blocksize')
+    min_period, max_period = col('min_period'), col('max_period')
+    data_limit = col('data_limit')
+
+    if blocksize == 0 or end_addr < start_addr:
+        fatal("Traffic phase with an empty address range or no blocksize")
+
+    # a packet at the start of the phase, then one every period
+    num = duration // max(min_period, 1) + 1
+    if data_limit:
+        num = min(num, -(-data_limit // blocksize))
+    periods = rng.randint(min_period, max_period + 1, num - 1) \
+              if max_period > min_period else \
+              np.full(num - 1, min_period, dtype=np.int64)
+    ticks = start_tick + np.concatenate(([0], np.cumsum(periods)))
+    ticks = ticks[ticks < start_tick + duration]
+    num = ticks.size
+
+    # LinearGen wraps after end_addr, RandomGen draws below end_addr
+    if row[column_index['type']] == phase_types.index('LINEAR'):
+        num_blocks = (end_addr - start_addr) // blocksize + 1
+        blocks = np.arange(num, dtype=np.int64) % num_blocks
+    else:
+        if end_addr == start_addr:
+            fatal("RANDOM traffic phase with an empty address range")
+        num_blocks = (end_addr - 1 - start_addr) // blocksize + 1
+        blocks = rng.randint(0, num_blocks, num)
+    addrs = start_addr + blocks * blocksize
+
+    reads = rng.randint(0, 100, num) < col('read_percent')
+    return ticks, addrs, reads
+
+def synthesize_trace(table, filename, seed=0, tick_freq=1000000000000):
+    """ Writes the phases of a table as a gem5 packet trace and returns
+        its duration in ticks. IDLE phases only advance time, an EXIT
+        phase ends the trace. DRAM phases depend on the memory
+        configuration and cannot be synthesized.
+    """
+    util_dir = os.path.join(os.path.dirname(os.path.realpath(__file__)),
+                            os.pardir, os.pardir, 'util')
+    if util_dir not in sys.path:
+        sys.path.append(util_dir)
+    import protolib
+    # make sure the proto definitions are up to date
+    subprocess.check_call(['make', '--quiet', '-C', util_dir,
+                           'packet_pb2.py'])
+    import packet_pb2
+
+    rng = np.random.RandomState(seed)
+    if filename.endswith('.gz'):
+        import gzip
+        proto_out = gzip.open(filename, 'wb')
+    else:
+        proto_out = open(filename, 'wb')
+
+    # magic number in 4-byte little endian, as in src/proto/protoio.cc
+    proto_out.write("gem5")
+    header = packet_pb2.PacketHeader()
+    header.obj_id = "Synthesized from %d traffic phases" % len(table)
+    header.tick_freq = tick_freq
+    protolib.encodeMessage(proto_out, header)
+
+    # ReadReq is 1 and WriteReq is 4 in src/mem/packet.hh Command enum
+    packet = packet_pb2.Packet()
+    tick = 0
+    for row in table:
+        kind = phase_types[row[column_index['type']]]
+        if kind == 'EXIT':
+            tick += int(row[column_index['duration']])
+            break
+        if kind in ('LINEAR', 'RANDOM'):
+            ticks, addrs, reads = phase_packets(row, tick, rng)
+            packet.size = int(row[column_index['blocksize']])
+            cmds = np.where(reads, 1, 4)
+            for (t, a, c) in zip(ticks.tolist(), addrs.tolist(),
+                                 cmds.tolist()):
+                packet.tick = t
+                packet.addr = a
+                packet.cmd = c
+                protolib.encodeMessage(proto_out, packet)
+        elif kind != 'IDLE':
+            fatal("%s traffic phases cannot be written as a trace" % kind)
+        tick += int(row[column_index['duration']])
+
+    proto_out.close()
+    return tick
@@ -37,8 +37,10 @@
 
 from __future__ import print_function
 
+import json
 import math
 import optparse
+import os
 
 import m5
 from m5.objects import *
@@ -80,6 +82,14 @@ parser.add_option("--mode", type="choice", default="DRAM",
 parser.add_option("--addr_map", type="int", default=1,
                   help = "0: RoCoRaBaCh; 1: RoRaBaCoCh/RoRaBaChCo")
 
+parser.add_option("--banks", type="string", default="",
+                  help = "Comma-separated numbers of banks to sweep "
+                  "(default: 1 to the banks per rank)")
+
+parser.add_option("--bank-slice", type="string", default="",
+                  help = "i/n: only sweep every n-th number of banks, "
+                  "starting at the i-th, to split a sweep across runs")
+
 (options, args) = parser.parse_args()
 
 if args:
@@ -160,6 +170,26 @@ max_addr = mem_range.end
 # enough
 max_stride = min(512, page_size)
 
+if options.banks:
+    bank_values = [int(b) for b in options.banks.split(',')]
+    if not all(1 <= b <= nbr_banks for b in bank_values):
+        fatal("--banks must be between 1 and %d" % nbr_banks)
+else:
+    bank_values = range(1, nbr_banks + 1)
+if options.bank_slice:
+    (index, count) = [int(i) for i in options.bank_slice.split('/')]
+    bank_values = bank_values[index::count]
+stride_values = range(burst_size, max_stride + 1, burst_size)
+
+# the (banks, stride) of every stats dump, in order, for
+# util/dram-sweep.py and util/plot_dram/dram_sweep_plot.py
+with open(os.path.join(m5.options.outdir, 'sweep.json'), 'w') as f:
+    json.dump({ 'burst_size' : burst_size,
+                'page_size'  : page_size,
+                'nbr_banks'  : nbr_banks,
+                'steps'      : [ (bank, stride) for bank in bank_values
+                                 for stride in stride_values ] }, f)
+
 # create a traffic generator, and point it to the file we just created
 system.tgen = PyTrafficGen()
 
@@ -184,8 +214,8 @@ m5.instantiate()
 
 def trace():
     generator = dram_generators[options.mode](system.tgen)
-    for bank in range(1, nbr_banks + 1):
-        for stride_size in range(burst_size, max_stride + 1, burst_size):
+    for bank in bank_values:
+        for stride_size in stride_values:
             num_seq_pkts = int(math.ceil(float(stride_size) / burst_size))
             yield generator(period,
                             0, max_addr, burst_size, int(itt), int(itt),
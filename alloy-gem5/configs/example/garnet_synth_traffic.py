@@ -82,6 +82,28 @@ parser.add_option("--inj-vnet", type="int", default=-1,
                         0 and 1 are 1-flit, 2 is 5-flit.\
                         Set to -1 to inject randomly in all vnets.")
 
+parser.add_option("--monitor-interval", type="int", default=0,
+                  help="Check latency and throughput every this many\
+                        cycles and stop once they converge or the network\
+                        saturates. Set to 0 to always run --sim-cycles.")
+
+parser.add_option("--monitor-warmup", type="int", default=0,
+                  help="Cycles to run before the first check. The stats\
+                        are reset at the end of the warmup.")
+
+parser.add_option("--monitor-tolerance", type="float", default=0.02,
+                  help="Stop once the 95% confidence intervals of latency\
+                        and throughput are within this fraction of the\
+                        mean.")
+
+parser.add_option("--monitor-min-intervals", type="int", default=10,
+                  help="Minimum number of intervals before stopping.")
+
+parser.add_option("--monitor-saturation", type="float", default=3.0,
+                  help="Stop as saturated once the interval latency grew\
+                        for 3 intervals in a row and exceeds this multiple\
+                        of the first interval latency.")
+
 #
 # Add the ruby specific and protocol specific options
 #
@@ -151,7 +173,85 @@ m5.ticks.setGlobalFrequency('1ns')
 # instantiate configuration
 m5.instantiate()
 
-# simulate until program terminates
-exit_event = m5.simulate(options.abs_max_tick)
+# -----------------------
+# convergence monitor
+# -----------------------
+
+def half_width(samples):
+    # 95% confidence interval half width of the mean, using the normal
+    # approximation over the interval (batch) means
+    n = len(samples)
+    mean = sum(samples) / n
+    var = sum((x - mean) ** 2 for x in samples) / (n - 1)
+    return 1.96 * (var / n) ** 0.5
+
+def monitor(network):
+    """Run --monitor-interval slices until the interval latency and
+    throughput converge or the network saturates. Returns the exit event
+    and the reason to stop, None if the simulation ended on its own."""
+
+    # the options are in Ruby cycles, m5.simulate() counts ticks
+    period = system.ruby.clk_domain.clock[0].getValue()
+    interval = options.monitor_interval * period
+    warmup = options.monitor_warmup * period
+    if warmup > 0:
+        exit_event = m5.simulate(warmup)
+        if exit_event.getCause() != "simulate() limit reached":
+            return exit_event, None
+        m5.stats.reset()
+
+    latencies = []
+    throughputs = []
+    received = network.getPacketsReceived()
+    latency = network.getPacketLatency()
+
+    while True:
+        exit_event = m5.simulate(interval)
+        if exit_event.getCause() != "simulate() limit reached":
+            return exit_event, None
+
+        new_received = network.getPacketsReceived()
+        new_latency = network.getPacketLatency()
+        packets = new_received - received
+        if packets > 0:
+            latencies.append((new_latency - latency) / packets)
+            throughputs.append(packets / float(options.monitor_interval *
+                                               options.num_cpus))
+        received, latency = new_received, new_latency
+
+        n = len(latencies)
+        if n == 0:
+            continue
+
+        print("monitor @ tick %d: latency %.2f throughput %.5f" %
+              (m5.curTick(), latencies[-1], throughputs[-1]))
+
+        if n > 3 and \
+           latencies[-1] > options.monitor_saturation * latencies[0] and \
+           latencies[-1] > latencies[-2] > latencies[-3] > latencies[-4]:
+            return exit_event, "network saturated"
+
+        if n < max(options.monitor_min_intervals, 2):
+            continue
+
+        lat_mean = sum(latencies) / n
+        thr_mean = sum(throughputs) / n
+        if half_width(latencies) <= options.monitor_tolerance * lat_mean and \
+           half_width(throughputs) <= options.monitor_tolerance * thr_mean:
+            return exit_event, "latency and throughput converged"
+
+if options.monitor_interval > 0:
+    if options.network != "garnet2.0":
+        print("Error: --monitor-interval requires --network=garnet2.0")
+        sys.exit(1)
+    exit_event, reason = monitor(system.ruby.network)
+    # stats are not dumped at exit, so dump the monitored region here
+    m5.stats.dump()
+    if reason is not None:
+        print('Exiting @ tick', m5.curTick(), 'because', reason)
+        sys.exit(0)
+else:
+    # simulate until program terminates
+    exit_event = m5.simulate(options.abs_max_tick)
 
 print('Exiting @ tick', m5.curTick(), 'because', exit_event.getCause())
@@ -42,6 +42,19 @@ def define_options(parser):
                       help="the number of rows in the mesh topology")
     parser.add_option("--mesh-columns", type="int", default=0,
                       help="the number of columns in the mesh topology")
+    parser.add_option("--mesh-concentration", type="int", default=1,
+                      help="cores per router of the generic mesh topologies")
+    parser.add_option("--mesh-torus", action="store_true", default=False,
+                      help="add wrap-around links to the generic mesh "
+                           "topologies. There are no dateline virtual "
+                           "channels, so the rings can deadlock under load")
+    parser.add_option("--mesh-placement", type="string", default="",
+                      help="controller placement overrides of the generic "
+                           "mesh topologies, e.g. 'dir=diagonal;l2=0,7' "
+                           "or a .json file")
+    parser.add_option("--topology-cache-dir", type="string", default="",
+                      help="directory to cache the generic mesh topology "
+                           "tables in")
     parser.add_option("--network", type="choice", default="simple",
                       choices=['simple', 'garnet2.0'],
                       help="'simple'|'garnet2.0'")
@@ -79,6 +92,10 @@ def define_options(parser):
                       default=0,
                       help="""maximal buffer size in the network
                               (0 means infinite)""")
+    parser.add_option("--routing-cache-dir", action="store", type="string",
+                      default="",
+                      help="""directory to cache the routing tables in,
+                              keyed by a hash of the topology""")
 
 def create_network(options, ruby):
 
@@ -114,6 +131,8 @@ def init_network(options, network, InterfaceClass):
         network.routing_algorithm = options.routing_algorithm
         network.garnet_deadlock_threshold = options.garnet_deadlock_threshold
 
+    network.routing_cache_dir = options.routing_cache_dir
+
     if options.network == "simple":
         network.buffer_size = options.buffer_size
         network.setup_buffers()
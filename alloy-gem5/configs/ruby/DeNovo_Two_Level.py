@@ -32,7 +32,7 @@ import m5
 from m5.objects import *
 from m5.defines import buildEnv
 from Ruby import create_topology, create_directories
-from Ruby import send_evicts
+from Ruby import send_evicts, l2_replacement_policy
 
 #
 # Declare caches used by the protocol
@@ -141,7 +141,9 @@ def create_system(options, full_system, system, dma_ports, bootmem, ruby_system)
         #
         l2_cache = L2Cache(size = options.l2_size,
                            assoc = options.l2_assoc,
-                           start_index_bit = l2_index_start)
+                           start_index_bit = l2_index_start,
+                           replacement_policy = \
+                               l2_replacement_policy(options))
 
         l2_cntrl = L2Cache_Controller(version = i,
                                       L2cache = l2_cache,
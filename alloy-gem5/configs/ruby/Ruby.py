@@ -80,6 +80,18 @@ def define_options(parser):
     parser.add_option("--recycle-latency", type="int", default=10,
                       help="Recycle latency for ruby controller input buffers")
 
+    # L2 replacement options for STT-RAM endurance studies
+    parser.add_option("--l2-replacement", type="choice", default="lru",
+                      choices=["lru", "write-aware"],
+                      help="L2 replacement policy. write-aware evicts the "
+                           "least written of the LRU ways.")
+    parser.add_option("--l2-wear-window", type="int", default=2,
+                      help="LRU ways considered by write-aware replacement")
+    parser.add_option("--l2-rotation-threshold", type="int", default=0,
+                      help="Extra writes after which write-aware replacement "
+                           "moves a line to the least written way of its "
+                           "set (0 = never)")
+
     protocol = buildEnv['PROTOCOL']
     exec "import %s" % protocol
     eval("%s.define_options(parser)" % protocol)
@@ -234,6 +246,13 @@ def create_directories(options, bootmem, ruby_system, system):
 
     return (dir_cntrl_nodes, None)
 
+def l2_replacement_policy(options):
+    if options.l2_replacement == "write-aware":
+        return WriteAwareReplacementPolicy(
+            lru_window = options.l2_wear_window,
+            rotation_threshold = options.l2_rotation_threshold)
+    return LRUReplacementPolicy()
+
 def send_evicts(options):
     # currently, 2 scenarios warrant forwarding evictions to the CPU:
     # 1. The O3 model must keep the LSQ coherent with the caches
@@ -0,0 +1,314 @@
+#==============================================================================
+# GenericMesh.py
+#==============================================================================
+# Mesh topology builder with the controller placement given as data.
+#
+# Controllers are grouped in classes (see controller_classes) and each group
+# of classes is placed with a rule:
+#
+#   'spread'     controller i goes to router i % num_routers, the number of
+#                controllers must be a multiple of the number of routers
+#   'sequential' consecutive routers, continuing after the previous
+#                sequential group
+#   'bottom'     controller i goes to router i (the first row)
+#   'diagonal'   controller i goes to router (num_columns + 1) * i
+#   'corners'    up to four controllers, one per corner
+#   'router0'    all controllers go to router 0
+#   [r0, r1, ..] controller i goes to router r[i % len(r)]
+#   function     f(i, num_nodes, num_rows, num_columns) returns the router
+#
+# The mesh is num_cpus / --mesh-concentration routers in --mesh-rows rows,
+# or --mesh-rows x --mesh-columns routers if --mesh-columns is given, with
+# wrap-around links if --mesh-torus is set. XY routing is enforced using
+# link weights. This is deadlock free on the mesh but not on the torus:
+# the wrap-around links close every row and column into a ring, and
+# without dateline virtual channels the packets in a ring can wait on each
+# other in a cycle. Torus results are only safe well below saturation.
+# --mesh-placement overrides the placement of single classes,
+# either as "dir=diagonal;l2=bottom" or as a JSON file with the same keys.
+#
+# The computed router and link tables can be cached in --topology-cache-dir,
+# keyed by a hash of everything they depend on.
+
+import hashlib
+import json
+import os
+
+import m5
+from m5.params import *
+from m5.objects import *
+
+from BaseTopology import SimpleTopology
+
+controller_classes = {
+    'L1Cache_Controller'   : 'l1',
+    'SC3_Controller'       : 'tiny',
+    'DeNovo_Controller'    : 'tiny',
+    'L2Cache_Controller'   : 'l2',
+    'Directory_Controller' : 'dir',
+    'DMA_Controller'       : 'dma',
+}
+
+def controller_class(node):
+    return controller_classes.get(node.type, 'other')
+
+#------------------------------------------------------------------------------
+# Mesh links
+#------------------------------------------------------------------------------
+
+def mesh_links(num_rows, num_columns, torus = False, base = 0):
+    """ Returns (src, dst, src_outport, dst_inport, weight) for all links of
+        a num_rows x num_columns mesh whose first router is base. X links
+        have weight 1 and Y links weight 2 to enforce XY routing. Without
+        wrap-around links the order is the one of the original Mesh_XY.
+    """
+    # a wrap-around link in a dimension of size 2 would duplicate a link
+    x_span = num_columns if torus and num_columns > 2 else num_columns - 1
+    y_span = num_rows if torus and num_rows > 2 else num_rows - 1
+
+    def router(row, col):
+        return base + (row % num_rows) * num_columns + (col % num_columns)
+
+    east = [ (router(row, col), router(row, col + 1), "East", "West", 1)
+             for row in xrange(num_rows) for col in xrange(x_span) ]
+    west = [ (router(row, col + 1), router(row, col), "West", "East", 1)
+             for row in xrange(num_rows) for col in xrange(x_span) ]
+    north = [ (router(row, col), router(row + 1, col), "North", "South", 2)
+              for col in xrange(num_columns) for row in xrange(y_span) ]
+    south = [ (router(row + 1, col), router(row, col), "South", "North", 2)
+              for col in xrange(num_columns) for row in xrange(y_span) ]
+
+    return east + west + north + south
+
+#------------------------------------------------------------------------------
+# Placement rules
+#------------------------------------------------------------------------------
+
+def place(rule, nodes, mesh, cursor):
+    """ Returns the routers of nodes under the given rule, and the new
+        cursor of the sequential rule
+    """
+    num_rows, num_columns = mesh
+    num_routers = num_rows * num_columns
+    n = len(nodes)
+
+    if callable(rule):
+        return [ rule(i, n, num_rows, num_columns) for i in xrange(n) ], cursor
+
+    if isinstance(rule, (list, tuple)):
+        assert(len(rule) > 0)
+        return [ rule[i % len(rule)] for i in xrange(n) ], cursor
+
+    if rule == 'spread':
+        assert(n % num_routers == 0)
+        return [ i % num_routers for i in xrange(n) ], cursor
+
+    if rule == 'sequential':
+        assert(cursor + n <= num_routers)
+        return range(cursor, cursor + n), cursor + n
+
+    if rule == 'bottom':
+        assert(n <= num_columns)
+        return range(n), cursor
+
+    if rule == 'diagonal':
+        assert(n <= min(num_rows, num_columns))
+        return [ (num_columns + 1) * i for i in xrange(n) ], cursor
+
+    if rule == 'corners':
+        assert(n <= 4)
+        corners = [ 0, num_columns - 1, num_routers - num_columns,
+                    num_routers - 1 ]
+        return corners[:n], cursor
+
+    if rule == 'router0':
+        return [ 0 ] * n, cursor
+
+    m5.util.fatal("Unknown mesh placement rule %s" % rule)
+
+def parse_placement(spec):
+    """ Parses --mesh-placement, "cls=rule;cls=rule" or a JSON file """
+    if not spec:
+        return {}
+    if spec.endswith('.json'):
+        with open(spec) as f:
+            return json.load(f)
+    overrides = {}
+    for item in spec.split(';'):
+        if not item.strip():
+            continue
+        fields = [ f.strip() for f in item.split('=') ]
+        if len(fields) != 2 or not fields[0] or not fields[1]:
+            m5.util.fatal("Bad mesh placement %s, expected cls=rule" % item)
+        cls, rule = fields
+        if rule[0].isdigit():
+            try:
+                rule = [ int(r) for r in rule.split(',') ]
+            except ValueError:
+                m5.util.fatal("Bad mesh placement router list %s" % rule)
+        overrides[cls] = rule
+    return overrides
+
+#------------------------------------------------------------------------------
+# GenericMesh
+#------------------------------------------------------------------------------
+
+class GenericMesh(SimpleTopology):
+    description='GenericMesh'
+
+    # Ordered list of (controller classes, rule). The controllers of each
+    # group are placed in the order they were created.
+    placement = [ (('l1', 'tiny', 'l2', 'dir', 'other'), 'spread'),
+                  (('dma',), 'router0') ]
+
+    def __init__(self, controllers):
+        self.nodes = controllers
+
+    def dimensions(self, options):
+        """ Returns (num_rows, num_columns) of the mesh """
+        num_rows = options.mesh_rows
+        if options.mesh_columns > 0:
+            return num_rows, options.mesh_columns
+
+        concentration = getattr(options, 'mesh_concentration', 1)
+        num_routers, remainder = divmod(options.num_cpus, concentration)
+        assert(remainder == 0)
+
+        # Obviously the number or rows must be <= the number of routers
+        # and evenly divisible.
+        assert(num_rows > 0 and num_rows <= num_routers)
+        num_columns = int(num_routers / num_rows)
+        assert(num_columns * num_rows == num_routers)
+        return num_rows, num_columns
+
+    def getPlacement(self, options):
+        """ The class placement with the --mesh-placement overrides """
+        overrides = parse_placement(getattr(options, 'mesh_placement', ''))
+        placement = []
+        for (classes, rule) in self.placement:
+            rest = tuple(c for c in classes if c not in overrides)
+            if rest:
+                placement.append((rest, rule))
+            for c in classes:
+                if c in overrides:
+                    placement.append(((c,), overrides[c]))
+        return placement
+
+    def validate(self, options, mesh, counts):
+        """ Checks the number of controllers of each class """
+        pass
+
+    def buildTables(self, options, mesh, torus):
+        """ Returns the router of every controller (in self.nodes order)
+            and the internal links
+        """
+        node_classes = [ controller_class(n) for n in self.nodes ]
+        self.validate(options, mesh,
+                      dict((c, node_classes.count(c))
+                           for c in controller_classes.values() + ['other']))
+
+        ext = []
+        cursor = 0
+        for (classes, rule) in self.getPlacement(options):
+            group = [ i for (i, c) in enumerate(node_classes)
+                      if c in classes ]
+            routers, cursor = place(rule, group, mesh, cursor)
+            ext += zip(group, routers)
+
+        # every controller has to be connected exactly once
+        if sorted(i for (i, r) in ext) != range(len(self.nodes)):
+            m5.util.fatal("%s does not place all controllers: %s" %
+                          (self.description, sorted(set(node_classes))))
+        num_routers = mesh[0] * mesh[1]
+        assert(all(0 <= r < num_routers for (i, r) in ext))
+
+        return { 'rows'   : mesh[0],
+                 'columns': mesh[1],
+                 'torus'  : torus,
+                 'ext'    : ext,
+                 'int'    : mesh_links(mesh[0], mesh[1], torus) }
+
+    def placementKey(self, options, mesh):
+        """ The placement as plain data. Functions are replaced by the
+            routers they return, their repr changes from run to run.
+        """
+        node_classes = [ controller_class(n) for n in self.nodes ]
+        key = []
+        for (classes, rule) in self.getPlacement(options):
+            if callable(rule):
+                n = sum(node_classes.count(c) for c in classes)
+                rule = [ rule(i, n, mesh[0], mesh[1]) for i in xrange(n) ]
+            key.append((classes, rule))
+        return key
+
+    def cacheFile(self, options, mesh, torus):
+        cache_dir = getattr(options, 'topology_cache_dir', '')
+        if not cache_dir:
+            return None
+        key = json.dumps([ self.description, mesh, torus,
+                           self.placementKey(options, mesh),
+                           [ controller_class(n) for n in self.nodes ] ])
+        return os.path.join(cache_dir, "%s-%s.json" %
+                            (self.description,
+                             hashlib.sha1(key).hexdigest()[:16]))
+
+    def getTables(self, options, mesh, torus):
+        cache_file = self.cacheFile(options, mesh, torus)
+        if cache_file and os.path.isfile(cache_file):
+            with open(cache_file) as f:
+                return json.load(f)
+
+        tables = self.buildTables(options, mesh, torus)
+
+        if cache_file:
+            if not os.path.isdir(os.path.dirname(cache_file)):
+                os.makedirs(os.path.dirname(cache_file))
+            # write and rename so parallel runs never read a partial file
+            tmp = "%s.%d" % (cache_file, os.getpid())
+            with open(tmp, 'w') as f:
+                json.dump(tables, f)
+            os.rename(tmp, cache_file)
+
+        return tables
+
+    def makeTopology(self, options, network, IntLink, ExtLink, Router):
+        nodes = self.nodes
+
+        # default values for link latency and router latency.
+        # Can be over-ridden on a per link/router basis
+        link_latency = options.link_latency # used by simple and garnet
+        router_latency = options.router_latency # only used by garnet
+
+        mesh = self.dimensions(options)
+        torus = getattr(options, 'mesh_torus', False)
+        if torus:
+            m5.util.warn("%s: the torus rings have no dateline virtual "
+                         "channels and may deadlock under load" %
+                         self.description)
+        tables = self.getTables(options, mesh, torus)
+
+        # Create the routers in the mesh
+        routers = [Router(router_id=i, latency = router_latency) \
+            for i in range(mesh[0] * mesh[1])]
+        network.routers = routers
+
+        # link counter to set unique link ids
+        link_count = 0
+
+        network.ext_links = [ ExtLink(link_id=link_count + i,
+                                      ext_node=nodes[n],
+                                      int_node=routers[r],
+                                      latency = link_latency)
+                              for (i, (n, r)) in enumerate(tables['ext']) ]
+        link_count += len(tables['ext'])
+
+        network.int_links = [ IntLink(link_id=link_count + i,
+                                      src_node=routers[src],
+                                      dst_node=routers[dst],
+                                      src_outport=src_outport,
+                                      dst_inport=dst_inport,
+                                      latency = link_latency,
+                                      weight=weight)
+                              for (i, (src, dst, src_outport, dst_inport,
+                                       weight))
+                              in enumerate(tables['int']) ]
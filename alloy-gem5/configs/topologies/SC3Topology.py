@@ -32,6 +32,7 @@ from m5.params import *
 from m5.objects import *
 
 from BaseTopology import SimpleTopology
+from GenericMesh import mesh_links
 
 
 # This is a topology for N (N > 0) "big" processors and M (M >= 0) "tiny"
@@ -184,65 +185,16 @@ class SC3Topology(SimpleTopology):
             num_columns = M / num_rows
             assert(num_rows * num_columns == M)
 
-            # East output to West input links (weight = 1)
-            for row in xrange(num_rows):
-              for col in xrange(num_columns):
-                if (col + 1 < num_columns):
-                  east_out = col + (row * num_columns)
-                  west_in = (col + 1) + (row * num_columns)
-                  int_links.append(IntLink(link_id=link_count,
-                                           src_node=routers[N + east_out],
-                                           dst_node=routers[N + west_in],
-                                           src_outport="East",
-                                           dst_inport="West",
-                                           latency = link_latency,
-                                           weight=1))
-                  link_count += 1
-
-            # West output to East input links (weight = 1)
-            for row in xrange(num_rows):
-              for col in xrange(num_columns):
-                if (col + 1 < num_columns):
-                  east_in = col + (row * num_columns)
-                  west_out = (col + 1) + (row * num_columns)
-                  int_links.append(IntLink(link_id=link_count,
-                                           src_node=routers[N + west_out],
-                                           dst_node=routers[N + east_in],
-                                           src_outport="West",
-                                           dst_inport="East",
-                                           latency = link_latency,
-                                           weight=1))
-                  link_count += 1
-
-            # North output to South input links (weight = 2)
-            for col in xrange(num_columns):
-              for row in xrange(num_rows):
-                if (row + 1 < num_rows):
-                  north_out = col + (row * num_columns)
-                  south_in = col + ((row + 1) * num_columns)
-                  int_links.append(IntLink(link_id=link_count,
-                                           src_node=routers[N + north_out],
-                                           dst_node=routers[N + south_in],
-                                           src_outport="North",
-                                           dst_inport="South",
-                                           latency = link_latency,
-                                           weight=2))
-                  link_count += 1
-
-            # South output to North input links (weight = 2)
-            for col in xrange(num_columns):
-              for row in xrange(num_rows):
-                if (row + 1 < num_rows):
-                  north_in = col + (row * num_columns)
-                  south_out = col + ((row + 1) * num_columns)
-                  int_links.append(IntLink(link_id=link_count,
-                                           src_node=routers[N + south_out],
-                                           dst_node=routers[N + north_in],
-                                           src_outport="South",
-                                           dst_inport="North",
-                                           latency = link_latency,
-                                           weight=2))
-                  link_count += 1
+            for (src, dst, src_outport, dst_inport, weight) in \
+                    mesh_links(num_rows, num_columns, base = N):
+              int_links.append(IntLink(link_id=link_count,
+                                       src_node=routers[src],
+                                       dst_node=routers[dst],
+                                       src_outport=src_outport,
+                                       dst_inport=dst_inport,
+                                       latency = link_latency,
+                                       weight=weight))
+              link_count += 1
 
             # connect tiny cores' mesh to the big cores' ring
             int_links.append(IntLink(link_id=link_count,
@@ -0,0 +1,271 @@
+#! /usr/bin/env python
+#============================================================================
+# adaptive_sweep
+#============================================================================
+# Adaptive injection rate sweep. Instead of simulating every point of the
+# linear sweep in sweep_config.py, run a coarse grid in rounds of parallel
+# sims until the first saturated point shows up, then bisect the bracket
+# around the knee down to inj_step. A point is saturated once its average
+# packet latency exceeds adaptive_latency_multiple times the zero-load
+# latency (the latency at the lowest simulated rate). A sim that finished
+# or crashed without latency stats counts as saturated. If cluster sims are
+# still running when --timeout expires the search stops, run the script
+# again once they are done.
+#
+# The sims use the same names and output directories as the doit sweep
+# tasks, so existing results are reused if they were simulated with the
+# same options (sim_cycles, monitor settings, ...), and plot-injection-rate-sweep.py
+# plots both kinds of sweeps. The bracket is written to
+# simout/<topology>-<num_cpus>-saturation.json.
+#
+# Usage: ./adaptive_sweep.py MeshDirL2Bottom_XY [-j 8] [--cluster]
+#
+
+from __future__ import print_function, division
+
+import argparse
+import json
+import os
+import subprocess
+import time
+from multiprocessing.pool import ThreadPool
+
+from commons import *
+from doit_utils import generate_sim_cmd
+from sweep_config import *
+
+stat_name = "system.ruby.network.average_packet_latency"
+
+#----------------------------------------------------------------------------
+# Utility Functions
+#----------------------------------------------------------------------------
+
+def get_stat( stats_file, stat_name ):
+  """Returns the first value of stat_name in stats_file, None if missing"""
+  if not os.path.isfile( stats_file ):
+    return None
+  with open( stats_file, 'r' ) as f:
+    for line in f:
+      if line.startswith( stat_name ):
+        l = line.split('#')[0].split()
+        if len(l) == 2:
+          return float( l[1] )
+  return None
+
+def sim_options( cmd ):
+  """The options of a sim command after the gem5 binary"""
+  return cmd.split()[1:]
+
+def same_options( out_dir, cmd ):
+  """True if the sim in out_dir ran with the options of cmd, as printed
+  by gem5 on its command line"""
+  stdout = os.path.join( out_dir, "stdout" )
+  if not os.path.isfile( stdout ):
+    return False
+  with open( stdout, 'r' ) as f:
+    for line in f:
+      if line.startswith( "command line:" ):
+        return line.split()[3:] == sim_options( cmd )
+  return False
+
+def sim_finished( out_dir ):
+  """True if gem5 exited or crashed in out_dir"""
+  for name, marks in [ ( "stdout", [ "Exiting @ tick" ] ),
+                       ( "stderr", [ "panic:", "fatal:",
+                                     "segmentation fault" ] ) ]:
+    path = os.path.join( out_dir, name )
+    if os.path.isfile( path ):
+      with open( path, 'r' ) as f:
+        text = f.read()
+      if any( m in text for m in marks ):
+        return True
+  return False
+
+def on_grid( rate ):
+  """Rounds rate to the inj_step grid of the linear sweep"""
+  return round( round( rate / inj_step ) * inj_step, 6 )
+
+def stats_file_of( topology, rate ):
+  _, _, out_dir = generate_sim_cmd( topology, num_cpus, rate, sim_cycles )
+  return os.path.join( out_dir, "stats.txt" )
+
+#----------------------------------------------------------------------------
+# Running sims
+#----------------------------------------------------------------------------
+
+def run_local( cmd_and_dir ):
+  cmd, out_dir = cmd_and_dir
+  if not os.path.isdir( out_dir ):
+    os.makedirs( out_dir )
+  subprocess.call( cmd, shell = True )
+
+def run_round( topology, rates, args ):
+  """Simulates the given rates and returns {rate: latency}, None for sims
+  that ended without latency stats. Sims that already have the stats of a
+  run with the same options are not run again. Returns None if cluster
+  sims are still running after --timeout."""
+
+  todo = []
+  for rate in rates:
+    cmd, task_name, out_dir = \
+        generate_sim_cmd( topology, num_cpus, rate, sim_cycles )
+    stats_file = os.path.join( out_dir, "stats.txt" )
+    if get_stat( stats_file, stat_name ) is not None and \
+       same_options( out_dir, cmd ):
+      continue
+    # stale results of other options must not be mistaken for new ones
+    for name in [ "stats.txt", "stdout", "stderr" ]:
+      if os.path.isfile( os.path.join( out_dir, name ) ):
+        os.remove( os.path.join( out_dir, name ) )
+    todo.append( ( rate, cmd, task_name, out_dir ) )
+
+  print( "{}: running {} of {} sims at {}".format(
+      topology, len( todo ), len( rates ), sorted( rates ) ) )
+
+  if args.cluster:
+    for rate, cmd, task_name, out_dir in todo:
+      if not os.path.isdir( out_dir ):
+        os.makedirs( out_dir )
+      submit_job( cmd, task_name, out_dir )
+    # the cluster runs the jobs asynchronously, wait for their stats
+    start = time.time()
+    pending = [ t[3] for t in todo ]
+    while pending:
+      time.sleep( args.poll )
+      pending = [ d for d in pending
+                  if get_stat( os.path.join( d, "stats.txt" ),
+                               stat_name ) is None
+                  and not sim_finished( d ) ]
+      if pending and args.timeout and time.time() - start > args.timeout:
+        print( "timed out waiting for {}".format( pending ) )
+        return None
+  elif todo:
+    pool = ThreadPool( args.jobs )
+    pool.map( run_local, [ ( t[1], t[3] ) for t in todo ] )
+    pool.close()
+    pool.join()
+
+  results = {}
+  for rate in rates:
+    results[rate] = get_stat( stats_file_of( topology, rate ), stat_name )
+  return results
+
+#----------------------------------------------------------------------------
+# Saturation search
+#----------------------------------------------------------------------------
+
+def is_saturated( latency, zero_load, args ):
+  # a finished sim without latency stats most likely died in the saturated
+  # region, run_round never returns sims that are still running
+  if latency is None:
+    return True
+  return latency > args.latency_multiple * zero_load
+
+def find_saturation( topology, args ):
+  results = {}
+
+  # coarse grid, the lowest rate gives the zero-load latency
+  coarse = [ on_grid( inj_step ) ]
+  rate = on_grid( inj_start + args.coarse_step )
+  while rate < inj_end:
+    if rate > coarse[-1]:
+      coarse.append( rate )
+    rate = on_grid( rate + args.coarse_step )
+
+  zero_load = None
+  lo, hi = coarse[0], None
+
+  for i in range( 0, len( coarse ), args.jobs ):
+    latencies = run_round( topology, coarse[i:i + args.jobs], args )
+    if latencies is None:
+      print( "{}: search stopped, sims are still running".format( topology ) )
+      return None
+    results.update( latencies )
+
+    if zero_load is None:
+      zero_load = results[coarse[0]]
+      if zero_load is None:
+        print( "{}: no latency at the zero-load rate {}".format(
+            topology, coarse[0] ) )
+        return None
+
+    for rate in sorted( results ):
+      if is_saturated( results[rate], zero_load, args ):
+        hi = rate
+        break
+      lo = rate
+    if hi is not None:
+      break
+
+  if hi is None:
+    print( "{}: not saturated below {}".format( topology, inj_end ) )
+  else:
+    # bisect the bracket, args.jobs points per round
+    while hi - lo > inj_step + 1e-9:
+      n = int( round( ( hi - lo ) / inj_step ) ) - 1
+      k = min( args.jobs, n )
+      rates = sorted( set( on_grid( lo + ( hi - lo ) * ( j + 1 ) / ( k + 1 ) )
+                           for j in range( k ) ) )
+      latencies = run_round( topology, rates, args )
+      if latencies is None:
+        print( "{}: search stopped between {} and {}, sims are still "
+               "running".format( topology, lo, hi ) )
+        return None
+      results.update( latencies )
+      for rate in rates:
+        if is_saturated( results[rate], zero_load, args ):
+          hi = min( hi, rate )
+        else:
+          lo = max( lo, rate )
+
+  summary = { "topology"          : topology,
+              "num_cpus"          : num_cpus,
+              "zero_load_latency" : zero_load,
+              "latency_multiple"  : args.latency_multiple,
+              "saturated_above"   : lo,
+              "saturated_at"      : hi,
+              "sims"              : len( results ),
+              "latency"           : dict( ( str( r ), l )
+                                          for r, l in results.items() ),
+            }
+
+  summary_file = "{}/{}-{}-saturation.json".format( simout, topology,
+                                                    num_cpus )
+  if not os.path.isdir( simout ):
+    os.makedirs( simout )
+  with open( summary_file, "w" ) as f:
+    json.dump( summary, f, indent = 2, sort_keys = True )
+
+  print( "{}: saturation between {} and {} after {} sims".format(
+      topology, lo, hi, len( results ) ) )
+  return summary
+
+#----------------------------------------------------------------------------
+# Main
+#----------------------------------------------------------------------------
+
+if __name__ == "__main__":
+  parser = argparse.ArgumentParser( description =
+                                    "Adaptive injection rate sweep" )
+  parser.add_argument( 'topologies', nargs = '+',
+                       help = "topologies to sweep" )
+  parser.add_argument( '-j', '--jobs', type = int, default = adaptive_jobs,
+                       help = "sims per round" )
+  parser.add_argument( '--coarse-step', type = float,
+                       default = adaptive_coarse_step,
+                       help = "injection rate step of the coarse grid" )
+  parser.add_argument( '--latency-multiple', type = float,
+                       default = adaptive_latency_multiple,
+                       help = "saturation threshold as a multiple of the "
+                              "zero-load latency" )
+  parser.add_argument( '--cluster', action = 'store_true',
+                       help = "submit the sims to the cluster" )
+  parser.add_argument( '--poll', type = int, default = 60,
+                       help = "seconds between checks for cluster results" )
+  parser.add_argument( '--timeout', type = int, default = 0,
+                       help = "give up waiting for a cluster round after "
+                              "this many seconds, 0 waits forever" )
+  args = parser.parse_args()
+
+  for topology in args.topologies:
+    find_saturation( topology, args )
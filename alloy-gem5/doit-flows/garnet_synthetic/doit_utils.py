@@ -12,6 +12,7 @@ import commentjson
 import subprocess
 import math
 from commons import *
+from sweep_config import monitor_interval, monitor_warmup
 
 #----------------------------------------------------------------------------
 # Utility Functions
@@ -26,15 +27,15 @@ def get_files_in_dir( path ):
   return file_list
 
 #------------------------------------------------------------------------------
-# Generate sim task
+# Generate sim command
 #------------------------------------------------------------------------------
+# Returns the gem5 command line, the task name and the output directory of
+# one synthetic traffic simulation.
 
-def generate_sim_task(topology,
-                      num_cpus,
-                      injection_rate,
-                      sim_cycles,
-                      use_cluster       = True,
-                      task_dep          = None ):
+def generate_sim_cmd(topology,
+                     num_cpus,
+                     injection_rate,
+                     sim_cycles ):
 
   task_name = "-".join([topology, str(num_cpus), "inj", str(injection_rate)])
   out_dir   = "{}/{}".format(simout, task_name)
@@ -56,6 +57,11 @@ def generate_sim_task(topology,
            "--injectionrate={}".format(injection_rate)
          ]
 
+  if monitor_interval > 0:
+    cmd += [ "--monitor-interval={}".format(monitor_interval),
+             "--monitor-warmup={}".format(monitor_warmup),
+           ]
+
   if topology.startswith("MeshDirL2"):
     cmd += [ "--mesh-rows={}".format(int(math.sqrt(num_cpus))),
              "--num-dirs={}".format(int(math.sqrt(num_cpus))),
@@ -70,6 +76,22 @@ def generate_sim_task(topology,
   # flatten cmd
   cmd = " ".join( cmd )
 
+  return cmd, task_name, out_dir
+
+#------------------------------------------------------------------------------
+# Generate sim task
+#------------------------------------------------------------------------------
+
+def generate_sim_task(topology,
+                      num_cpus,
+                      injection_rate,
+                      sim_cycles,
+                      use_cluster       = True,
+                      task_dep          = None ):
+
+  cmd, task_name, out_dir = generate_sim_cmd(topology, num_cpus,
+                                             injection_rate, sim_cycles)
+
   # build task dict
 
   if use_cluster:
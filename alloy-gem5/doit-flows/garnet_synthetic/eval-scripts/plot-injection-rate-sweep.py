@@ -5,6 +5,7 @@ import matplotlib.pyplot as plt
 import numpy as np
 import os
 import argparse
+import json
 import sys
 sys.path.append(os.path.dirname(os.path.dirname(os.path.realpath(__file__))))
 from sweep_config import *
@@ -45,16 +46,6 @@ def get_stats(stats_file, stat_name):
                     return float(l[1])
     return 0.0
 
-def range_positve(start, stop=None, step=None):
-    if stop == None:
-        stop = start + 0.0
-        start = 0.0
-    if step == None:
-        step = 1.0
-    while start < stop:
-        yield start
-        start += step
-
 #--------------------------------------------------------------------------
 # plots
 #--------------------------------------------------------------------------
@@ -68,24 +59,48 @@ plt.title("Network Injection Rate Sweep")
 plt.xlabel("Injection Rate")
 plt.ylabel(stat_name.split('.')[-1])
 
+def get_injection_rates(input_dir, topology):
+    # Rates of all sims of this topology in input_dir. This covers both the
+    # linear sweep and the points picked by adaptive_sweep.py.
+    prefix = "-".join([topology, str(num_cpus), "inj", ""])
+    rates = []
+    if os.path.isdir(input_dir):
+        for d in os.listdir(input_dir):
+            if d.startswith(prefix):
+                try:
+                    rates.append((float(d[len(prefix):]), d))
+                except ValueError:
+                    pass
+    return sorted(rates)
+
 for idx, topology in enumerate(topologies):
     x = []
     y = []
-    for injection_rate in range_positve(inj_start, inj_end, inj_step):
-        task_name = "-".join([topology, str(num_cpus), "inj", str(injection_rate)])
+    for injection_rate, task_name in get_injection_rates(args.input_dir,
+                                                         topology):
         stats_file = os.path.join(args.input_dir, task_name, "stats.txt")
         val = 0
         if os.path.isfile(stats_file):
             val = get_stats(stats_file, stat_name)
         else:
             print("{} does not exist".format(stats_file))
-        
+
         x.append(injection_rate)
         y.append(val)
-    
+
     y = list(map(lambda x : x if x != 0 else None, y)) # filter out zero values
     plt.plot(x, y, color=colors[idx], marker='.', label=topology)
 
+    # saturation point found by adaptive_sweep.py
+    summary_file = os.path.join(args.input_dir, "{}-{}-saturation.json"
+                                .format(topology, num_cpus))
+    if os.path.isfile(summary_file):
+        with open(summary_file) as f:
+            summary = json.load(f)
+        if summary["saturated_at"] is not None:
+            plt.axvline(summary["saturated_above"], color=colors[idx],
+                        linestyle='--', linewidth=0.8)
+
 plt.legend()
 plt.savefig(args.output_file)
 
@@ -4,6 +4,19 @@
 sim_cycles = 10000000
 num_cpus   = 64
 
+# convergence monitor of garnet_synth_traffic.py, sims stop before
+# sim_cycles once latency/throughput converge or the network saturates.
+# Set monitor_interval to 0 to always run sim_cycles.
+monitor_interval = 100000
+monitor_warmup   = 100000
+
 inj_start = 0.000
 inj_end   = 0.054
 inj_step  = 0.001
+
+# adaptive sweep (adaptive_sweep.py)
+# coarse grid step, a point is saturated once its latency exceeds
+# adaptive_latency_multiple times the zero-load latency
+adaptive_coarse_step      = 0.006
+adaptive_latency_multiple = 3.0
+adaptive_jobs             = 8
@@ -275,6 +275,9 @@ def define_constants(constants):
     constants.gem5_binary_fixture_name = 'gem5'
     constants.xml_filename = 'results.xml'
     constants.pickle_filename = 'results.pickle'
+    constants.timing_filename = 'timings.json'
+    constants.index_filename = 'test-index.json'
+    constants.index_runs_dirname = 'test-index-runs'
     constants.pickle_protocol = highest_pickle_protocol
 
     # The root directory which all test names will be based off of.
@@ -584,6 +587,14 @@ class RunParser(ArgParser):
         common_args.include_tags.add_to(parser)
         common_args.exclude_tags.add_to(parser)
 
+        Argument(
+            '--changed-since',
+            action='store',
+            default=None,
+            help='Only run the suites affected by the files changed since'
+                 ' this git revision (uses the test index of earlier runs).'
+        ).add_to(parser)
+
 
 class ListParser(ArgParser):
     '''
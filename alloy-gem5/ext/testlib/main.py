@@ -37,6 +37,7 @@ import log
 import query
 import result
 import runner
+import selection
 import terminal
 import uid
 
@@ -267,12 +268,15 @@ def run_schedule(test_schedule, log_handler):
 
     # Build global fixtures and exectute scheduled test suites.
     if config.config.test_threads > 1:
-        library_runner = runner.LibraryParallelRunner(test_schedule)
+        library_runner = runner.LibraryTestScheduler(test_schedule)
         library_runner.set_threads(config.config.test_threads)
     else:
         library_runner = runner.LibraryRunner(test_schedule)
     library_runner.run()
 
+    # Record what the suites exercised for --changed-since.
+    selection.update_index(test_schedule)
+
     log_handler.finish_testing()
 
 def do_run():
@@ -296,6 +300,9 @@ def do_run():
             test_schedule = load_tests().schedule
             # Filter tests based on tags
             filter_with_config_tags(test_schedule)
+            if config.config.changed_since:
+                selection.select_changed(test_schedule,
+                        config.config.changed_since)
         # Execute the tests
         run_schedule(test_schedule, log_handler)
 
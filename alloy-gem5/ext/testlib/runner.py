@@ -26,10 +26,14 @@
 #
 # Authors: Sean Wilson
 
+import json
 import multiprocessing.dummy
+import os
 import threading
+import time
 import traceback
 
+import config
 import helper
 import state
 import log
@@ -141,6 +145,56 @@ class TestRunner(RunnerPattern):
         else:
             self.testable.result = Result(Result.Passed)
 
+    def start(self):
+        '''
+        Split version of :func:`run` used by the
+        :class:`LibraryTestScheduler`. Set up the fixtures and start the
+        test in its sandbox without waiting for it, :func:`finish` has to
+        be called once :func:`done` returns True.
+        '''
+        self.sandbox = None
+        self.timer = helper.Timer()
+        try:
+            self.testable.status = Status.Building
+            self.builder.setup(self.testable)
+        except SkipException:
+            self.handle_skip(traceback.format_exc())
+        except BrokenFixtureException:
+            self.handle_error(traceback.format_exc())
+        else:
+            self.testable.status = Status.Running
+            self.sandbox = sandbox.Sandbox(TestParameters(
+                    self.testable,
+                    self.testable.parent_suite), wait=False)
+
+    def done(self):
+        return self.sandbox is None or not self.sandbox.running()
+
+    def finish(self):
+        '''
+        Collect the result of a test started with :func:`start` and tear
+        down its fixtures. Returns the wall time of the test.
+        '''
+        avoided = self.sandbox is None
+        try:
+            if not avoided:
+                self.sandbox.join()
+        except sandbox.SubprocessException:
+            self.testable.result = Result(Result.Failed,
+                    traceback.format_exc())
+        else:
+            if not avoided:
+                self.testable.result = Result(Result.Passed)
+        finally:
+            self.testable.status = Status.TearingDown
+            self.builder.teardown(self.testable)
+
+        if avoided:
+            self.testable.status = Status.Avoided
+        else:
+            self.testable.status = Status.Complete
+        return self.timer.stop()
+
 
 class SuiteRunner(RunnerPattern):
     def test(self):
@@ -168,6 +222,163 @@ class LibraryParallelRunner(RunnerPattern):
                 iter(self.testable))
 
 
+class TimingHistory(object):
+    '''
+    Wall times of the tests in previous runs, stored as JSON in the result
+    directory and keyed by test uid.
+    '''
+    def __init__(self, path):
+        self.path = path
+        self.durations = {}
+        try:
+            with open(path) as f:
+                self.durations = json.load(f)
+        except (IOError, ValueError):
+            pass
+
+    def estimate(self, test, default):
+        return self.durations.get(str(test.uid), default)
+
+    def record(self, test, duration):
+        self.durations[str(test.uid)] = duration
+
+    def save(self):
+        helper.mkdir_p(os.path.dirname(self.path))
+        # Write and rename so an interrupted run keeps the old history.
+        tmp = self.path + '.tmp'
+        with open(tmp, 'w') as f:
+            json.dump(self.durations, f, indent=2, sort_keys=True)
+        os.rename(tmp, self.path)
+
+
+class _ScheduledSuite(object):
+    '''
+    The tests of a suite which are left to run.
+
+    Tests of a suite share the suite fixtures and later tests use the
+    output of earlier ones (e.g. the verifiers of a gem5 run), so they are
+    run one at a time and in order.
+    '''
+    def __init__(self, suite, estimates):
+        self.suite = suite
+        self.runner = suite.runner(suite)
+        self.tests = list(suite)
+        self.estimates = estimates
+        self.next = 0
+        self.avoided = False
+
+    def remaining(self):
+        return sum(self.estimates[self.next:])
+
+    def setup(self):
+        '''
+        Set up the suite fixtures, returns False if the suite is avoided.
+        '''
+        try:
+            self.suite.status = Status.Building
+            self.runner.builder.setup(self.suite)
+        except SkipException:
+            self.runner.handle_skip(traceback.format_exc())
+            self.avoided = True
+        except BrokenFixtureException:
+            self.runner.handle_error(traceback.format_exc())
+            self.avoided = True
+        else:
+            self.suite.status = Status.Running
+        return not self.avoided
+
+    def teardown(self):
+        self.suite.status = Status.TearingDown
+        self.runner.builder.teardown(self.suite)
+
+        if self.avoided:
+            self.suite.status = Status.Avoided
+        else:
+            self.suite.result = compute_aggregate_result(iter(self.suite))
+            self.suite.status = Status.Complete
+
+
+class LibraryTestScheduler(RunnerPattern):
+    '''
+    Run the tests of the library on up to N processes at once.
+
+    Unlike the :class:`LibraryParallelRunner`, which hands whole suites to
+    threads, tests are dispatched one at a time: the suites with the
+    longest remaining run time (from the timing history of previous runs,
+    tests without history count as the longest) get the next free worker.
+    The global fixtures, i.e. the builds, are set up once before any test
+    is dispatched, and the suite fixtures are set up and torn down around
+    the tests of each suite.
+    '''
+    poll_interval = 0.05
+    slowest_reported = 10
+
+    def set_threads(self, threads):
+        self.threads = threads
+
+    def test(self):
+        history = TimingHistory(os.path.join(config.config.result_path,
+                config.constants.timing_filename))
+        default = max(history.durations.values() or [0.0])
+
+        waiting = []
+        for suite in self.testable:
+            scheduled = _ScheduledSuite(suite,
+                    [history.estimate(test, default) for test in suite])
+            if scheduled.tests:
+                waiting.append(scheduled)
+            elif scheduled.setup():
+                scheduled.teardown()
+
+        running = []
+        durations = []
+        while waiting or running:
+            # Longest remaining chain of tests first.
+            waiting.sort(key=_ScheduledSuite.remaining, reverse=True)
+            while waiting and len(running) < self.threads:
+                scheduled = waiting.pop(0)
+                if scheduled.next == 0 and not scheduled.setup():
+                    scheduled.teardown()
+                    continue
+                test = scheduled.tests[scheduled.next]
+                test_runner = test.runner(test)
+                test_runner.start()
+                running.append((scheduled, test_runner))
+
+            finished = [job for job in running if job[1].done()]
+            if not finished:
+                time.sleep(self.poll_interval)
+                continue
+
+            for job in finished:
+                running.remove(job)
+                scheduled, test_runner = job
+                test = test_runner.testable
+                duration = test_runner.finish()
+
+                if test.status == Status.Complete:
+                    history.record(test, duration)
+                    durations.append((duration, test.uid))
+                log.test_log.debug('%s took %.1fs' % (test.uid, duration))
+
+                scheduled.next += 1
+                if scheduled.next < len(scheduled.tests):
+                    waiting.append(scheduled)
+                else:
+                    scheduled.teardown()
+
+        history.save()
+
+        durations.sort(reverse=True)
+        if durations:
+            log.test_log.message('Slowest tests:')
+            for (duration, uid) in durations[:self.slowest_reported]:
+                log.test_log.message('  %8.1fs %s' % (duration, uid))
+
+        self.testable.result = compute_aggregate_result(
+                iter(self.testable))
+
+
 class BrokenFixtureException(Exception):
     def __init__(self, fixture, testitem, trace):
         self.fixture = fixture
@@ -168,8 +168,14 @@ class ExceptionProcess(multiprocessing.Process):
 
 
 class Sandbox(object):
-    def __init__(self, test_parameters):
-
+    def __init__(self, test_parameters, wait=True):
+        '''
+        Run the test in a child process.
+
+        :param wait: If True, wait for the test to finish (see :func:`join`).
+            Otherwise return once the test was started, the caller must
+            :func:`join` it.
+        '''
         self.params = test_parameters
         self.io_manager = IoManager(self.params.test, self.params.suite)
 
@@ -179,6 +185,19 @@ class Sandbox(object):
         self.io_manager.start_loggers()
         self.p.start()
         self.io_manager.close_parent_pipes()
+
+        if wait:
+            self.join()
+
+    def running(self):
+        return self.p.is_alive()
+
+    def join(self):
+        '''
+        Wait for the test to finish.
+
+        :raises SubprocessException: if the test failed.
+        '''
         self.p.join()
         self.io_manager.join_loggers()
 
@@ -0,0 +1,336 @@
+# Copyright (c) 2017 Mark D. Hill and David A. Wood
+# All rights reserved.
+#
+# Redistribution and use in source and binary forms, with or without
+# modification, are permitted provided that the following conditions are
+# met: redistributions of source code must retain the above copyright
+# notice, this list of conditions and the following disclaimer;
+# redistributions in binary form must reproduce the above copyright
+# notice, this list of conditions and the following disclaimer in the
+# documentation and/or other materials provided with the distribution;
+# neither the name of the copyright holders nor the names of its
+# contributors may be used to endorse or promote products derived from
+# this software without specific prior written permission.
+#
+# THIS SOFTWARE IS PROVIDED BY THE COPYRIGHT HOLDERS AND CONTRIBUTORS
+# "AS IS" AND ANY EXPRESS OR IMPLIED WARRANTIES, INCLUDING, BUT NOT
+# LIMITED TO, THE IMPLIED WARRANTIES OF MERCHANTABILITY AND FITNESS FOR
+# A PARTICULAR PURPOSE ARE DISCLAIMED. IN NO EVENT SHALL THE COPYRIGHT
+# OWNER OR CONTRIBUTORS BE LIABLE FOR ANY DIRECT, INDIRECT, INCIDENTAL,
+# SPECIAL, EXEMPLARY, OR CONSEQUENTIAL DAMAGES (INCLUDING, BUT NOT
+# LIMITED TO, PROCUREMENT OF SUBSTITUTE GOODS OR SERVICES; LOSS OF USE,
+# DATA, OR PROFITS; OR BUSINESS INTERRUPTION) HOWEVER CAUSED AND ON ANY
+# THEORY OF LIABILITY, WHETHER IN CONTRACT, STRICT LIABILITY, OR TORT
+# (INCLUDING NEGLIGENCE OR OTHERWISE) ARISING IN ANY WAY OUT OF THE USE
+# OF THIS SOFTWARE, EVEN IF ADVISED OF THE POSSIBILITY OF SUCH DAMAGE.
+
+'''
+Selection of the test suites affected by changed source files.
+
+Every run records a footprint of each suite it completed in an index in the
+result directory. A footprint holds:
+
+* file: the file which defines the suite
+* targets: the scons targets of the suite fixtures (e.g. build/RISCV/gem5.opt)
+* isas: the ISAs of the gem5 targets
+* protocols: the Ruby protocols the targets are built with
+* config: the config script gem5 was run with
+* types: the SimObject types in the config.ini of the run
+
+The targets, ISAs and protocols come from the fixtures, the config script
+and the SimObject types are recorded by the gem5 run itself (see
+:func:`record_run`). All paths are relative to the gem5 base directory.
+
+A changed source file under src/ affects the suites whose config.ini has
+one of the SimObject types declared in the directory of the file, or in
+the nearest parent directory that declares any. Protocol files only affect
+the suites built with that protocol that use Ruby, and ISA files only the
+suites of that ISA.
+
+:func:`select_changed` then keeps only the suites a list of changed files
+(usually ``git diff --name-only <rev>``) can affect. Suites without
+a footprint, and files whose effect is not known, select everything.
+'''
+
+import hashlib
+import json
+import os
+import re
+import subprocess
+
+import config
+import helper
+import log
+
+from state import Status
+
+# Files which never affect a test run.
+unrelated_prefixes = ('util/', 'brg_eval/', 'doit-flows/')
+unrelated_suffixes = ('.md', '.txt', '.pdf')
+
+# The config directories shared by all config scripts.
+shared_config_dirs = ('configs/common/', 'configs/ruby/',
+                      'configs/topologies/', 'configs/network/')
+
+# Source directories used by every simulation, and directories whose own
+# files (e.g. src/mem/packet.hh) are used by all their subdirectories.
+core_dirs = ('src/base/', 'src/sim/', 'src/python/')
+shared_src_dirs = ('src', 'src/mem', 'src/cpu', 'src/dev')
+
+_type_expr = re.compile(r"^\s+type\s*=\s*['\"](\w+)['\"]", re.MULTILINE)
+_ini_type_expr = re.compile(r'^type=(\w+)$', re.MULTILINE)
+_protocol_expr = re.compile(r"^PROTOCOL\s*=\s*['\"](\w+)['\"]", re.MULTILINE)
+
+
+def _relpath(path):
+    return os.path.relpath(os.path.abspath(path), config.config.base_dir)
+
+def _index_path():
+    return os.path.join(config.config.result_path,
+                        config.constants.index_filename)
+
+def _runs_dir():
+    return os.path.join(config.config.result_path,
+                        config.constants.index_runs_dirname)
+
+def _run_file(suite_uid):
+    return os.path.join(_runs_dir(),
+                        hashlib.sha1(str(suite_uid)).hexdigest() + '.json')
+
+
+def record_run(suite, config_script, outdir):
+    '''
+    Record the config script and the SimObject types of a gem5 run of the
+    given suite. Called from the test process, so the record is kept in
+    its own file until :func:`update_index` merges it.
+    '''
+    types = None
+    config_ini = os.path.join(outdir, 'config.ini')
+    if os.path.isfile(config_ini):
+        with open(config_ini) as f:
+            types = sorted(set(_ini_type_expr.findall(f.read())))
+
+    helper.mkdir_p(_runs_dir())
+    path = _run_file(suite.uid)
+    tmp = '%s.%d' % (path, os.getpid())
+    with open(tmp, 'w') as f:
+        json.dump({'config': _relpath(config_script), 'types': types}, f)
+    os.rename(tmp, path)
+
+
+def _build_protocol(target):
+    '''
+    The PROTOCOL a target under build/<NAME>/ is built with, from the
+    variables scons saved for the build or else from build_opts/<NAME>.
+    '''
+    parts = target.split(os.sep)
+    if len(parts) < 3 or parts[0] != 'build':
+        return None
+    for path in (os.path.join(config.config.build_dir, parts[1],
+                              'variables'),
+                 os.path.join(config.config.base_dir, 'build_opts',
+                              parts[1])):
+        if os.path.isfile(path):
+            with open(path) as f:
+                match = _protocol_expr.search(f.read())
+            if match:
+                return match.group(1)
+    return None
+
+
+def footprint(suite):
+    '''
+    The footprint of a suite as far as it is known from its fixtures.
+    '''
+    fixtures = list(suite.fixtures)
+    for test in suite:
+        fixtures.extend(test.fixtures)
+
+    targets = set()
+    isas = set()
+    for fixture in fixtures:
+        target = getattr(fixture, 'target', None)
+        if target and os.path.isabs(target):
+            targets.add(_relpath(target))
+        isa = getattr(fixture, 'isa', None)
+        if isa:
+            isas.add(isa.lower())
+
+    protocols = set(filter(None, (_build_protocol(target)
+                                  for target in targets)))
+
+    return {
+        'file': _relpath(suite.metadata.path),
+        'targets': sorted(targets),
+        'isas': sorted(isas),
+        'protocols': sorted(protocols),
+        'config': None,
+        'types': None,
+    }
+
+
+def load_index():
+    try:
+        with open(_index_path()) as f:
+            return json.load(f)
+    except (IOError, ValueError):
+        return {}
+
+
+def update_index(test_schedule):
+    '''
+    Add the footprints of the completed suites of a run to the index.
+    '''
+    index = load_index()
+    for suite in test_schedule:
+        if suite.status != Status.Complete:
+            continue
+        entry = footprint(suite)
+        run_file = _run_file(suite.uid)
+        if os.path.isfile(run_file):
+            with open(run_file) as f:
+                entry.update(json.load(f))
+            os.remove(run_file)
+        index[str(suite.uid)] = entry
+
+    helper.mkdir_p(config.config.result_path)
+    tmp = _index_path() + '.tmp'
+    with open(tmp, 'w') as f:
+        json.dump(index, f, indent=2, sort_keys=True)
+    os.rename(tmp, _index_path())
+
+
+def changed_files(revision):
+    '''
+    Files changed since the given git revision, including uncommitted and
+    untracked files, relative to the gem5 base directory.
+    '''
+    base_dir = config.config.base_dir
+    changed = subprocess.check_output(
+            ['git', 'diff', '--name-only', '--relative', revision],
+            cwd=base_dir).splitlines()
+    changed += subprocess.check_output(
+            ['git', 'ls-files', '--others', '--exclude-standard'],
+            cwd=base_dir).splitlines()
+    return sorted(set(changed))
+
+
+def simobject_dirs():
+    '''
+    Maps the directories under src/ to the SimObject types declared in
+    them.
+    '''
+    dirs = {}
+    src = os.path.join(config.config.base_dir, 'src')
+    for root, dirnames, filenames in os.walk(src):
+        for filename in filenames:
+            if not filename.endswith('.py'):
+                continue
+            with open(os.path.join(root, filename)) as f:
+                types = _type_expr.findall(f.read())
+            if types:
+                dirs.setdefault(_relpath(root), set()).update(types)
+    return dirs
+
+
+def _simobject_types(path, dirs):
+    '''
+    The SimObject types of the nearest directory of path which declares
+    any, None if only src/ itself is left (code used by everything).
+    '''
+    directory = os.path.dirname(path)
+    while directory and directory != 'src':
+        if directory in dirs:
+            return dirs[directory]
+        directory = os.path.dirname(directory)
+    return None
+
+
+def affects(path, entry, dirs):
+    '''
+    Whether a changed file can affect the suite with the given footprint.
+    '''
+    if path.startswith('tests/'):
+        # The directory of the suite (its definition and reference
+        # outputs) and the harness itself.
+        suite_dir = os.path.dirname(entry['file']) + '/'
+        return path.startswith(suite_dir) or path.count('/') <= 2
+
+    if path.startswith(unrelated_prefixes) or \
+            path.endswith(unrelated_suffixes):
+        return False
+
+    if path.startswith('build_opts/'):
+        build = path.split('/')[1]
+        return any(target.split('/')[1] == build
+                   for target in entry['targets'])
+
+    if path.startswith('configs/'):
+        script = entry['config']
+        if script is None:
+            return True
+        if not script.startswith('configs/'):
+            return False
+        return path == script or \
+               path.startswith(shared_config_dirs) or \
+               os.path.dirname(path) == os.path.dirname(script)
+
+    if path.startswith('src/arch/'):
+        parts = path.split('/')
+        if len(parts) < 4:
+            return True
+        return parts[2] in entry['isas']
+
+    if path.startswith('src/mem/protocol/'):
+        name = os.path.basename(path)
+        protocol = re.split(r'[-.]', name)[0]
+        if protocol not in entry['protocols'] and \
+                not name.startswith(('RubySlicc', 'SCons')):
+            return False
+        return entry['types'] is None or 'RubySystem' in entry['types']
+
+    if path.startswith('src/mem/slicc/'):
+        return entry['types'] is None or 'RubySystem' in entry['types']
+
+    if path.startswith(core_dirs) or \
+            os.path.dirname(path) in shared_src_dirs:
+        return True
+
+    if path.startswith('src/'):
+        types = _simobject_types(path, dirs)
+        if types is None or entry['types'] is None:
+            return True
+        return bool(types & set(entry['types']))
+
+    # SConstruct, site_scons, ext/ and anything else which is built into
+    # every binary.
+    return True
+
+
+def select_changed(test_schedule, revision):
+    '''
+    Remove the suites of the schedule which cannot be affected by the files
+    changed since the given git revision.
+    '''
+    changed = changed_files(revision)
+    index = load_index()
+    dirs = simobject_dirs()
+
+    selected = []
+    for suite in test_schedule.suites:
+        entry = index.get(str(suite.uid))
+        if entry is None:
+            log.test_log.debug('%s: not in the index' % suite.uid)
+            selected.append(suite)
+            continue
+        causes = [path for path in changed if affects(path, entry, dirs)]
+        if causes:
+            log.test_log.debug('%s: affected by %s'
+                               % (suite.uid, ', '.join(causes)))
+            selected.append(suite)
+
+    log.test_log.message('Selected %d of %d suites affected by %d files'
+                         ' changed since %s' % (len(selected),
+                                                len(test_schedule.suites),
+                                                len(changed), revision))
+    test_schedule.suites = selected
@@ -37,8 +37,12 @@
 
 import os
 import sys
+import json
+import time
+import hashlib
 import argparse
 import subprocess
+import multiprocessing
 import math
 
 from multiprocessing import Pool
@@ -55,6 +59,38 @@ def execute(cmd):
   except subprocess.CalledProcessError, err:
     print "ERROR: " + err.output
 
+#-------------------------------------------------------------------------
+# utility function to hash a file
+#-------------------------------------------------------------------------
+def file_hash(path):
+  h = hashlib.sha1()
+  with open(path, 'rb') as f:
+    for chunk in iter(lambda: f.read(1 << 20), b''):
+      h.update(chunk)
+  return h.hexdigest()
+
+#-------------------------------------------------------------------------
+# utility function to hash the python files of a config directory
+#-------------------------------------------------------------------------
+def dir_hash(path):
+  h = hashlib.sha1()
+  for f in sorted(os.listdir(path)):
+    if f.endswith('.py'):
+      h.update(f)
+      h.update(file_hash(os.path.join(path, f)))
+  return h.hexdigest()
+
+#-------------------------------------------------------------------------
+# run a single test, called in the pool workers
+#-------------------------------------------------------------------------
+def run_job(job):
+  name, cmd, outdir = job
+  if not os.path.isdir(outdir):
+    os.makedirs(outdir)
+  start = time.time()
+  returncode = subprocess.call(cmd)
+  return name, returncode, time.time() - start
+
 #-------------------------------------------------------------------------
 # Input options
 #-------------------------------------------------------------------------
@@ -88,6 +124,23 @@ parser.add_argument('--ruby',
 parser.add_argument('--serial',
                     help = 'Run all tests serially?',
                     action = 'store_true')
+parser.add_argument('-j', '--jobs',
+                    help = 'number of tests to run in parallel',
+                    type = int,
+                    default = multiprocessing.cpu_count())
+parser.add_argument('--cpu-models',
+                    help = 'comma separated list of CPU models to test',
+                    default = 'AtomicSimpleCPU,TimingSimpleCPU,IOCPU,'
+                              'DerivO3CPU')
+parser.add_argument('--gem5-bin',
+                    help = 'gem5 binary to test',
+                    default = os.path.join('build', 'RISCV', 'gem5.opt'))
+parser.add_argument('--no-cache',
+                    help = 'rerun tests whose result is cached',
+                    action = 'store_true')
+parser.add_argument('--retry-failed',
+                    help = 'rerun tests whose cached result is a failure',
+                    action = 'store_true')
 
 args = parser.parse_args()
 
@@ -95,56 +148,78 @@ args = parser.parse_args()
 args.test_dir = os.path.abspath(args.test_dir)
 args.test_out = os.path.abspath(args.test_out)
 test_summary_out = args.test_out + '/test-summary.out'
+test_summary_json = args.test_out + '/test-summary.json'
+test_cache = args.test_out + '/test-cache.json'
 
 #-------------------------------------------------------------------------
 # gem5 variables
 #-------------------------------------------------------------------------
 gem5_dir = os.path.abspath('./')
-gem5_bin = os.path.join(gem5_dir, 'build', 'RISCV', 'gem5.opt')
+gem5_bin = os.path.abspath(args.gem5_bin)
 config = os.path.join(gem5_dir, 'configs', 'brg', 'example.py')
 
 # list of CPU models to be tested
-cpu_models = ['AtomicSimpleCPU',
-              'TimingSimpleCPU',
-              'IOCPU',
-              'DerivO3CPU']
+cpu_models = args.cpu_models.split(',')
 
 # get a list of test binaries in the given directory
-tests = []
-for line in execute("ls %s/*" % (args.test_dir)).splitlines():
-  if line:
-    tests.append(line.split('/')[-1])
+tests = sorted(f for f in os.listdir(args.test_dir)
+               if os.path.isfile(os.path.join(args.test_dir, f)))
 
 # total number of tests to run
 n_tests = len(tests) * len(cpu_models)
 
 # make test-out directory
-execute('mkdir -p %s' % (args.test_out))
+if not os.path.isdir(args.test_out):
+  os.makedirs(args.test_out)
+
+#-------------------------------------------------------------------------
+# result cache
+#-------------------------------------------------------------------------
+# A test is skipped if it already ran with the same gem5 binary, test
+# binary, config scripts, CPU model and options. Runs killed by a signal
+# are not cached, and cached failures are rerun with --retry-failed.
+
+cache = {}
+if not args.no_cache and os.path.isfile(test_cache):
+  with open(test_cache) as f:
+    cache = json.load(f)
+
+gem5_hash = file_hash(gem5_bin)
+test_hashes = dict((test, file_hash(os.path.join(args.test_dir, test)))
+                   for test in tests)
+config_hash = [file_hash(config),
+               dir_hash(os.path.join(gem5_dir, 'configs', 'common'))]
+
+def cache_key(test, model, cmd_opts):
+  key = json.dumps([gem5_hash, test_hashes[test], config_hash, model,
+                    cmd_opts])
+  return hashlib.sha1(key).hexdigest()
 
 # make a list of jobs
-job_cmds = []
-job_names = []
+jobs = []
+keys = {}
+results = {}
 for test in tests:
   for model in cpu_models:
     test_name = test + '-' + model
-    job_names.append(test_name)
+    outdir = os.path.join(args.test_out, test_name)
+    cmd_opts = ['-m', str(args.max_tick),
+                '--cpu-type', model,
+                '-n', str(args.num_cpus),
+                '--nthreads-per-cpu', str(args.nthreads_per_cpu),
+                '--ruby' if args.ruby and model != 'AtomicSimpleCPU' \
+                         else '--caches',
+               ]
     cmd = [gem5_bin,
-           '--outdir', args.test_out,
+           '--outdir', outdir,
            '--redirect-stdout',
            '--redirect-stderr',
            '--stdout-file', '%s.out' % (test_name),
            '--stderr-file', '%s.err' % (test_name),
            '--listener-mode', 'off',
            '--quiet',
-           config,
-           '-m', str(args.max_tick),
-           '--cpu-type', model,
-           '-n', str(args.num_cpus),
-           '--nthreads-per-cpu', str(args.nthreads_per_cpu),
-           '-c', args.test_dir + '/' + test,
-           '--ruby' if args.ruby and model != 'AtomicSimpleCPU' \
-                    else '--caches',
-          ]
+           config] + cmd_opts + \
+          ['-c', args.test_dir + '/' + test]
 
 #    if args.ruby:
 #      num_rows = int(math.floor(math.sqrt(args.num_cpus)))
@@ -152,33 +227,85 @@ for test in tests:
 #                   '--mesh-rows', str( num_rows ),
 #                   '--num-dirs', str(args.num_cpus)]
 
-    job_cmds.append(cmd)
+    keys[test_name] = cache_key(test, model, cmd_opts)
+    cached = cache.get(keys[test_name])
+    if cached and not (args.retry_failed and cached['returncode']):
+      results[test_name] = dict(cache[keys[test_name]], cached = True)
+    else:
+      jobs.append((test_name, cmd, outdir))
 
-if args.serial:
-  # execute jobs one by one
-  for cmd in job_cmds:
-    print(cmd)
-    subprocess.call(cmd)
-else:
-  # execute all jobs in parallel
-  job_pool = Pool(processes = n_tests)
-  job_outputs = job_pool.map(subprocess.call, job_cmds)
-  job_pool.close()
+print "%d tests, %d cached, running %d" % (n_tests, n_tests - len(jobs),
+                                           len(jobs))
 
-# process job outputs
-file = open(test_summary_out, "w")
+#-------------------------------------------------------------------------
+# run jobs
+#-------------------------------------------------------------------------
 
-job_outputs = zip(job_names, job_outputs)
-for entry in job_outputs:
+def describe(returncode):
   # a negative return value indicates that the job was terminated
   # by a signal
   # a positive return value indicates that the job exited with a return
   # value
-  if entry[1] < 0:
-    file.write("%-50s failed - signal = %d\n" % (entry[0], -1 * entry[1]))
-  elif entry[1] > 0:
-    file.write("%-50s failed - status = %d\n" % (entry[0], entry[1]))
+  if returncode < 0:
+    return "failed - signal = %d" % (-1 * returncode)
+  elif returncode > 0:
+    return "failed - status = %d" % (returncode)
   else:
-    file.write("%-50s passed\n" % (entry[0]))
+    return "passed"
+
+def save_cache():
+  tmp = test_cache + '.tmp'
+  with open(tmp, 'w') as f:
+    json.dump(cache, f, indent = 2, sort_keys = True)
+  os.rename(tmp, test_cache)
+
+if args.serial:
+  args.jobs = 1
+
+job_pool = Pool(processes = max(1, min(args.jobs, len(jobs))))
+
+# print and cache the results as they complete
+start = time.time()
+done = 0
+for (test_name, returncode, elapsed) in \
+    job_pool.imap_unordered(run_job, jobs):
+  result = { 'returncode' : returncode,
+             'status'     : describe(returncode),
+             'time'       : elapsed }
+  results[test_name] = dict(result, cached = False)
+  if returncode >= 0:
+    cache[keys[test_name]] = result
+    save_cache()
+  done += 1
+  print "[%d/%d] %-50s %s (%.1fs)" % (done, len(jobs), test_name,
+                                      result['status'], elapsed)
+  sys.stdout.flush()
 
+job_pool.close()
+job_pool.join()
+
+#-------------------------------------------------------------------------
+# process job outputs
+#-------------------------------------------------------------------------
+
+file = open(test_summary_out, "w")
+for test_name in sorted(results):
+  file.write("%-50s %s\n" % (test_name, results[test_name]['status']))
 file.close()
+
+failed = sorted(name for name in results if results[name]['returncode'])
+
+with open(test_summary_json, "w") as f:
+  json.dump({ 'gem5'     : gem5_bin,
+              'gem5_hash': gem5_hash,
+              'tests'    : n_tests,
+              'ran'      : len(jobs),
+              'passed'   : n_tests - len(failed),
+              'failed'   : failed,
+              'time'     : time.time() - start,
+              'results'  : results }, f, indent = 2, sort_keys = True)
+
+print "%d passed, %d failed, see %s" % (n_tests - len(failed), len(failed),
+                                        test_summary_out)
+if failed:
+  sys.exit(1)
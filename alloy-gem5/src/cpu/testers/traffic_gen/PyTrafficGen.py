@@ -52,6 +52,16 @@ class PyTrafficGen(BaseTrafficGen):
         """
         pass
 
+    @cxxMethod
+    def startPhases(self, table):
+        """
+        Start generating traffic using a phase table, a two-dimensional
+        array with one row per generator instance (see
+        configs/common/TrafficPhases.py). All generators are created in
+        C++ without calling back into Python.
+        """
+        pass
+
     cxx_exports = [
         PyBindMethod("createIdle"),
         PyBindMethod("createExit"),
@@ -46,20 +46,108 @@
 namespace py = pybind11;
 
 PyTrafficGen::PyTrafficGen(const PyTrafficGenParams *p)
-    : BaseTrafficGen(p)
+    : BaseTrafficGen(p), nextPhase(0)
 {
 }
 
 void
 PyTrafficGen::start(pybind11::object meta_generator)
 {
+    phases.clear();
+    nextPhase = 0;
     metaGenerator = meta_generator.begin();
     BaseTrafficGen::start();
 }
 
+void
+PyTrafficGen::startPhases(PhaseTable table)
+{
+    if (table.ndim() != 2 || table.shape(1) != NUM_PHASE_COLUMNS) {
+        fatal("%s: A phase table needs %d columns\n", name(),
+              NUM_PHASE_COLUMNS);
+    }
+
+    const uint64_t *data = table.data();
+    phases.assign(data, data + table.size());
+    nextPhase = 0;
+    metaGenerator = py::iterator();
+
+    DPRINTF(TrafficGen, "Starting %d phases.\n", table.shape(0));
+    BaseTrafficGen::start();
+}
+
+std::shared_ptr<BaseGen>
+PyTrafficGen::createPhase(const uint64_t *row)
+{
+    const uint64_t type = row[PHASE_TYPE];
+    const Tick duration = row[PHASE_DURATION];
+
+    switch (type) {
+      case PHASE_IDLE:
+        return createIdle(duration);
+      case PHASE_EXIT:
+        return createExit(duration);
+      default:
+        break;
+    }
+
+    fatal_if(type >= NUM_PHASE_TYPES, "%s: Phase %d has an unknown type "
+             "%d\n", name(), nextPhase - 1, type);
+    fatal_if(row[PHASE_READ_PERCENT] > 100, "%s: Phase %d has a read "
+             "percentage above 100\n", name(), nextPhase - 1);
+
+    const Addr start_addr = row[PHASE_START_ADDR];
+    const Addr end_addr = row[PHASE_END_ADDR];
+    const Addr blocksize = row[PHASE_BLOCKSIZE];
+    const Tick min_period = row[PHASE_MIN_PERIOD];
+    const Tick max_period = row[PHASE_MAX_PERIOD];
+    const uint8_t read_percent = row[PHASE_READ_PERCENT];
+    const Addr data_limit = row[PHASE_DATA_LIMIT];
+
+    switch (type) {
+      case PHASE_LINEAR:
+        return createLinear(duration, start_addr, end_addr, blocksize,
+                            min_period, max_period, read_percent,
+                            data_limit);
+      case PHASE_RANDOM:
+        return createRandom(duration, start_addr, end_addr, blocksize,
+                            min_period, max_period, read_percent,
+                            data_limit);
+      case PHASE_DRAM:
+        return createDram(duration, start_addr, end_addr, blocksize,
+                          min_period, max_period, read_percent, data_limit,
+                          row[PHASE_NUM_SEQ_PKTS], row[PHASE_PAGE_SIZE],
+                          row[PHASE_NBR_OF_BANKS_DRAM],
+                          row[PHASE_NBR_OF_BANKS_UTIL],
+                          row[PHASE_ADDR_MAPPING],
+                          row[PHASE_NBR_OF_RANKS]);
+      default:
+        return createDramRot(duration, start_addr, end_addr, blocksize,
+                             min_period, max_period, read_percent,
+                             data_limit,
+                             row[PHASE_NUM_SEQ_PKTS], row[PHASE_PAGE_SIZE],
+                             row[PHASE_NBR_OF_BANKS_DRAM],
+                             row[PHASE_NBR_OF_BANKS_UTIL],
+                             row[PHASE_ADDR_MAPPING],
+                             row[PHASE_NBR_OF_RANKS],
+                             row[PHASE_MAX_SEQ_COUNT_PER_RANK]);
+    }
+}
+
 std::shared_ptr<BaseGen>
 PyTrafficGen::nextGenerator()
 {
+    if (!phases.empty()) {
+        if (nextPhase * NUM_PHASE_COLUMNS >= phases.size()) {
+            DPRINTF(TrafficGen, "No more phases available.\n");
+            return std::shared_ptr<BaseGen>();
+        }
+
+        const uint64_t *row = &phases[nextPhase * NUM_PHASE_COLUMNS];
+        ++nextPhase;
+        return createPhase(row);
+    }
+
     if (!metaGenerator)
         return std::shared_ptr<BaseGen>();
 
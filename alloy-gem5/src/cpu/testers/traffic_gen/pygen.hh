@@ -40,8 +40,11 @@
 #ifndef __CPU_TRAFFIC_GEN_PYGEN_HH__
 #define __CPU_TRAFFIC_GEN_PYGEN_HH__
 
+#include "pybind11/numpy.h"
 #include "pybind11/pybind11.h"
 
+#include <vector>
+
 #include "cpu/testers/traffic_gen/base.hh"
 #include "cpu/testers/traffic_gen/base_gen.hh"
 
@@ -53,14 +56,72 @@ class M5_LOCAL PyTrafficGen : public BaseTrafficGen
     PyTrafficGen(const PyTrafficGenParams* p);
     ~PyTrafficGen() {}
 
+  public: // Phase tables
+    /** Generator type of a phase, in the type column of a phase table */
+    enum PhaseType {
+        PHASE_IDLE,
+        PHASE_EXIT,
+        PHASE_LINEAR,
+        PHASE_RANDOM,
+        PHASE_DRAM,
+        PHASE_DRAM_ROT,
+        NUM_PHASE_TYPES
+    };
+
+    /**
+     * Columns of a phase table. The columns after PHASE_TYPE are the
+     * arguments of the matching create method, columns a generator
+     * does not use are ignored.
+     */
+    enum PhaseColumn {
+        PHASE_TYPE,
+        PHASE_DURATION,
+        PHASE_START_ADDR,
+        PHASE_END_ADDR,
+        PHASE_BLOCKSIZE,
+        PHASE_MIN_PERIOD,
+        PHASE_MAX_PERIOD,
+        PHASE_READ_PERCENT,
+        PHASE_DATA_LIMIT,
+        PHASE_NUM_SEQ_PKTS,
+        PHASE_PAGE_SIZE,
+        PHASE_NBR_OF_BANKS_DRAM,
+        PHASE_NBR_OF_BANKS_UTIL,
+        PHASE_ADDR_MAPPING,
+        PHASE_NBR_OF_RANKS,
+        PHASE_MAX_SEQ_COUNT_PER_RANK,
+        NUM_PHASE_COLUMNS
+    };
+
+    typedef pybind11::array_t<uint64_t, pybind11::array::c_style |
+                              pybind11::array::forcecast> PhaseTable;
+
   public: // Python API
     void start(pybind11::object meta_generator);
 
+    /**
+     * Start generating traffic from a phase table, a two-dimensional
+     * array with one row per phase and the columns in PhaseColumn
+     * order. The table is copied, and the generator of each phase is
+     * created when the previous one ends without calling into Python.
+     */
+    void startPhases(PhaseTable table);
+
   protected: // BaseTrafficGen
     std::shared_ptr<BaseGen> nextGenerator() override;
 
+  protected:
+    /** Create the generator of a row of the phase table */
+    std::shared_ptr<BaseGen> createPhase(const uint64_t *row);
+
   protected: // Internal state
     pybind11::iterator metaGenerator;
+
+    /** Phase table in row-major order, empty if not started from one */
+    std::vector<uint64_t> phases;
+
+    /** Index of the next phase to create */
+    size_t nextPhase;
 };
 
 #endif //__CPU_TRAFFIC_GEN_PYGEN_HH__
@@ -41,6 +41,7 @@
 
 #include <fcntl.h>
 #include <sys/mman.h>
+#include <sys/stat.h>
 #include <sys/types.h>
 #include <sys/user.h>
 #include <unistd.h>
@@ -49,9 +50,11 @@
 #include <cerrno>
 #include <climits>
 #include <cstdio>
+#include <functional>
 #include <iostream>
 #include <string>
 
+#include "base/cprintf.hh"
 #include "base/trace.hh"
 #include "debug/AddrRanges.hh"
 #include "debug/Checkpoint.hh"
@@ -73,8 +76,11 @@ using namespace std;
 
 PhysicalMemory::PhysicalMemory(const string& _name,
                                const vector<AbstractMemory*>& _memories,
-                               bool mmap_using_noreserve) :
-    _name(_name), size(0), mmapUsingNoReserve(mmap_using_noreserve)
+                               bool mmap_using_noreserve,
+                               bool shared_memory_image,
+                               const string& memory_image_dir) :
+    _name(_name), size(0), mmapUsingNoReserve(mmap_using_noreserve),
+    sharedMemoryImage(shared_memory_image), memoryImageDir(memory_image_dir)
 {
     if (mmap_using_noreserve)
         warn("Not reserving swap space. May cause SIGSEGV on actual usage\n");
@@ -407,11 +413,6 @@ PhysicalMemory::unserializeStore(CheckpointIn &cp)
     UNSERIALIZE_SCALAR(filename);
     string filepath = cp.cptDir + "/" + filename;
 
-    // mmap memoryfile
-    gzFile compressed_mem = gzopen(filepath.c_str(), "rb");
-    if (compressed_mem == NULL)
-        fatal("Can't open physical memory checkpoint file '%s'", filename);
-
     // we've already got the actual backing store mapped
     uint8_t* pmem = backingStore[store_id].pmem;
     AddrRange range = backingStore[store_id].range;
@@ -426,6 +427,16 @@ PhysicalMemory::unserializeStore(CheckpointIn &cp)
         fatal("Memory range size has changed! Saw %lld, expected %lld\n",
               range_size, range.size());
 
+    if (sharedMemoryImage) {
+        mapMemoryImage(cp, filename, pmem, range.size());
+        return;
+    }
+
+    // mmap memoryfile
+    gzFile compressed_mem = gzopen(filepath.c_str(), "rb");
+    if (compressed_mem == NULL)
+        fatal("Can't open physical memory checkpoint file '%s'", filename);
+
     uint64_t curr_size = 0;
     long* temp_page = new long[chunk_size];
     long* pmem_current;
@@ -454,3 +465,126 @@ PhysicalMemory::unserializeStore(CheckpointIn &cp)
         fatal("Close failed on physical memory checkpoint file '%s'\n",
               filename);
 }
+
+void
+PhysicalMemory::createMemoryImage(const string& gz_path, const string& image,
+                                  uint64_t size) const
+{
+    const uint32_t chunk_size = 1 << 20;
+    const uint32_t page_size = 1 << 12;
+
+    gzFile compressed_mem = gzopen(gz_path.c_str(), "rb");
+    if (compressed_mem == NULL)
+        fatal("Can't open physical memory checkpoint file '%s'", gz_path);
+
+    // write a private file and rename it once complete, so concurrent
+    // restores never map a partial image
+    string tmp = csprintf("%s.%d", image, getpid());
+    int fd = open(tmp.c_str(), O_WRONLY | O_CREAT | O_TRUNC, 0644);
+    if (fd < 0) {
+        perror("open");
+        fatal("Can't create memory image '%s'\n", tmp);
+    }
+    if (ftruncate(fd, size) != 0) {
+        perror("ftruncate");
+        fatal("Can't size memory image '%s'\n", tmp);
+    }
+
+    uint8_t* buf = new uint8_t[chunk_size];
+    uint64_t curr_size = 0;
+    int bytes_read;
+    while (curr_size < size &&
+           (bytes_read = gzread(compressed_mem, buf, chunk_size)) > 0) {
+        for (uint32_t p = 0; p < (uint32_t)bytes_read; p += page_size) {
+            uint32_t len = min(page_size, (uint32_t)bytes_read - p);
+            bool zero = true;
+            for (uint32_t x = 0; x < len && zero; ++x)
+                zero = buf[p + x] == 0;
+            if (zero)
+                continue;
+            if (pwrite(fd, buf + p, len, curr_size + p) != (ssize_t)len) {
+                perror("pwrite");
+                fatal("Write failed on memory image '%s'\n", tmp);
+            }
+        }
+        curr_size += bytes_read;
+    }
+    delete[] buf;
+
+    if (bytes_read < 0)
+        fatal("Read failed on physical memory checkpoint file '%s'\n",
+              gz_path);
+    if (gzclose(compressed_mem))
+        fatal("Close failed on physical memory checkpoint file '%s'\n",
+              gz_path);
+
+    if (close(fd) != 0 || rename(tmp.c_str(), image.c_str()) != 0) {
+        perror("rename");
+        fatal("Can't create memory image '%s'\n", image);
+    }
+}
+
+void
+PhysicalMemory::mapMemoryImage(CheckpointIn &cp, const string& filename,
+                               uint8_t* pmem, uint64_t size)
+{
+    string gz_path = cp.cptDir + "/" + filename;
+    string image = gz_path + ".raw";
+
+    // images of different checkpoints share a directory, name them after
+    // the checkpoint file they are made from
+    if (!memoryImageDir.empty()) {
+        struct stat st;
+        if (stat(gz_path.c_str(), &st) != 0)
+            fatal("Can't open physical memory checkpoint file '%s'",
+                  filename);
+        size_t key = hash<string>()(csprintf("%s:%d:%d", gz_path,
+                                             st.st_size, st.st_mtime));
+        image = csprintf("%s/%s.%016x.raw", memoryImageDir, filename, key);
+    }
+
+    int fd = open(image.c_str(), O_RDONLY);
+
+    // the default image is named after the checkpoint file only, so it is
+    // stale if the checkpoint was taken again after it was made
+    struct stat gz_st, image_st;
+    if (fd >= 0 && memoryImageDir.empty() &&
+        stat(gz_path.c_str(), &gz_st) == 0 &&
+        fstat(fd, &image_st) == 0 && image_st.st_mtime < gz_st.st_mtime) {
+        DPRINTF(Checkpoint, "Memory image %s is older than %s\n", image,
+                filename);
+        close(fd);
+        fd = -1;
+    }
+
+    if (fd < 0) {
+        DPRINTF(Checkpoint, "Creating memory image %s\n", image);
+        createMemoryImage(gz_path, image, size);
+        fd = open(image.c_str(), O_RDONLY);
+        if (fd < 0) {
+            perror("open");
+            fatal("Can't open memory image '%s'\n", image);
+        }
+    }
+
+    struct stat st;
+    if (fstat(fd, &st) != 0 || (uint64_t)st.st_size != size)
+        fatal("Memory image '%s' does not match the size %lld of %s\n",
+              image, size, filename);
+
+    DPRINTF(Checkpoint, "Mapping memory image %s\n", image);
+
+    // replace the anonymous backing store in place, so the memories keep
+    // their pointers to it
+    int map_flags = MAP_PRIVATE | MAP_FIXED;
+    if (mmapUsingNoReserve)
+        map_flags |= MAP_NORESERVE;
+
+    if (mmap(pmem, size, PROT_READ | PROT_WRITE, map_flags, fd, 0) !=
+        (void*)pmem) {
+        perror("mmap");
+        fatal("Could not mmap memory image '%s'\n", image);
+    }
+
+    close(fd);
+}
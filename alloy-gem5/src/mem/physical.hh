@@ -129,6 +129,13 @@ class PhysicalMemory : public Serializable
     // Let the user choose if we reserve swap space when calling mmap
     const bool mmapUsingNoReserve;
 
+    // Restore the backing stores by mapping uncompressed images of the
+    // checkpointed memory copy-on-write
+    const bool sharedMemoryImage;
+
+    // Where the uncompressed images live, the checkpoint directory if empty
+    const std::string memoryImageDir;
+
     // The physical memory used to provide the memory in the simulated
     // system
     std::vector<BackingStoreEntry> backingStore;
@@ -153,6 +160,31 @@ class PhysicalMemory : public Serializable
                             bool conf_table_reported,
                             bool in_addr_map, bool kvm_map);
 
+    /**
+     * Decompress a checkpointed backing store into an uncompressed
+     * image. Zero pages are not written, so the image is sparse.
+     *
+     * @param gz_path The compressed checkpoint file
+     * @param image The image to create
+     * @param size The size of the backing store
+     */
+    void createMemoryImage(const std::string& gz_path,
+                           const std::string& image, uint64_t size) const;
+
+    /**
+     * Replace a backing store with a private mapping of the uncompressed
+     * image of a checkpointed store, creating the image if needed. All
+     * processes mapping the same image share the pages none of them has
+     * written.
+     *
+     * @param cp The checkpoint being restored
+     * @param filename The name of the checkpointed store
+     * @param pmem The backing store to replace
+     * @param size The size of the backing store
+     */
+    void mapMemoryImage(CheckpointIn &cp, const std::string& filename,
+                        uint8_t* pmem, uint64_t size);
+
   public:
 
     /**
@@ -160,7 +192,9 @@ class PhysicalMemory : public Serializable
      */
     PhysicalMemory(const std::string& _name,
                    const std::vector<AbstractMemory*>& _memories,
-                   bool mmap_using_noreserve);
+                   bool mmap_using_noreserve,
+                   bool shared_memory_image = false,
+                   const std::string& memory_image_dir = "");
 
     /**
      * Unmap all the backing store we have used.
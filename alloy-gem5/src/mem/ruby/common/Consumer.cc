@@ -41,8 +41,10 @@ Consumer::scheduleEventAbsolute(Tick evt_time)
 {
     if (!alreadyScheduled(evt_time)) {
         // This wakeup is not redundant
+        if (m_wakeup_name.empty())
+            m_wakeup_name = em->name() + ".wakeup";
         auto *evt = new EventFunctionWrapper(
-            [this]{ wakeup(); }, "Consumer Event", true);
+            [this]{ wakeup(); }, m_wakeup_name, true);
 
         em->schedule(evt, evt_time);
         insertScheduledWakeupTime(evt_time);
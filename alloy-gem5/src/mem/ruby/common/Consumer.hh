@@ -37,6 +37,7 @@
 
 #include <iostream>
 #include <set>
+#include <string>
 
 #include "sim/clocked_object.hh"
 
@@ -76,6 +77,9 @@ class Consumer
   private:
     std::set<Tick> m_scheduled_wakeups;
     ClockedObject *em;
+
+    // Name of the wakeup events, the name of the consumer's clocked object
+    std::string m_wakeup_name;
 };
 
 inline std::ostream&
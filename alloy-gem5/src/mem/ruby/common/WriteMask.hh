@@ -101,6 +101,18 @@ class WriteMask
         return tmp;
     }
 
+    bool
+    testAny(int offset, int len) const
+    {
+        assert(mSize >= (offset + len));
+        for (int i = 0; i < len; i++) {
+            if (mMask[offset + i]) {
+                return true;
+            }
+        }
+        return false;
+    }
+
     bool
     isOverlap(const WriteMask &readMask) const
     {
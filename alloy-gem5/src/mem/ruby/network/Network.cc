@@ -69,7 +69,8 @@ Network::Network(const Params *p)
     assert(m_virtual_networks != 0);
 
     m_topology_ptr = new Topology(p->routers.size(), p->ext_links,
-                                  p->int_links, m_is_active_msg_network);
+                                  p->int_links, m_is_active_msg_network,
+                                  p->routing_cache_dir);
 
     // Allocate to and from queues
     // Queues that are getting messages from protocol
@@ -57,3 +57,5 @@ class RubyNetwork(ClockedObject):
     master = VectorMasterPort("CPU master port")
 
     is_active_msg_network = Param.Bool(False)
+    routing_cache_dir = Param.String("", "directory to cache the routing "
+        "tables in, keyed by a hash of the topology. Empty to disable.")
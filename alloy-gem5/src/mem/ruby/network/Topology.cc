@@ -28,8 +28,16 @@
 
 #include "mem/ruby/network/Topology.hh"
 
+#include <unistd.h>
+
 #include <cassert>
+#include <cstdio>
+#include <fstream>
+#include <queue>
+#include <sstream>
 
+#include "base/cprintf.hh"
+#include "base/logging.hh"
 #include "base/trace.hh"
 #include "debug/RubyNetwork.hh"
 #include "mem/ruby/common/NetDest.hh"
@@ -51,10 +59,12 @@ const int INFINITE_LATENCY = 10000; // Yes, this is a big hack
 Topology::Topology(uint32_t num_routers,
                    const vector<BasicExtLink *> &ext_links,
                    const vector<BasicIntLink *> &int_links,
-                   bool is_active_msg_network)
+                   bool is_active_msg_network,
+                   const string &routing_cache_dir)
     : m_nodes(ext_links.size()), m_number_of_switches(num_routers),
       m_ext_link_vector(ext_links), m_int_link_vector(int_links),
-      m_is_active_msg_network(is_active_msg_network)
+      m_is_active_msg_network(is_active_msg_network),
+      m_routing_cache_dir(routing_cache_dir)
 {
     // Total nodes/controllers in network
     assert(m_nodes > 1);
@@ -117,45 +127,40 @@ Topology::createLinks(Network *net)
         max_switch_id = max(max_switch_id, src_dest.first);
         max_switch_id = max(max_switch_id, src_dest.second);
     }
-
-    // Initialize weight, latency, and inter switched vectors
     int num_switches = max_switch_id+1;
-    Matrix topology_weights(num_switches,
-            vector<int>(num_switches, INFINITE_LATENCY));
-    Matrix component_latencies(num_switches,
-            vector<int>(num_switches, -1));
-    Matrix component_inter_switches(num_switches,
-            vector<int>(num_switches, 0));
-
-    // Set identity weights to zero
-    for (int i = 0; i < topology_weights.size(); i++) {
-        topology_weights[i][i] = 0;
-    }
 
-    // Fill in the topology weights and bandwidth multipliers
+    // The links that get a routing table, in the order they are made
+    vector<LinkMap::const_iterator> links;
     for (LinkMap::const_iterator i = m_link_map.begin();
          i != m_link_map.end(); ++i) {
-        std::pair<int, int> src_dest = (*i).first;
-        BasicLink* link = (*i).second.link;
-        int src = src_dest.first;
-        int dst = src_dest.second;
-        component_latencies[src][dst] = link->m_latency;
-        topology_weights[src][dst] = link->m_weight;
+        int weight = (*i).second.link->m_weight;
+        if (weight > 0 && weight != INFINITE_LATENCY) {
+            links.push_back(i);
+        }
+    }
+
+    vector<Destination> destinations = getDestinations();
+    vector<vector<int> > routes;
+    uint64_t key = routingKey(num_switches, destinations);
+
+    if (!loadRoutes(key, links, routes)) {
+        computeRoutes(num_switches, destinations, links, routes);
+        saveRoutes(key, links, routes);
     }
 
     // Walk topology and hookup the links
-    Matrix dist = shortest_path(topology_weights, component_latencies,
-                                component_inter_switches);
-
-    for (int i = 0; i < topology_weights.size(); i++) {
-        for (int j = 0; j < topology_weights[i].size(); j++) {
-            int weight = topology_weights[i][j];
-            if (weight > 0 && weight != INFINITE_LATENCY) {
-                NetDest destination_set =
-                        shortest_path_to_node(i, j, topology_weights, dist);
-                makeLink(net, i, j, destination_set);
-            }
+    for (int l = 0; l < links.size(); l++) {
+        NetDest destination_set = m_is_active_msg_network ? NetDest(true)
+                                                          : NetDest();
+        for (int d : routes[l]) {
+            destination_set.add(destinations[d].machine);
         }
+
+        SwitchID src = (*links[l]).first.first;
+        SwitchID next = (*links[l]).first.second;
+        DPRINTF(RubyNetwork, "Routing table of link src: %d, next: %d, "
+                "result: %s\n", src, next, destination_set);
+        makeLink(net, src, next, destination_set);
     }
 }
 
@@ -216,122 +221,205 @@ Topology::makeLink(Network *net, SwitchID src, SwitchID dest,
     }
 }
 
-// The following all-pairs shortest path algorithm is based on the
-// discussion from Cormen et al., Chapter 26.1.
+vector<Topology::Destination>
+Topology::getDestinations() const
+{
+    // The "destination" switches for the machines are numbered
+    // [max_machines...2*max_machines-1] for the component network
+    vector<Destination> destinations;
+
+    if (m_is_active_msg_network) {
+        int max_machines = NetworkAdapter::getNumControllers();
+        int m = MachineType_NetworkAdapter;
+
+        for (NodeID i = 0; i < MachineType_base_count((MachineType)m); i++) {
+            MachineID mach = {(MachineType)m, i};
+            destinations.push_back({mach, (SwitchID)(i + max_machines)});
+        }
+        return destinations;
+    }
+
+    int d = 0;
+    int max_machines = MachineType_base_number(MachineType_NUM);
+
+    for (int m = 0; m < MachineType_NUM; m++) {
+        // skip NetworkAdapter
+        if ((MachineType)m == MachineType_NetworkAdapter)
+            continue;
+        for (NodeID i = 0; i < MachineType_base_count((MachineType)m); i++) {
+            MachineID mach = {(MachineType)m, i};
+            destinations.push_back({mach, (SwitchID)(d + max_machines)});
+            d++;
+        }
+    }
+    return destinations;
+}
+
+// A link (src, next) routes to a destination if it is on one of the
+// shortest paths from src to the destination. The distances to each
+// destination come from one Dijkstra run over the reversed link graph, so
+// the cost is O(destinations * links * log(switches)) rather than the
+// cubic all-pairs computation.
 void
-Topology::extend_shortest_path(Matrix &current_dist, Matrix &latencies,
-    Matrix &inter_switches)
+Topology::computeRoutes(int num_switches,
+                        const vector<Destination> &destinations,
+                        const vector<LinkMap::const_iterator> &links,
+                        vector<vector<int> > &routes) const
 {
-    bool change = true;
-    int nodes = current_dist.size();
-
-    while (change) {
-        change = false;
-        for (int i = 0; i < nodes; i++) {
-            for (int j = 0; j < nodes; j++) {
-                int minimum = current_dist[i][j];
-                int previous_minimum = minimum;
-                int intermediate_switch = -1;
-                for (int k = 0; k < nodes; k++) {
-                    minimum = min(minimum,
-                        current_dist[i][k] + current_dist[k][j]);
-                    if (previous_minimum != minimum) {
-                        intermediate_switch = k;
-                        inter_switches[i][j] =
-                            inter_switches[i][k] +
-                            inter_switches[k][j] + 1;
-                    }
-                    previous_minimum = minimum;
-                }
-                if (current_dist[i][j] != minimum) {
-                    change = true;
-                    current_dist[i][j] = minimum;
-                    assert(intermediate_switch >= 0);
-                    assert(intermediate_switch < latencies[i].size());
-                    latencies[i][j] = latencies[i][intermediate_switch] +
-                        latencies[intermediate_switch][j];
+    // Reversed adjacency list: for every switch, its incoming links
+    vector<vector<pair<SwitchID, int> > > in_links(num_switches);
+    for (LinkMap::const_iterator i = m_link_map.begin();
+         i != m_link_map.end(); ++i) {
+        in_links[(*i).first.second].push_back(
+            make_pair((*i).first.first, (*i).second.link->m_weight));
+    }
+
+    routes.assign(links.size(), vector<int>());
+    vector<int> dist(num_switches);
+    typedef pair<int, SwitchID> QueueEntry;
+
+    for (int d = 0; d < destinations.size(); d++) {
+        SwitchID final = destinations[d].node;
+        fill(dist.begin(), dist.end(), INFINITE_LATENCY);
+        dist[final] = 0;
+
+        priority_queue<QueueEntry, vector<QueueEntry>,
+                       greater<QueueEntry> > queue;
+        queue.push(make_pair(0, final));
+        while (!queue.empty()) {
+            QueueEntry top = queue.top();
+            queue.pop();
+            if (top.first != dist[top.second])
+                continue;
+            for (auto &in_link : in_links[top.second]) {
+                int alt = top.first + in_link.second;
+                if (alt < dist[in_link.first]) {
+                    dist[in_link.first] = alt;
+                    queue.push(make_pair(alt, in_link.first));
                 }
             }
         }
+
+        for (int l = 0; l < links.size(); l++) {
+            SwitchID src = (*links[l]).first.first;
+            SwitchID next = (*links[l]).first.second;
+            int weight = (*links[l]).second.link->m_weight;
+            if (dist[src] != INFINITE_LATENCY &&
+                weight + dist[next] == dist[src]) {
+                routes[l].push_back(d);
+            }
+        }
     }
 }
 
-Matrix
-Topology::shortest_path(const Matrix &weights, Matrix &latencies,
-                        Matrix &inter_switches)
+// Hash of everything the routing tables depend on
+uint64_t
+Topology::routingKey(int num_switches,
+                     const vector<Destination> &destinations) const
 {
-    Matrix dist = weights;
-    extend_shortest_path(dist, latencies, inter_switches);
-    return dist;
+    // FNV-1a
+    uint64_t hash = 0xcbf29ce484222325ULL;
+    auto mix = [&hash](uint64_t value) {
+        for (int i = 0; i < 8; i++) {
+            hash ^= (value >> (8 * i)) & 0xff;
+            hash *= 0x100000001b3ULL;
+        }
+    };
+
+    mix(m_is_active_msg_network);
+    mix(num_switches);
+    mix(destinations.size());
+    for (auto &dest : destinations) {
+        mix(dest.machine.type);
+        mix(dest.machine.num);
+        mix(dest.node);
+    }
+    mix(m_link_map.size());
+    for (LinkMap::const_iterator i = m_link_map.begin();
+         i != m_link_map.end(); ++i) {
+        mix((*i).first.first);
+        mix((*i).first.second);
+        mix((*i).second.link->m_weight);
+    }
+    return hash;
 }
 
-bool
-Topology::link_is_shortest_path_to_node(SwitchID src, SwitchID next,
-                                        SwitchID final, const Matrix &weights,
-                                        const Matrix &dist)
+string
+Topology::routingCacheFile(uint64_t key) const
 {
-    return weights[src][next] + dist[next][final] == dist[src][final];
+    return csprintf("%s/routes-%016x.txt", m_routing_cache_dir, key);
 }
 
-NetDest
-Topology::shortest_path_to_node(SwitchID src, SwitchID next,
-                                const Matrix &weights, const Matrix &dist)
+// The cache file has one line per routed link: src, next and the indices
+// of the destinations it routes to
+bool
+Topology::loadRoutes(uint64_t key,
+                     const vector<LinkMap::const_iterator> &links,
+                     vector<vector<int> > &routes) const
 {
-    if (m_is_active_msg_network) {
-        NetDest result(true);
-        int max_machines = NetworkAdapter::getNumControllers();
-        int m = MachineType_NetworkAdapter;
-        int d = 0;
-
-        for (NodeID i = 0; i < MachineType_base_count((MachineType)m); i++) {
-            // we use "d+max_machines" below since the "destination"
-            // switches for the machines are numbered
-            // [MachineType_base_number(MachineType_NUM)...
-            //  2*MachineType_base_number(MachineType_NUM)-1] for the
-            // component network
-            if (link_is_shortest_path_to_node(src, next, d + max_machines,
-                    weights, dist)) {
-                MachineID mach = {(MachineType)m, i};
-                result.add(mach);
-            }
-            d++;
+    if (m_routing_cache_dir.empty())
+        return false;
+
+    ifstream in(routingCacheFile(key));
+    if (!in)
+        return false;
+
+    routes.assign(links.size(), vector<int>());
+    string line;
+    for (int l = 0; l < links.size(); l++) {
+        SwitchID src, next;
+        if (!getline(in, line)) {
+            warn("Ignoring truncated routing cache %s\n",
+                 routingCacheFile(key));
+            return false;
+        }
+        istringstream fields(line);
+        fields >> src >> next;
+        if (!fields || src != (*links[l]).first.first ||
+            next != (*links[l]).first.second) {
+            warn("Ignoring mismatching routing cache %s\n",
+                 routingCacheFile(key));
+            return false;
+        }
+        int d;
+        while (fields >> d) {
+            routes[l].push_back(d);
         }
-
-        return result;
     }
 
-    NetDest result;
-    int d = 0;
-    int machines;
-    int max_machines;
-
-    machines = MachineType_NUM;
-    max_machines = MachineType_base_number(MachineType_NUM);
+    DPRINTF(RubyNetwork, "Loaded routing tables from %s\n",
+            routingCacheFile(key));
+    return true;
+}
 
-    for (int m = 0; m < machines; m++) {
-        // skip NetworkAdapter
-        if ((MachineType)m == MachineType_NetworkAdapter)
-            continue;
-        for (NodeID i = 0; i < MachineType_base_count((MachineType)m); i++) {
-            // we use "d+max_machines" below since the "destination"
-            // switches for the machines are numbered
-            // [MachineType_base_number(MachineType_NUM)...
-            //  2*MachineType_base_number(MachineType_NUM)-1] for the
-            // component network
-            if (link_is_shortest_path_to_node(src, next, d + max_machines,
-                    weights, dist)) {
-                MachineID mach = {(MachineType)m, i};
-                result.add(mach);
-            }
-            d++;
+void
+Topology::saveRoutes(uint64_t key,
+                     const vector<LinkMap::const_iterator> &links,
+                     const vector<vector<int> > &routes) const
+{
+    if (m_routing_cache_dir.empty())
+        return;
+
+    // Write to a temporary file first, so that concurrent simulations
+    // never see a partial cache file
+    string file = routingCacheFile(key);
+    string tmp = csprintf("%s.%d", file, getpid());
+    ofstream out(tmp);
+    if (!out) {
+        warn("Cannot write routing cache %s\n", file);
+        return;
+    }
+    for (int l = 0; l < links.size(); l++) {
+        out << (*links[l]).first.first << " " << (*links[l]).first.second;
+        for (int d : routes[l]) {
+            out << " " << d;
         }
+        out << "\n";
     }
+    out.close();
 
-    DPRINTF(RubyNetwork, "Returning shortest path\n"
-            "(src-(2*max_machines)): %d, (next-(2*max_machines)): %d, "
-            "src: %d, next: %d, result: %s\n",
-            (src-(2*max_machines)), (next-(2*max_machines)),
-            src, next, result);
-
-    return result;
+    if (!out || rename(tmp.c_str(), file.c_str()) != 0) {
+        warn("Cannot write routing cache %s\n", file);
+        unlink(tmp.c_str());
+    }
 }
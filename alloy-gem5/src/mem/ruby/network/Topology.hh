@@ -41,17 +41,18 @@
 #define __MEM_RUBY_NETWORK_TOPOLOGY_HH__
 
 #include <iostream>
+#include <map>
 #include <string>
 #include <vector>
 
 #include "mem/protocol/LinkDirection.hh"
+#include "mem/ruby/common/MachineID.hh"
 #include "mem/ruby/common/TypeDefines.hh"
 #include "mem/ruby/network/BasicLink.hh"
 
 class NetDest;
 class Network;
 
-typedef std::vector<std::vector<int> > Matrix;
 typedef std::string PortDirection;
 
 struct LinkEntry
@@ -68,7 +69,8 @@ class Topology
   public:
     Topology(uint32_t num_routers, const std::vector<BasicExtLink *> &ext_links,
              const std::vector<BasicIntLink *> &int_links,
-             bool is_active_msg_network);
+             bool is_active_msg_network,
+             const std::string &routing_cache_dir = "");
 
     uint32_t numSwitches() const { return m_number_of_switches; }
     void createLinks(Network *net);
@@ -81,18 +83,31 @@ class Topology
     void makeLink(Network *net, SwitchID src, SwitchID dest,
                   const NetDest& routing_table_entry);
 
-    // Helper functions based on chapter 29 of Cormen et al.
-    void extend_shortest_path(Matrix &current_dist, Matrix &latencies,
-                              Matrix &inter_switches);
-
-    std::vector<std::vector<int>> shortest_path(const Matrix &weights,
-            Matrix &latencies, Matrix &inter_switches);
-
-    bool link_is_shortest_path_to_node(SwitchID src, SwitchID next,
-            SwitchID final, const Matrix &weights, const Matrix &dist);
-
-    NetDest shortest_path_to_node(SwitchID src, SwitchID next,
-                                  const Matrix &weights, const Matrix &dist);
+    // Output switch of every destination machine, in routing order
+    struct Destination
+    {
+        MachineID machine;
+        SwitchID node;
+    };
+    std::vector<Destination> getDestinations() const;
+
+    // For every routed link, the indices of the destinations it is on a
+    // shortest path to
+    void computeRoutes(int num_switches,
+                       const std::vector<Destination> &destinations,
+                       const std::vector<LinkMap::const_iterator> &links,
+                       std::vector<std::vector<int> > &routes) const;
+
+    // On-disk cache of the routes, keyed by a hash of the topology
+    uint64_t routingKey(int num_switches,
+                        const std::vector<Destination> &destinations) const;
+    std::string routingCacheFile(uint64_t key) const;
+    bool loadRoutes(uint64_t key,
+                    const std::vector<LinkMap::const_iterator> &links,
+                    std::vector<std::vector<int> > &routes) const;
+    void saveRoutes(uint64_t key,
+                    const std::vector<LinkMap::const_iterator> &links,
+                    const std::vector<std::vector<int> > &routes) const;
 
     const uint32_t m_nodes;
     const uint32_t m_number_of_switches;
@@ -103,6 +118,7 @@ class Topology
     LinkMap m_link_map;
 
     bool m_is_active_msg_network;
+    std::string m_routing_cache_dir;
 };
 
 inline std::ostream&
@@ -144,6 +144,18 @@ class GarnetNetwork : public Network
         m_total_hops += hops;
     }
 
+    // Running totals over all vnets since the last stats reset, used to
+    // monitor synthetic traffic runs from Python
+    double getPacketsInjected() const { return m_packets_injected.total(); }
+    double getPacketsReceived() const { return m_packets_received.total(); }
+
+    double
+    getPacketLatency() const
+    {
+        return m_packet_network_latency.total() +
+               m_packet_queueing_latency.total();
+    }
+
   protected:
     // Configuration
     int m_num_rows;
@@ -29,6 +29,7 @@
 #
 
 from m5.params import *
+from m5.SimObject import *
 from m5.proxy import *
 from Network import RubyNetwork
 from BasicRouter import BasicRouter
@@ -49,6 +50,12 @@ class GarnetNetwork(RubyNetwork):
     garnet_deadlock_threshold = Param.UInt32(50000,
                               "network-level deadlock threshold")
 
+    cxx_exports = [
+        PyBindMethod("getPacketsInjected"),
+        PyBindMethod("getPacketsReceived"),
+        PyBindMethod("getPacketLatency"),
+    ]
+
 class GarnetNetworkInterface(ClockedObject):
     type = 'GarnetNetworkInterface'
     cxx_class = 'NetworkInterface'
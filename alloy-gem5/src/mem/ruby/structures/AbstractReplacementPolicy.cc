@@ -30,6 +30,8 @@
 
 #include "mem/ruby/structures/AbstractReplacementPolicy.hh"
 
+#include <utility>
+
 #include "base/logging.hh"
 
 AbstractReplacementPolicy::AbstractReplacementPolicy(const Params * p)
@@ -72,3 +74,9 @@ AbstractReplacementPolicy::getLastAccess(int64_t set, int64_t way)
 {
     return m_last_ref_ptr[set][way];
 }
+
+void
+AbstractReplacementPolicy::swapWays(int64_t set, int64_t way_a, int64_t way_b)
+{
+    std::swap(m_last_ref_ptr[set][way_a], m_last_ref_ptr[set][way_b]);
+}
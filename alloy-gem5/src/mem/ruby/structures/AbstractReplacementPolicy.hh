@@ -54,6 +54,14 @@ class AbstractReplacementPolicy : public SimObject
 
     virtual bool useOccupancy() const { return false; }
 
+    /* returns the way the line in (set, way) should be moved to for wear
+     * leveling, or -1 to leave it in place */
+    virtual int64_t getRotationTarget(int64_t set, int64_t way) const
+    { return -1; }
+
+    /* the lines in two ways of a set were swapped */
+    virtual void swapWays(int64_t set, int64_t way_a, int64_t way_b);
+
     void setCache(CacheMemory * pCache) {m_cache = pCache;}
     CacheMemory * m_cache;
 
@@ -91,6 +91,41 @@ BankedArray::reserve(int64_t idx)
         (accessLatency-1) * m_ruby_system->clockPeriod();
 }
 
+void
+BankedArray::extend(int64_t idx, Cycles extra)
+{
+    if (accessLatency == 0 || extra == 0)
+        return;
+
+    unsigned int bank = mapIndexToBank(idx);
+    assert(bank < banks);
+
+    if (busyBanks[bank].endAccess < curTick()) {
+        // the bank is idle, the extra work starts now
+        busyBanks[bank].idx = idx;
+        busyBanks[bank].startAccess = curTick();
+        busyBanks[bank].endAccess = curTick() +
+            (extra-1) * m_ruby_system->clockPeriod();
+    } else {
+        busyBanks[bank].endAccess += extra * m_ruby_system->clockPeriod();
+    }
+}
+
+Cycles
+BankedArray::getBusyCycles(int64_t idx)
+{
+    if (accessLatency == 0)
+        return Cycles(0);
+
+    unsigned int bank = mapIndexToBank(idx);
+    assert(bank < banks);
+
+    if (busyBanks[bank].endAccess < curTick())
+        return Cycles(0);
+    return Cycles((busyBanks[bank].endAccess - curTick()) /
+                  m_ruby_system->clockPeriod() + 1);
+}
+
 unsigned int
 BankedArray::mapIndexToBank(int64_t idx)
 {
@@ -72,6 +72,13 @@ class BankedArray
 
     void reserve(int64_t idx);
 
+    // Keep the bank of idx busy for extra cycles after its current
+    // reservation, e.g. for MLC write retries and read restores
+    void extend(int64_t idx, Cycles extra);
+
+    // Cycles until the bank of idx is free again
+    Cycles getBusyCycles(int64_t idx);
+
     Cycles getLatency() const { return accessLatency; }
 };
 
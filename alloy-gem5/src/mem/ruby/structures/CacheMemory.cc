@@ -26,8 +26,14 @@
  * (INCLUDING NEGLIGENCE OR OTHERWISE) ARISING IN ANY WAY OUT OF THE USE
  * OF THIS SOFTWARE, EVEN IF ADVISED OF THE POSSIBILITY OF SUCH DAMAGE.
  */
+#include <algorithm>
+#include <cstring>
+
+#include "base/callback.hh"
 #include "base/intmath.hh"
 #include "base/logging.hh"
+#include "base/output.hh"
+#include "config/have_protobuf.hh"
 #include "debug/RubyCache.hh"
 #include "debug/RubyCacheTrace.hh"
 #include "debug/RubyResourceStalls.hh"
@@ -35,6 +41,14 @@
 #include "mem/protocol/AccessPermission.hh"
 #include "mem/ruby/system/RubySystem.hh"
 #include "mem/ruby/system/WeightedLRUPolicy.hh"
+#include "sim/core.hh"
+#include "sim/stats.hh"
+
+#if HAVE_PROTOBUF
+#include "proto/mlc_write.pb.h"
+#include "proto/protoio.hh"
+
+#endif
 
 #include "mem/ruby/structures/CacheMemory.hh"
 
@@ -59,7 +73,8 @@ CacheMemory::CacheMemory(const Params *p)
       dataArray(p->dataArrayBanks, p->dataAccessLatency,
                 p->start_index_bit, p->ruby_system),
       tagArray(p->tagArrayBanks, p->tagAccessLatency,
-               p->start_index_bit, p->ruby_system)
+               p->start_index_bit, p->ruby_system),
+      m_reliability_rng(p->reliability_seed)
 {
     m_cache_size = p->size;
     m_cache_assoc = p->assoc;
@@ -70,6 +85,38 @@ CacheMemory::CacheMemory(const Params *p)
     m_resource_stalls = p->resourceStalls;
     m_block_size = p->block_size; // may be 0 at this point. Updated in init()
     m_Subblock_num = 4;           // By AP
+    m_validate_subblock_wb = p->validate_subblock_wb;
+    m_cell_endurance = p->cell_endurance;
+    m_energy.read = p->read_energy;
+    m_energy.softWrite = p->soft_write_energy;
+    m_energy.hardWrite = p->hard_write_energy;
+    m_energy.twoStepWrite = p->two_step_write_energy;
+    m_energy.tagAccess = p->tag_access_energy;
+    m_energy.leakage = p->leakage_power;
+    m_energy.banks = p->dataArrayBanks;
+    m_reliability.softWriteError = p->soft_write_error_rate;
+    m_reliability.hardWriteError = p->hard_write_error_rate;
+    m_reliability.softReadDisturb = p->soft_read_disturb_rate;
+    m_reliability.hardReadDisturb = p->hard_read_disturb_rate;
+    m_reliability.maxRetries = p->max_write_retries;
+
+    // By AP
+    m_write_trace = nullptr;
+    m_write_trace_granularity = p->write_trace_granularity;
+    if (p->write_trace_file != "")
+    {
+#if HAVE_PROTOBUF
+        m_write_trace = new ProtoOutputStream(
+            simout.resolve(p->write_trace_file));
+        // The destructor is not called at exit, so flush the trace from an
+        // exit callback instead
+        registerExitCallback(
+            new MakeCallback<CacheMemory,
+                             &CacheMemory::closeWriteTrace>(this));
+#else
+        fatal("%s: write_trace_file requires protobuf support\n", name());
+#endif
+    }
 }
 
 void CacheMemory::init()
@@ -89,6 +136,27 @@ void CacheMemory::init()
     // By AP
     int m_Subblock_checkWB_size = m_cache_num_sets * m_cache_assoc * m_Subblock_num;
     m_Subblock_checkWB.resize(m_Subblock_checkWB_size, 0);
+    m_frame_writes.resize(m_cache_num_sets * m_cache_assoc, 0);
+
+    if (m_write_trace)
+    {
+        fatal_if(m_write_trace_granularity <= 0, "%s: write_trace_granularity "
+                 "must be positive\n", name());
+        int parts = m_block_size / m_write_trace_granularity;
+        fatal_if(parts > 64 || parts * m_write_trace_granularity !=
+                 m_block_size, "%s: write_trace_granularity must split the "
+                 "block into at most 64 equal parts\n", name());
+#if HAVE_PROTOBUF
+        ProtoMessage::MLCWriteHeader header_msg;
+        header_msg.set_obj_id(name());
+        header_msg.set_tick_freq(SimClock::Frequency);
+        header_msg.set_block_size(m_block_size);
+        header_msg.set_granularity(m_write_trace_granularity);
+        header_msg.set_subblocks(m_Subblock_num);
+        header_msg.set_assoc(m_cache_assoc);
+        m_write_trace->write(header_msg);
+#endif
+    }
     // Define m_Subblock_checkWB_3D 3d array of size m_cache_num_sets * m_cache_assoc * m_Subblock_num
     // m_Subblock_checkWB_3D.resize(m_cache_num_sets, vector<vector<int>>(m_cache_assoc, vector<int>(m_Subblock_num, 0)));
 }
@@ -164,47 +232,408 @@ int CacheMemory::getSubblockSequence(int set, int way)
 }
 
 // By AP
-// Take address and findout which subblock of that block is written also find out the set and way of that block
-// and increment the counter of that subblock
-void CacheMemory::checkSubBlockWB_addr(DataBlock new_data_ptr, DataBlock old_data_ptr, Addr addr)
+// Split the block into the given number of equal parts, compare the two
+// blocks one part at a time with memcmp (word-wide on every host we care
+// about) and return a bitmask of the parts that differ
+uint64_t
+CacheMemory::getWrittenParts(const DataBlock &new_data,
+                             const DataBlock &old_data, int parts) const
 {
-    assert(addr == makeLineAddress(addr));
-    int set = addressToCacheSet(addr);
-    int way = findTagInSet(set, addr);
+    int part_size = m_block_size / parts;
+    uint64_t written = 0;
 
-    for (int i = 0; i < m_Subblock_num; i++)
+    for (int i = 0; i < parts; i++)
     {
-        bool subblock_written = false;
-        for (int j = 0; j < m_block_size / m_Subblock_num; j++)
+        int offset = i * part_size;
+        if (memcmp(new_data.getData(offset, part_size),
+                   old_data.getData(offset, part_size),
+                   part_size) != 0)
         {
-            int byte_idx = i * (m_block_size / m_Subblock_num) + j;
+            written |= (1ULL << i);
+        }
+    }
+    return written;
+}
 
-            assert(old_data_ptr.getByte(byte_idx) ==
-                   m_cache[set][way]->getDataBlk().getByte(byte_idx));
+// By AP
+// Reference implementation of getWrittenParts for the subblocks, only used
+// to validate the fast path when validate_subblock_wb is set
+uint64_t
+CacheMemory::getWrittenSubblocksByByte(const DataBlock &new_data,
+                                       const DataBlock &old_data) const
+{
+    int subblock_size = m_block_size / m_Subblock_num;
+    uint64_t written = 0;
 
-            if (old_data_ptr.getByte(byte_idx) != new_data_ptr.getByte(byte_idx))
+    for (int i = 0; i < m_Subblock_num; i++)
+    {
+        for (int j = 0; j < subblock_size; j++)
+        {
+            int byte_idx = i * subblock_size + j;
+            if (old_data.getByte(byte_idx) != new_data.getByte(byte_idx))
             {
-                subblock_written = true;
-                // cout << "Byte No.: " << byte_idx << " Set - " << set << " Way - " << way << " Subblock - " << i + 1;
+                written |= (1ULL << i);
                 break;
             }
         }
-        int counter_idx = set * m_cache_assoc * m_Subblock_num +
-                          way * m_Subblock_num + i;
-        if (subblock_written)
+    }
+    return written;
+}
+
+// By AP
+// A part is written if at least one of its bytes is set in the mask
+uint64_t
+CacheMemory::getMaskedParts(const WriteMask &mask, int parts) const
+{
+    int part_size = m_block_size / parts;
+    uint64_t written = 0;
+
+    for (int i = 0; i < parts; i++)
+    {
+        if (mask.testAny(i * part_size, part_size))
+        {
+            written |= (1ULL << i);
+        }
+    }
+    return written;
+}
+
+// By AP
+// Increment the write counter of every written subblock of the given
+// set/way and update the predictor with the new subblock sequence
+void CacheMemory::recordSubblockWrites(int64_t set, int way, uint64_t written)
+{
+    assert(way != -1);
+
+    // Classify the write by the MLC bits it has to program, using the
+    // placement from before this write
+    uint64_t soft = getSoftSubblocks(set, way);
+    if (written == 0)
+        m_silent_writes++;
+    else if ((written & ~soft) == 0)
+        m_soft_writes++;
+    else if ((written & soft) == 0)
+        m_hard_writes++;
+    else
+        m_two_step_writes++;
+    chargeWriteRetries(set, written & soft, written & ~soft);
+
+    int base_idx = set * m_cache_assoc * m_Subblock_num +
+                   way * m_Subblock_num;
+    for (int i = 0; i < m_Subblock_num; i++)
+    {
+        int counter_idx = base_idx + i;
+        if (written & (1ULL << i))
         {
             m_Subblock_checkWB[counter_idx]++;
-            // cout << " Count - " << m_Subblock_checkWB[counter_idx] << endl;
+            m_frame_writes[set * m_cache_assoc + way]++;
         }
         m_Subblock_WB_stats[counter_idx] = m_Subblock_checkWB[counter_idx];
     }
+
+    Addr addr = m_cache[set][way]->m_Address;
     int subblock_sequence = getSubblockSequence(set, way);
-    cout << "Subblock Sequence: " << subblock_sequence << endl;
-    cout << sizeof(addr) << endl;
+    DPRINTF(RubyCache, "addr: %#x set: %d way: %d written subblocks: %#x "
+            "sequence: %d\n", addr, set, way, written, subblock_sequence);
     m_cache_predictor.addEntry(addr, addr, subblock_sequence);
-    // m_cache_predictor->lookupEntry(addr, addr);
-    // uint64_t m_key = m_cache_predictor->makeKey(addr, addr);
-    // m_cache_predictor->printByKey(m_key, cout);
+}
+
+// By AP
+// The most written half of the subblocks of a frame are placed in the soft
+// bits of the MLC cells, in the order given by getSubblockSequence
+uint64_t CacheMemory::getSoftSubblocks(int64_t set, int way) const
+{
+    int base_idx = set * m_cache_assoc * m_Subblock_num +
+                   way * m_Subblock_num;
+    uint64_t soft = 0;
+
+    for (int n = 0; n < m_Subblock_num / 2; n++)
+    {
+        int best = -1;
+        for (int i = 0; i < m_Subblock_num; i++)
+        {
+            if (soft & (1ULL << i))
+                continue;
+            if (best == -1 || m_Subblock_checkWB[base_idx + i] >
+                              m_Subblock_checkWB[base_idx + best])
+                best = i;
+        }
+        soft |= (1ULL << best);
+    }
+    return soft;
+}
+
+// By AP
+// Number of retries of one write step that fails with the given rate
+unsigned CacheMemory::sampleWriteRetries(double rate)
+{
+    unsigned retries = 0;
+    while (m_reliability_rng.random<double>() < rate)
+    {
+        if (retries == m_reliability.maxRetries)
+        {
+            m_failed_writes++;
+            break;
+        }
+        retries++;
+    }
+    return retries;
+}
+
+// By AP
+// Retry the failed soft and hard write steps of a write to the given set.
+// Every retry keeps the data array bank busy for another access.
+void CacheMemory::chargeWriteRetries(int64_t set, bool soft, bool hard)
+{
+    unsigned retries = 0;
+    if (soft && m_reliability.softWriteError > 0)
+        retries += sampleWriteRetries(m_reliability.softWriteError);
+    if (hard && m_reliability.hardWriteError > 0)
+        retries += sampleWriteRetries(m_reliability.hardWriteError);
+    if (retries == 0)
+        return;
+
+    Cycles extra(retries * dataArray.getLatency());
+    DPRINTF(RubyCache, "set: %d write retries: %d extra cycles: %d\n",
+            set, retries, extra);
+    m_write_retries += retries;
+    m_reliability_cycles += extra;
+    dataArray.extend(set, extra);
+}
+
+// By AP
+// A read may disturb the soft and/or hard bits of the line, which then
+// have to be restored by rewriting the disturbed level
+void CacheMemory::chargeReadRestore(int64_t set)
+{
+    unsigned restores = 0;
+    if (m_reliability.softReadDisturb > 0 &&
+        m_reliability_rng.random<double>() < m_reliability.softReadDisturb)
+        restores++;
+    if (m_reliability.hardReadDisturb > 0 &&
+        m_reliability_rng.random<double>() < m_reliability.hardReadDisturb)
+        restores++;
+    if (restores == 0)
+        return;
+
+    Cycles extra(restores * dataArray.getLatency());
+    DPRINTF(RubyCache, "set: %d read restores: %d extra cycles: %d\n",
+            set, restores, extra);
+    m_read_restores += restores;
+    m_reliability_cycles += extra;
+    dataArray.extend(set, extra);
+}
+
+// By AP
+// Append one record to the L2 write trace
+void CacheMemory::traceWrite(Addr addr, int64_t set, int way,
+                             uint64_t mask, Addr pc)
+{
+#if HAVE_PROTOBUF
+    ProtoMessage::MLCWrite write_msg;
+    write_msg.set_tick(curTick());
+    write_msg.set_addr(addr);
+    write_msg.set_mask(mask);
+    if (pc != 0)
+        write_msg.set_pc(pc);
+    write_msg.set_frame(set * m_cache_assoc + way);
+    m_write_trace->write(write_msg);
+#endif
+}
+
+void CacheMemory::closeWriteTrace()
+{
+#if HAVE_PROTOBUF
+    delete m_write_trace;
+    m_write_trace = nullptr;
+#endif
+}
+
+// By AP
+// Take address and findout which subblock of that block is written also find out the set and way of that block
+// and increment the counter of that subblock
+void CacheMemory::checkSubBlockWB_addr(const DataBlock &new_data_ptr,
+                                       const DataBlock &old_data_ptr,
+                                       Addr addr, Addr pc)
+{
+    assert(addr == makeLineAddress(addr));
+    int64_t set = addressToCacheSet(addr);
+    int way = findTagInSet(set, addr);
+
+    uint64_t written = getWrittenParts(new_data_ptr, old_data_ptr,
+                                       m_Subblock_num);
+
+    if (m_validate_subblock_wb)
+    {
+        if (!old_data_ptr.equal(m_cache[set][way]->getDataBlk()))
+        {
+            panic("%s: old data for %#x does not match the cache line\n",
+                  name(), addr);
+        }
+        uint64_t expected = getWrittenSubblocksByByte(new_data_ptr,
+                                                      old_data_ptr);
+        if (written != expected)
+        {
+            panic("%s: subblock write mismatch for %#x: fast %#x, "
+                  "byte-by-byte %#x\n", name(), addr, written, expected);
+        }
+    }
+
+    recordSubblockWrites(set, way, written);
+
+    if (m_write_trace)
+    {
+        traceWrite(addr, set, way,
+                   getWrittenParts(new_data_ptr, old_data_ptr,
+                                   m_block_size / m_write_trace_granularity),
+                   pc);
+    }
+
+    rotateIfWorn(set, way);
+}
+
+// By AP
+// Written subblocks are the ones with at least one byte set in the mask
+void CacheMemory::checkSubBlockWB_mask(const WriteMask &mask, Addr addr,
+                                       Addr pc)
+{
+    assert(addr == makeLineAddress(addr));
+    int64_t set = addressToCacheSet(addr);
+    int way = findTagInSet(set, addr);
+
+    recordSubblockWrites(set, way, getMaskedParts(mask, m_Subblock_num));
+
+    if (m_write_trace)
+    {
+        traceWrite(addr, set, way,
+                   getMaskedParts(mask,
+                                  m_block_size / m_write_trace_granularity),
+                   pc);
+    }
+
+    rotateIfWorn(set, way);
+}
+
+// By AP
+void CacheMemory::rotateIfWorn(int64_t set, int way)
+{
+    int64_t target = m_replacementPolicy_ptr->getRotationTarget(set, way);
+    if (target < 0 || target == way)
+        return;
+
+    DPRINTF(RubyCache, "rotating set %d way %d (%d writes) to way %d "
+            "(%d writes)\n", set, way, getFrameWrites(set, way), target,
+            getFrameWrites(set, target));
+    swapWays(set, way, target);
+    m_write_rotations++;
+}
+
+// By AP
+// Swap the lines held by two ways of a set. Moving a line rewrites its
+// whole new frame, so every subblock of each destination frame is counted
+// as written. The write counters stay with the frames.
+void CacheMemory::swapWays(int64_t set, int way_a, int way_b)
+{
+    std::swap(m_cache[set][way_a], m_cache[set][way_b]);
+    m_replacementPolicy_ptr->swapWays(set, way_a, way_b);
+
+    for (int way : {way_a, way_b})
+    {
+        AbstractCacheEntry *entry = m_cache[set][way];
+        if (entry == NULL)
+            continue;
+
+        entry->setWayIndex(way);
+        m_tag_index[entry->m_Address] = way;
+
+        int base_idx = set * m_cache_assoc * m_Subblock_num +
+                       way * m_Subblock_num;
+        for (int i = 0; i < m_Subblock_num; i++)
+        {
+            int counter_idx = base_idx + i;
+            m_Subblock_checkWB[counter_idx]++;
+            m_Subblock_WB_stats[counter_idx] = m_Subblock_checkWB[counter_idx];
+        }
+        m_frame_writes[set * m_cache_assoc + way] += m_Subblock_num;
+    }
+}
+
+uint64_t CacheMemory::getMaxFrameWrites() const
+{
+    if (m_frame_writes.empty())
+        return 0;
+    return *max_element(m_frame_writes.begin(), m_frame_writes.end());
+}
+
+double CacheMemory::getMeanFrameWrites() const
+{
+    if (m_frame_writes.empty())
+        return 0;
+    double total = 0;
+    for (auto writes : m_frame_writes)
+        total += writes;
+    return total / m_frame_writes.size();
+}
+
+uint64_t CacheMemory::getMaxSubblockWrites() const
+{
+    if (m_Subblock_checkWB.empty())
+        return 0;
+    return *max_element(m_Subblock_checkWB.begin(), m_Subblock_checkWB.end());
+}
+
+// By AP
+void CacheMemory::recordSubblockWrite(const DataBlock &new_data,
+                                      const DataBlock &old_data, Addr addr,
+                                      Addr pc)
+{
+    checkSubBlockWB_addr(new_data, old_data, addr, pc);
+    m_write_Count++;
+    numTagArrayReads++;
+    numDataArrayWrites++;
+}
+
+// By AP
+void CacheMemory::recordSubblockWrite(const WriteMask &mask, Addr addr,
+                                      Addr pc)
+{
+    checkSubBlockWB_mask(mask, addr, pc);
+    m_write_Count++;
+    numTagArrayReads++;
+    numDataArrayWrites++;
+}
+
+// By AP
+// A read of the line, e.g. to send it to the upper level or to memory,
+// looks up its tag and reads the data array, which may disturb the line
+void CacheMemory::recordDataRead(Addr addr)
+{
+    numTagArrayReads++;
+    numDataArrayReads++;
+    chargeReadRestore(addressToCacheSet(addr));
+}
+
+// By AP
+// Without request types nothing reserves the data array banks, so they
+// are only busy with write retries and read restores
+Cycles CacheMemory::getReliabilityDelay(Addr addr)
+{
+    Cycles delay = dataArray.getBusyCycles(addressToCacheSet(addr));
+    m_reliability_delay += delay;
+    return delay;
+}
+
+// By AP
+// A fill follows the tag lookup that missed, writes the new tag and the
+// whole line. It programs the soft and the hard bits of every subblock,
+// so it costs and may fail like a two-step write.
+void CacheMemory::recordDataFill(Addr addr)
+{
+    numTagArrayReads++;
+    numTagArrayWrites++;
+    numDataArrayWrites++;
+    m_fills++;
+    chargeWriteRetries(addressToCacheSet(addr), true, true);
 }
 
 // Given a cache index: returns the index of the tag in a set.
@@ -671,6 +1100,34 @@ void CacheMemory::regStats()
             .flags(Stats::nozero);
     }
 
+    // By AP
+    m_write_rotations
+        .name(name() + ".write_rotations")
+        .desc("Number of lines moved to a less written way of their set")
+        .flags(Stats::nozero);
+
+    m_max_frame_writes
+        .method(this, &CacheMemory::getMaxFrameWrites)
+        .name(name() + ".max_frame_writes")
+        .desc("Most subblock writes into a single cache frame");
+
+    m_mean_frame_writes
+        .method(this, &CacheMemory::getMeanFrameWrites)
+        .name(name() + ".mean_frame_writes")
+        .desc("Mean subblock writes per cache frame");
+
+    m_max_subblock_writes
+        .method(this, &CacheMemory::getMaxSubblockWrites)
+        .name(name() + ".max_subblock_writes")
+        .desc("Most writes into a single subblock");
+
+    m_projected_lifetime
+        .name(name() + ".projected_lifetime")
+        .desc("Seconds until the most written subblock reaches the cell "
+              "endurance at the simulated write rate");
+    m_projected_lifetime = Stats::constant(m_cell_endurance) * simSeconds /
+                           m_max_subblock_writes;
+
     // By AP
     m_write_Count
         .name(name() + ".write_count")
@@ -729,6 +1186,93 @@ void CacheMemory::regStats()
         .name(name() + ".num_data_array_stalls")
         .desc("number of stalls caused by data array")
         .flags(Stats::nozero);
+
+    // By AP
+    m_soft_writes
+        .name(name() + ".soft_writes")
+        .desc("Upper level writes that only touched soft-bit subblocks");
+
+    m_hard_writes
+        .name(name() + ".hard_writes")
+        .desc("Upper level writes that only touched hard-bit subblocks");
+
+    m_two_step_writes
+        .name(name() + ".two_step_writes")
+        .desc("Upper level writes that touched soft- and hard-bit subblocks");
+
+    m_silent_writes
+        .name(name() + ".silent_writes")
+        .desc("Upper level writes that did not change any data")
+        .flags(Stats::nozero);
+
+    m_fills
+        .name(name() + ".fills")
+        .desc("Whole line writes of data from the lower level")
+        .flags(Stats::nozero);
+
+    // Energy parameters are in pJ and mW, the stats are in joules
+    m_read_energy
+        .name(name() + ".read_energy")
+        .desc("Dynamic energy of data array reads (J)");
+    m_read_energy = numDataArrayReads * Stats::constant(m_energy.read * 1e-12);
+
+    m_write_energy
+        .name(name() + ".write_energy")
+        .desc("Dynamic energy of writes and fills of the data array (J)");
+    m_write_energy =
+        m_soft_writes * Stats::constant(m_energy.softWrite * 1e-12) +
+        m_hard_writes * Stats::constant(m_energy.hardWrite * 1e-12) +
+        (m_two_step_writes + m_fills) *
+        Stats::constant(m_energy.twoStepWrite * 1e-12);
+
+    m_tag_energy
+        .name(name() + ".tag_energy")
+        .desc("Dynamic energy of tag array accesses (J)");
+    m_tag_energy = (numTagArrayReads + numTagArrayWrites) *
+                   Stats::constant(m_energy.tagAccess * 1e-12);
+
+    m_leakage_energy
+        .name(name() + ".leakage_energy")
+        .desc("Leakage energy of all data array banks (J)");
+    m_leakage_energy = Stats::constant(m_energy.leakage * 1e-3 *
+                                       m_energy.banks) * simSeconds;
+
+    m_total_energy
+        .name(name() + ".total_energy")
+        .desc("Total cache energy (J)");
+    m_total_energy = m_read_energy + m_write_energy + m_tag_energy +
+                     m_leakage_energy;
+
+    m_energy_delay
+        .name(name() + ".energy_delay_product")
+        .desc("Total cache energy times simulated seconds (Js)");
+    m_energy_delay = m_total_energy * simSeconds;
+
+    // By AP
+    m_write_retries
+        .name(name() + ".write_retries")
+        .desc("Write steps repeated after a write error")
+        .flags(Stats::nozero);
+
+    m_failed_writes
+        .name(name() + ".failed_writes")
+        .desc("Write steps still failing after max_write_retries")
+        .flags(Stats::nozero);
+
+    m_read_restores
+        .name(name() + ".read_restores")
+        .desc("Restores of read disturbed soft or hard bits")
+        .flags(Stats::nozero);
+
+    m_reliability_cycles
+        .name(name() + ".reliability_cycles")
+        .desc("Data array cycles spent on write retries and read restores")
+        .flags(Stats::nozero);
+
+    m_reliability_delay
+        .name(name() + ".reliability_delay")
+        .desc("Cycles replies waited for write retries and read restores")
+        .flags(Stats::nozero);
 }
 
 // assumption: SLICC generated files will only call this function
@@ -743,6 +1287,7 @@ void CacheMemory::recordRequestType(CacheRequestType requestType, Addr addr)
         if (m_resource_stalls)
             dataArray.reserve(addressToCacheSet(addr));
         numDataArrayReads++;
+        chargeReadRestore(addressToCacheSet(addr));
         return;
     case CacheRequestType_DataArrayWrite:
         if (m_resource_stalls)
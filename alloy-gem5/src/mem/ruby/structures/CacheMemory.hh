@@ -35,11 +35,13 @@
 #include <unordered_map>
 #include <vector>
 
+#include "base/random.hh"
 #include "base/statistics.hh"
 #include "mem/protocol/CacheRequestType.hh"
 #include "mem/protocol/CacheResourceType.hh"
 #include "mem/protocol/RubyRequest.hh"
 #include "mem/ruby/common/DataBlock.hh"
+#include "mem/ruby/common/WriteMask.hh"
 #include "mem/ruby/slicc_interface/AbstractCacheEntry.hh"
 #include "mem/ruby/slicc_interface/RubySlicc_ComponentMapping.hh"
 #include "mem/ruby/structures/AbstractReplacementPolicy.hh"
@@ -47,6 +49,9 @@
 #include "mem/ruby/system/CacheRecorder.hh"
 #include "params/RubyCache.hh"
 #include "sim/sim_object.hh"
+
+class ProtoOutputStream;
+
 // By AP
 #include "mem/ruby/structures/CachePredictor.hh"
 
@@ -120,9 +125,38 @@ public:
 
   // By AP
   // void checkSubBlockWB(DataBlock new_data_ptr, AbstractCacheEntry *entry);
-  void checkSubBlockWB_addr(DataBlock new_data_ptr, DataBlock old_data_ptr, Addr addr);
+  void checkSubBlockWB_addr(const DataBlock &new_data_ptr,
+                            const DataBlock &old_data_ptr, Addr addr,
+                            Addr pc = 0);
+  // Same as above, but the written bytes are given by the requestor's
+  // write mask instead of being derived from the data
+  void checkSubBlockWB_mask(const WriteMask &mask, Addr addr, Addr pc = 0);
+  // Count a write from the upper level cache and track its subblocks.
+  // Protocols should call one of these instead of the two steps above.
+  // The pc is only used for the write trace and may be 0 if unknown.
+  void recordSubblockWrite(const DataBlock &new_data,
+                           const DataBlock &old_data, Addr addr,
+                           Addr pc = 0);
+  void recordSubblockWrite(const WriteMask &mask, Addr addr, Addr pc = 0);
+  // Count the data array reads and the fills from memory of protocols
+  // that do not annotate their transitions with request types, which
+  // never call recordRequestType. Together with recordSubblockWrite
+  // they drive the access counters the energy stats are computed from.
+  // Protocols should use either these or the annotations, not both.
+  void recordDataRead(Addr addr);
+  void recordDataFill(Addr addr);
+  // Cycles a reply with the line has to wait for the MLC write retries
+  // and read restores still keeping its data array bank busy. Protocols
+  // with request types stall on the bank in checkResourceAvailable
+  // instead.
+  Cycles getReliabilityDelay(Addr addr);
   int getSubblockWBCount(int index);
   int getSubblockSequence(int set, int way);
+  // Total subblock writes into a frame (set/way) since the start
+  uint64_t getFrameWrites(int64_t set, int way) const
+  {
+    return m_frame_writes[set * m_cache_assoc + way];
+  }
 
   CachePredictor m_cache_predictor;
 
@@ -165,6 +199,33 @@ public:
   Stats::Vector m_accessModeType;
   // By AP
   Stats::Vector m_Subblock_WB_stats;
+  Stats::Scalar m_write_rotations;
+  Stats::Value m_max_frame_writes;
+  Stats::Value m_mean_frame_writes;
+  Stats::Value m_max_subblock_writes;
+  Stats::Formula m_projected_lifetime;
+
+  // By AP
+  // MLC write classes and energy
+  Stats::Scalar m_soft_writes;
+  Stats::Scalar m_hard_writes;
+  Stats::Scalar m_two_step_writes;
+  Stats::Scalar m_silent_writes;
+  Stats::Scalar m_fills;
+  Stats::Formula m_read_energy;
+  Stats::Formula m_write_energy;
+  Stats::Formula m_tag_energy;
+  Stats::Formula m_leakage_energy;
+  Stats::Formula m_total_energy;
+  Stats::Formula m_energy_delay;
+
+  // By AP
+  // MLC reliability
+  Stats::Scalar m_write_retries;
+  Stats::Scalar m_failed_writes;
+  Stats::Scalar m_read_restores;
+  Stats::Scalar m_reliability_cycles;
+  Stats::Scalar m_reliability_delay;
 
   Stats::Scalar numDataArrayReads;
   Stats::Scalar numDataArrayWrites;
@@ -200,6 +261,29 @@ private:
   int findTagInSet(int64_t line, Addr tag) const;
   int findTagInSetIgnorePermissions(int64_t cacheSet, Addr tag) const;
 
+  // By AP
+  // Bitmask of the equal-sized parts of the block that were written
+  uint64_t getWrittenParts(const DataBlock &new_data,
+                           const DataBlock &old_data, int parts) const;
+  uint64_t getWrittenSubblocksByByte(const DataBlock &new_data,
+                                     const DataBlock &old_data) const;
+  uint64_t getMaskedParts(const WriteMask &mask, int parts) const;
+  void recordSubblockWrites(int64_t set, int way, uint64_t written);
+  void traceWrite(Addr addr, int64_t set, int way, uint64_t mask, Addr pc);
+  void closeWriteTrace();
+  // MLC subblocks held in the soft bits of a frame
+  uint64_t getSoftSubblocks(int64_t set, int way) const;
+  // Reliability model: sample write retries and read restores
+  unsigned sampleWriteRetries(double rate);
+  void chargeWriteRetries(int64_t set, bool soft, bool hard);
+  void chargeReadRestore(int64_t set);
+  // Wear leveling: move the line in (set, way) if the policy asks for it
+  void rotateIfWorn(int64_t set, int way);
+  void swapWays(int64_t set, int way_a, int way_b);
+  uint64_t getMaxFrameWrites() const;
+  double getMeanFrameWrites() const;
+  uint64_t getMaxSubblockWrites() const;
+
   // Private copy constructor and assignment operator
   CacheMemory(const CacheMemory &obj);
   CacheMemory &operator=(const CacheMemory &obj);
@@ -227,7 +311,36 @@ private:
   int m_block_size;
   // By AP
   int m_Subblock_num;
+  bool m_validate_subblock_wb;
+  // L2 write trace, null if disabled
+  ProtoOutputStream *m_write_trace;
+  int m_write_trace_granularity;
   std::vector<int> m_Subblock_checkWB;
+  std::vector<uint64_t> m_frame_writes;
+  double m_cell_endurance;
+
+  // Per access energy (pJ) and per bank leakage power (mW)
+  struct EnergyParams
+  {
+    double read;
+    double softWrite;
+    double hardWrite;
+    double twoStepWrite;
+    double tagAccess;
+    double leakage;
+    int banks;
+  } m_energy;
+
+  // Per level write error and read disturb rates
+  struct ReliabilityParams
+  {
+    double softWriteError;
+    double hardWriteError;
+    double softReadDisturb;
+    double hardReadDisturb;
+    unsigned maxRetries;
+  } m_reliability;
+  Random m_reliability_rng;
   // std::vector<std::vector<std::vector<int>>> m_Subblock_checkWB_3D;
 };
 
@@ -55,3 +55,41 @@ class RubyCache(SimObject):
     tagAccessLatency = Param.Cycles(1, "cycles for a tag array access")
     resourceStalls = Param.Bool(False, "stall if there is a resource failure")
     ruby_system = Param.RubySystem(Parent.any, "")
+    # By AP
+    validate_subblock_wb = Param.Bool(False, "cross-check the fast subblock "
+        "write detection against a byte-by-byte comparison")
+    write_trace_file = Param.String("", "protobuf trace of the writes from "
+        "the upper level, empty to disable")
+    write_trace_granularity = Param.Int(8, "bytes covered by each bit of "
+        "the traced write masks")
+    cell_endurance = Param.Float(1e12, "writes a cell survives, used for "
+        "the projected_lifetime stat")
+
+    # By AP
+    # Energy model, all zero by default. Writes from the upper level are
+    # classified by the MLC bits they program: soft-bit subblocks only,
+    # hard-bit subblocks only, or both (two-step write).
+    read_energy = Param.Float(0.0, "energy per data array read (pJ)")
+    soft_write_energy = Param.Float(0.0, "energy per soft-bit write (pJ)")
+    hard_write_energy = Param.Float(0.0, "energy per hard-bit write (pJ)")
+    two_step_write_energy = Param.Float(0.0,
+        "energy per two-step (soft and hard bit) write or fill (pJ)")
+    tag_access_energy = Param.Float(0.0, "energy per tag array access (pJ)")
+    leakage_power = Param.Float(0.0, "leakage power per data array bank (mW)")
+
+    # By AP
+    # Reliability model. Every write step (soft or hard bits) fails with the
+    # given rate and is retried, every read disturbs the soft and hard bits
+    # with the given rates and is followed by a restore. Retries and
+    # restores keep the data array bank busy for dataAccessLatency each.
+    soft_write_error_rate = Param.Float(0.0, "probability that a soft-bit "
+        "write has to be retried")
+    hard_write_error_rate = Param.Float(0.0, "probability that a hard-bit "
+        "write has to be retried")
+    soft_read_disturb_rate = Param.Float(0.0, "probability that a read "
+        "disturbs the soft bits of the line")
+    hard_read_disturb_rate = Param.Float(0.0, "probability that a read "
+        "disturbs the hard bits of the line")
+    max_write_retries = Param.Unsigned(8, "retries before a write step is "
+        "counted as failed")
+    reliability_seed = Param.UInt32(1, "seed of the reliability model")
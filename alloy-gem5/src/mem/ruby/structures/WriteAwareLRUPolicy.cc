@@ -0,0 +1,89 @@
+/*
+ * Author: Akash Pal (AP)
+ */
+
+#include "mem/ruby/structures/WriteAwareLRUPolicy.hh"
+
+#include <algorithm>
+#include <vector>
+
+#include "base/logging.hh"
+#include "mem/ruby/structures/CacheMemory.hh"
+
+WriteAwareLRUPolicy::WriteAwareLRUPolicy(const Params * p)
+    : AbstractReplacementPolicy(p),
+      m_lru_window(std::min<unsigned>(p->lru_window, m_assoc)),
+      m_rotation_threshold(p->rotation_threshold)
+{
+    fatal_if(p->lru_window < 1, "lru_window must be at least 1\n");
+}
+
+WriteAwareLRUPolicy::~WriteAwareLRUPolicy()
+{
+}
+
+WriteAwareLRUPolicy *
+WriteAwareReplacementPolicyParams::create()
+{
+    return new WriteAwareLRUPolicy(this);
+}
+
+void
+WriteAwareLRUPolicy::touch(int64_t set, int64_t index, Tick time)
+{
+    assert(index >= 0 && index < m_assoc);
+    assert(set >= 0 && set < m_num_sets);
+
+    m_last_ref_ptr[set][index] = time;
+}
+
+int64_t
+WriteAwareLRUPolicy::getVictim(int64_t set) const
+{
+    // Order the ways from least to most recently used
+    std::vector<int64_t> ways(m_assoc);
+    for (unsigned i = 0; i < m_assoc; i++) {
+        ways[i] = i;
+    }
+    std::stable_sort(ways.begin(), ways.end(),
+                     [this, set](int64_t a, int64_t b) {
+                         return m_last_ref_ptr[set][a] <
+                                m_last_ref_ptr[set][b];
+                     });
+
+    // Among the oldest ways, evict into the least written frame
+    int64_t victim = ways[0];
+    uint64_t victim_writes = m_cache->getFrameWrites(set, victim);
+    for (unsigned i = 1; i < m_lru_window; i++) {
+        uint64_t writes = m_cache->getFrameWrites(set, ways[i]);
+        if (writes < victim_writes) {
+            victim = ways[i];
+            victim_writes = writes;
+        }
+    }
+
+    return victim;
+}
+
+int64_t
+WriteAwareLRUPolicy::getRotationTarget(int64_t set, int64_t way) const
+{
+    if (m_rotation_threshold == 0)
+        return -1;
+
+    int64_t coldest = way;
+    uint64_t coldest_writes = m_cache->getFrameWrites(set, way);
+    for (unsigned i = 0; i < m_assoc; i++) {
+        uint64_t writes = m_cache->getFrameWrites(set, i);
+        if (writes < coldest_writes) {
+            coldest = i;
+            coldest_writes = writes;
+        }
+    }
+
+    if (m_cache->getFrameWrites(set, way) - coldest_writes <
+        m_rotation_threshold)
+        return -1;
+
+    return coldest;
+}
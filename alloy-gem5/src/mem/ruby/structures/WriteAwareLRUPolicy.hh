@@ -0,0 +1,36 @@
+/*
+ * Author: Akash Pal (AP)
+ */
+
+#ifndef __MEM_RUBY_STRUCTURES_WRITEAWARELRUPOLICY_HH__
+#define __MEM_RUBY_STRUCTURES_WRITEAWARELRUPOLICY_HH__
+
+#include "mem/ruby/structures/AbstractReplacementPolicy.hh"
+#include "params/WriteAwareReplacementPolicy.hh"
+
+/*
+ * LRU replacement that levels the writes across the ways of a set.
+ *
+ * The victim is the least written way among the lru_window least recently
+ * used ways, so a new line lands in a frame with little wear. Optionally,
+ * a line whose frame gets rotation_threshold more writes than the least
+ * written frame of its set is moved (rotated) into that frame.
+ */
+
+class WriteAwareLRUPolicy : public AbstractReplacementPolicy
+{
+  public:
+    typedef WriteAwareReplacementPolicyParams Params;
+    WriteAwareLRUPolicy(const Params * p);
+    ~WriteAwareLRUPolicy();
+
+    void touch(int64_t set, int64_t way, Tick time) override;
+    int64_t getVictim(int64_t set) const override;
+    int64_t getRotationTarget(int64_t set, int64_t way) const override;
+
+  private:
+    unsigned m_lru_window;
+    uint64_t m_rotation_threshold;
+};
+
+#endif // __MEM_RUBY_STRUCTURES_WRITEAWARELRUPOLICY_HH__
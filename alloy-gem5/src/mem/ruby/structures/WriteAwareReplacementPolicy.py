@@ -0,0 +1,16 @@
+# Author: Akash Pal (AP)
+
+from m5.params import *
+from m5.SimObject import SimObject
+from ReplacementPolicy import ReplacementPolicy
+
+class WriteAwareReplacementPolicy(ReplacementPolicy):
+    type = 'WriteAwareReplacementPolicy'
+    cxx_class = 'WriteAwareLRUPolicy'
+    cxx_header = 'mem/ruby/structures/WriteAwareLRUPolicy.hh'
+
+    lru_window = Param.Int(2, "number of least recently used ways that are "
+        "considered for eviction, the least written of them is evicted")
+    rotation_threshold = Param.Int(0, "move a line to the least written way "
+        "of its set once its own way has this many more subblock writes, "
+        "0 disables rotation")
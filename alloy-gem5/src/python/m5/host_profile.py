@@ -0,0 +1,159 @@
+# Copyright (c) 2018, Cornell University
+# All rights reserved.
+#
+# Redistribution and use in source and binary forms, with or
+# without modification, are permitted provided that the following
+# conditions are met:
+#
+# Redistributions of source code must retain the above copyright
+# notice, this list of conditions and the following disclaimer.
+#
+# Redistributions in binary form must reproduce the above
+# copyright notice, this list of conditions and the following
+# disclaimer in the documentation and/or other materials provided
+# with the distribution.
+#
+# Neither the name of Cornell University nor the names of its
+# contributors may be used to endorse or promote products derived
+# from this software without specific prior written permission.
+#
+# THIS SOFTWARE IS PROVIDED BY THE COPYRIGHT HOLDERS AND
+# CONTRIBUTORS "AS IS" AND ANY EXPRESS OR IMPLIED WARRANTIES,
+# INCLUDING, BUT NOT LIMITED TO, THE IMPLIED WARRANTIES OF
+# MERCHANTABILITY AND FITNESS FOR A PARTICULAR PURPOSE ARE
+# DISCLAIMED. IN NO EVENT SHALL THE COPYRIGHT HOLDER OR
+# CONTRIBUTORS BE LIABLE FOR ANY DIRECT, INDIRECT, INCIDENTAL,
+# SPECIAL, EXEMPLARY, OR CONSEQUENTIAL DAMAGES (INCLUDING, BUT NOT
+# LIMITED TO, PROCUREMENT OF SUBSTITUTE GOODS OR SERVICES; LOSS OF
+# USE, DATA, OR PROFITS; OR BUSINESS INTERRUPTION) HOWEVER CAUSED
+# AND ON ANY THEORY OF LIABILITY, WHETHER IN CONTRACT, STRICT
+# LIABILITY, OR TORT (INCLUDING NEGLIGENCE OR OTHERWISE) ARISING IN
+# ANY WAY OUT OF THE USE OF THIS SOFTWARE, EVEN IF ADVISED OF THE
+# POSSIBILITY OF SUCH DAMAGE.
+
+"""Host time profile of a gem5 run, enabled with --host-profile.
+
+The wall time of the phases of a run (the config script, every step of
+instantiate() and every simulate() call) is recorded as a stack of phase
+names. Steps which call a method on every SimObject are also split by
+SimObject type. The C++ event queues add the host time and the number of
+events serviced per event, where events are named after their SimObject.
+
+At exit two files are written to the output directory:
+
+  host_profile.txt     the phase tree and the events sorted by host time
+  host_profile.folded  the same in the folded stack format of
+                       flamegraph.pl, in microseconds
+"""
+
+from __future__ import print_function
+
+import atexit
+import os
+import time
+from contextlib import contextmanager
+
+import _m5.event
+
+enabled = False
+
+_outdir = None
+_stack = []
+# phase stack -> [number of times entered, seconds]
+_phases = {}
+
+def enable(outdir):
+    global enabled, _outdir
+
+    enabled = True
+    _outdir = outdir
+    _m5.event.setEventProfiling(True)
+    atexit.register(dump)
+
+def _record(path, seconds):
+    entry = _phases.setdefault(path, [0, 0.0])
+    entry[0] += 1
+    entry[1] += seconds
+
+@contextmanager
+def phase(name):
+    """Time the enclosed code as phase name, nested in the current phase"""
+    if not enabled:
+        yield
+        return
+
+    _stack.append(name)
+    path = tuple(_stack)
+    start = time.time()
+    try:
+        yield
+    finally:
+        _record(path, time.time() - start)
+        _stack.pop()
+
+def for_each(name, objs, method, *args):
+    """Call method on every SimObject in objs as phase name. The time is
+    also split by SimObject type when profiling."""
+    if not enabled:
+        for obj in objs:
+            getattr(obj, method)(*args)
+        return
+
+    with phase(name):
+        path = tuple(_stack)
+        for obj in objs:
+            start = time.time()
+            getattr(obj, method)(*args)
+            _record(path + (obj.type,), time.time() - start)
+
+def _self_times(events, event_time):
+    """Returns {stack: seconds} with the time of each phase that is not
+    spent in its sub-phases. The event time is taken off the longest
+    simulate() phase, the events are reported below it."""
+    totals = dict((path, entry[1]) for (path, entry) in _phases.items())
+    self_times = dict(totals)
+    for path in totals:
+        if len(path) > 1 and path[:-1] in self_times:
+            self_times[path[:-1]] -= totals[path]
+
+    simulate = [path for path in totals if path[-1] == 'simulate']
+    parent = max(simulate, key=lambda p: totals[p]) if simulate else ()
+    if parent:
+        self_times[parent] -= event_time
+
+    stacks = dict((path, max(t, 0.0)) for (path, t) in self_times.items())
+    for (name, count, seconds) in events:
+        stack = parent + ('events',) + tuple(name.split('.'))
+        stacks[stack] = stacks.get(stack, 0.0) + seconds
+    return stacks
+
+def dump():
+    events = _m5.event.getEventProfile()
+    events.sort(key=lambda e: e[2], reverse=True)
+    event_time = sum(e[2] for e in events)
+    event_count = sum(e[1] for e in events)
+
+    with open(os.path.join(_outdir, 'host_profile.txt'), 'w') as f:
+        print('Phases (wall seconds, including sub-phases)', file=f)
+        for path in sorted(_phases):
+            count, seconds = _phases[path]
+            print('%10.3f %8d  %s%s' % (seconds, count, '  ' * (len(path) - 1),
+                                        path[-1]), file=f)
+
+        print('', file=f)
+        print('Events (%d events, %.3f host seconds)' %
+              (event_count, event_time), file=f)
+        print('%10s %6s %12s %10s  %s' %
+              ('seconds', '%', 'events', 'ns/event', 'event'), file=f)
+        for (name, count, seconds) in events:
+            print('%10.3f %6.2f %12d %10.1f  %s' %
+                  (seconds, 100.0 * seconds / event_time if event_time else 0,
+                   count, 1e9 * seconds / count if count else 0, name),
+                  file=f)
+
+    stacks = _self_times(events, event_time)
+    with open(os.path.join(_outdir, 'host_profile.folded'), 'w') as f:
+        for stack in sorted(stacks):
+            us = int(round(stacks[stack] * 1e6))
+            if us > 0:
+                print('%s %d' % (';'.join(stack), us), file=f)
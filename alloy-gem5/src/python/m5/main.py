@@ -105,6 +105,13 @@ def parse_options():
     group("Statistics Options")
     option("--stats-file", metavar="FILE", default="stats.txt",
         help="Sets the output file for statistics [Default: %default]")
+    option("--dump-stats-at-exit", action="store_true", default=False,
+        help="Dump the stats when gem5 exits, otherwise only the config " \
+             "script and the stats region of the workload dump them")
+    option("--host-profile", action="store_true", default=False,
+        help="Profile the host time of the config phases and of the " \
+             "events of every SimObject, writes host_profile.txt and " \
+             "host_profile.folded (for flamegraph.pl) to the outdir")
 
     # Configuration Options
     group("Configuration Options")
@@ -198,6 +205,7 @@ def main(*args):
     import debug
     import defines
     import event
+    import host_profile
     import info
     import stats
     import trace
@@ -250,6 +258,9 @@ def main(*args):
         redir_fd = os.open(stderr_file, os. O_WRONLY | os.O_CREAT | os.O_TRUNC)
         os.dup2(redir_fd, sys.stderr.fileno())
 
+    if options.host_profile:
+        host_profile.enable(options.outdir)
+
     done = False
 
     if options.build_info:
@@ -432,7 +443,8 @@ def main(*args):
                 t = t.tb_next
                 pdb.interaction(t.tb_frame,t)
     else:
-        exec filecode in scope
+        with host_profile.phase('script'):
+            exec filecode in scope
 
     # once the script is done
     if options.interactive:
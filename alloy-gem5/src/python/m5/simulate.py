@@ -51,6 +51,7 @@ import _m5.drain
 import _m5.core
 from _m5.stats import updateEvents as updateStatEvents
 
+import host_profile
 import stats
 import SimObject
 import ticks
@@ -73,7 +74,12 @@ _drain_manager = _m5.drain.DrainManager.instance()
 
 # The final hook to generate .ini files.  Called from the user script
 # once the config is built.
-def instantiate(ckpt_dir=None):
+def instantiate(ckpt_dir=None, shared_memory_image=False,
+                memory_image_dir=""):
+    with host_profile.phase('instantiate'):
+        _instantiate(ckpt_dir, shared_memory_image, memory_image_dir)
+
+def _instantiate(ckpt_dir, shared_memory_image, memory_image_dir):
     from m5 import options
 
     root = objects.Root.getInstance()
@@ -81,15 +87,25 @@ def instantiate(ckpt_dir=None):
     if not root:
         fatal("Need to instantiate Root() before calling instantiate()")
 
+    # Restore the memories of all systems from uncompressed images that
+    # are shared copy-on-write with other restores of the checkpoint
+    if ckpt_dir and shared_memory_image:
+        for obj in root.descendants():
+            if isinstance(obj, objects.System):
+                obj.shared_memory_image = True
+                obj.memory_image_dir = memory_image_dir
+
     # we need to fix the global frequency
     ticks.fixGlobalFrequency()
 
     # Make sure SimObject-valued params are in the configuration
     # hierarchy so we catch them with future descendants() walks
-    for obj in root.descendants(): obj.adoptOrphanParams()
+    host_profile.for_each('adoptOrphanParams', root.descendants(),
+                          'adoptOrphanParams')
 
     # Unproxy in sorted order for determinism
-    for obj in root.descendants(): obj.unproxyParams()
+    host_profile.for_each('unproxyParams', root.descendants(),
+                          'unproxyParams')
 
     if options.dump_config:
         ini_file = file(os.path.join(options.outdir, options.dump_config), 'w')
@@ -114,20 +130,23 @@ def instantiate(ckpt_dir=None):
     stats.initSimStats()
 
     # Create the C++ sim objects and connect ports
-    for obj in root.descendants(): obj.createCCObject()
-    for obj in root.descendants(): obj.connectPorts()
+    host_profile.for_each('createCCObject', root.descendants(),
+                          'createCCObject')
+    host_profile.for_each('connectPorts', root.descendants(), 'connectPorts')
 
     # Do a second pass to finish initializing the sim objects
-    for obj in root.descendants(): obj.init()
+    host_profile.for_each('init', root.descendants(), 'init')
 
     # Do a third pass to initialize statistics
-    for obj in root.descendants(): obj.regStats()
+    host_profile.for_each('regStats', root.descendants(), 'regStats')
 
     # Do a fourth pass to initialize probe points
-    for obj in root.descendants(): obj.regProbePoints()
+    host_profile.for_each('regProbePoints', root.descendants(),
+                          'regProbePoints')
 
     # Do a fifth pass to connect probe listeners
-    for obj in root.descendants(): obj.regProbeListeners()
+    host_profile.for_each('regProbeListeners', root.descendants(),
+                          'regProbeListeners')
 
     # We want to generate the DVFS diagram for the system. This can only be
     # done once all of the CPP objects have been created and initialised so
@@ -143,9 +162,10 @@ def instantiate(ckpt_dir=None):
         _drain_manager.preCheckpointRestore()
         ckpt = _m5.core.getCheckpoint(ckpt_dir)
         _m5.core.unserializeGlobals(ckpt);
-        for obj in root.descendants(): obj.loadState(ckpt)
+        host_profile.for_each('loadState', root.descendants(),
+                              'loadState', ckpt)
     else:
-        for obj in root.descendants(): obj.initState()
+        host_profile.for_each('initState', root.descendants(), 'initState')
 
     # Check to see if any of the stat events are in the past after resuming from
     # a checkpoint, If so, this call will shift them to be at a valid time.
@@ -153,19 +173,22 @@ def instantiate(ckpt_dir=None):
 
 need_startup = True
 def simulate(*args, **kwargs):
+    from m5 import options
     global need_startup
 
     if need_startup:
         root = objects.Root.getInstance()
-        for obj in root.descendants(): obj.startup()
+        host_profile.for_each('startup', root.descendants(), 'startup')
         need_startup = False
 
     # @Tuan: assuming all apps annotate their stats region in their code,
     # there's no need to dump the stats for the region after stats_control
-    # is disabled. Therefore, it's okay to always turn this stats dump off.
+    # is disabled. Therefore, it's okay to turn this stats dump off unless
+    # it is asked for (--dump-stats-at-exit, e.g. for speed benchmarks).
         ## Python exit handlers happen in reverse order.
         ## We want to dump stats last.
-        #atexit.register(stats.dump)
+        if options.dump_stats_at_exit:
+            atexit.register(stats.dump)
 
         # register our C++ exit callback function with Python
         atexit.register(_m5.core.doExitCleanup)
@@ -176,7 +199,8 @@ def simulate(*args, **kwargs):
     if _drain_manager.isDrained():
         _drain_manager.resume()
 
-    return _m5.event.simulate(*args, **kwargs)
+    with host_profile.phase('simulate'):
+        return _m5.event.simulate(*args, **kwargs)
 
 def drain():
     """Drain the simulator in preparation of a checkpoint or memory mode
@@ -76,6 +76,15 @@ class System(MemObject):
     mmap_using_noreserve = Param.Bool(False, "mmap the backing store " \
                                           "without reserving swap")
 
+    # When many simulations restore the same checkpoint, the memory can
+    # be restored by mapping an uncompressed image of it copy-on-write,
+    # so that all simulations share the pages they do not write.
+    shared_memory_image = Param.Bool(False, "Restore memory by mapping an " \
+                                     "uncompressed image copy-on-write")
+    memory_image_dir = Param.String("", "Directory of the uncompressed " \
+                                    "memory images, the checkpoint " \
+                                    "directory if empty")
+
     # The memory ranges are to be populated when creating the system
     # such that these can be passed from the I/O subsystem through an
     # I/O bridge or cache
@@ -33,6 +33,7 @@
  */
 
 #include <cassert>
+#include <chrono>
 #include <iostream>
 #include <string>
 #include <unordered_map>
@@ -233,7 +234,10 @@ EventQueue::serviceOne()
         // forward current cycle to the time when this event occurs.
         setCurTick(event->when());
 
-        event->process();
+        if (profiling)
+            profiledProcess(event);
+        else
+            event->process();
         if (event->isExitEvent()) {
             assert(!event->flags.isSet(Event::Managed) ||
                    !event->flags.isSet(Event::IsMainQueue)); // would be silly
@@ -373,6 +377,67 @@ EventQueue::replaceHead(Event* s)
     return t;
 }
 
+bool EventQueue::profiling = false;
+
+void
+EventQueue::profiledProcess(Event *event)
+{
+    // Name the event before processing it, it may be gone afterwards.
+    // Unnamed events are grouped by their description, and the names of
+    // wrapped functions are usually the name of their SimObject.
+    static const std::string wrapped(".wrapped_function_event");
+    std::string name = event->name();
+    if (name.compare(0, 6, "Event_") == 0) {
+        name = event->description();
+    } else if (name.size() > wrapped.size() &&
+               name.compare(name.size() - wrapped.size(), wrapped.size(),
+                            wrapped) == 0) {
+        name.resize(name.size() - wrapped.size());
+    }
+
+    auto start = std::chrono::steady_clock::now();
+    event->process();
+    std::chrono::duration<double> elapsed =
+        std::chrono::steady_clock::now() - start;
+
+    ProfileEntry &entry = profile[name];
+    entry.count++;
+    entry.seconds += elapsed.count();
+}
+
+std::vector<std::tuple<std::string, uint64_t, double>>
+EventQueue::getProfile() const
+{
+    std::vector<std::tuple<std::string, uint64_t, double>> entries;
+    for (const auto &p : profile)
+        entries.emplace_back(p.first, p.second.count, p.second.seconds);
+    return entries;
+}
+
+void
+setEventProfiling(bool enabled)
+{
+    EventQueue::profiling = enabled;
+}
+
+std::vector<std::tuple<std::string, uint64_t, double>>
+getEventProfile()
+{
+    std::unordered_map<std::string, std::pair<uint64_t, double>> sum;
+    for (uint32_t i = 0; i < numMainEventQueues; ++i) {
+        for (const auto &e : mainEventQueue[i]->getProfile()) {
+            auto &s = sum[std::get<0>(e)];
+            s.first += std::get<1>(e);
+            s.second += std::get<2>(e);
+        }
+    }
+
+    std::vector<std::tuple<std::string, uint64_t, double>> entries;
+    for (const auto &s : sum)
+        entries.emplace_back(s.first, s.second.first, s.second.second);
+    return entries;
+}
+
 void
 dumpMainQueue()
 {
@@ -46,6 +46,9 @@
 #include <memory>
 #include <mutex>
 #include <string>
+#include <tuple>
+#include <unordered_map>
+#include <vector>
 
 #include "base/flags.hh"
 #include "base/types.hh"
@@ -82,6 +85,14 @@ extern bool inParallelMode;
 //! is with in bounds.
 EventQueue *getEventQueue(uint32_t index);
 
+//! Turn the host time profile of the serviced events on or off.
+void setEventProfiling(bool enabled);
+
+//! The event profile summed over all main event queues, as (name, number
+//! of events, host seconds). Events are named after the SimObject they
+//! belong to where possible (see EventQueue::profiledProcess()).
+std::vector<std::tuple<std::string, uint64_t, double>> getEventProfile();
+
 inline EventQueue *curEventQueue() { return _curEventQueue; }
 inline void curEventQueue(EventQueue *q) { _curEventQueue = q; }
 
@@ -534,6 +545,18 @@ class EventQueue
     //! owning thread, should call this function instead of insert().
     void asyncInsert(Event *event);
 
+    //! Number of serviced events and host seconds spent in them per
+    //! event name, only collected while profiling is on.
+    struct ProfileEntry
+    {
+        uint64_t count;
+        double seconds;
+    };
+    std::unordered_map<std::string, ProfileEntry> profile;
+
+    //! Service an event and account its host time in the profile.
+    void profiledProcess(Event *event);
+
     EventQueue(const EventQueue &);
 
   public:
@@ -629,6 +652,13 @@ class EventQueue
 
     Event *serviceOne();
 
+    //! Whether serviceOne() profiles the events of all event queues.
+    static bool profiling;
+
+    //! The profile of this queue as (name, count, host seconds).
+    std::vector<std::tuple<std::string, uint64_t, double>>
+    getProfile() const;
+
     // process all events up to the given timestamp.  we inline a
     // quick test to see if there are any events to process; if so,
     // call the internal out-of-line version to process them all.
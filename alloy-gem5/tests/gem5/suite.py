@@ -34,6 +34,7 @@ from testlib.test import TestFunction
 from testlib.suite import TestSuite
 from testlib.helper import log_call
 from testlib.config import constants, config
+from testlib.selection import record_run
 from fixture import TempdirFixture, Gem5Fixture, VariableFixture
 import verifier
 
@@ -160,4 +161,7 @@ def _create_test_run_gem5(config, config_args, gem5_args):
         command.extend(config_args)
         returncode.value = log_call(params.log, command)
 
+        # Keep the config and the SimObjects of the run for test selection.
+        record_run(params.suite, config, tempdir)
+
     return test_run_gem5
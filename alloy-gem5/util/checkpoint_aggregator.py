@@ -31,9 +31,18 @@
 
 from ConfigParser import ConfigParser
 import gzip
+import mmap
+import multiprocessing
+import shutil
 
 import sys, re, os
 
+page_size = 1 << 12
+zero_page = "\0" * page_size
+
+# pages decompressed and written at a time
+chunk_pages = 256
+
 class myCP(ConfigParser):
     def __init__(self):
         ConfigParser.__init__(self)
@@ -41,35 +50,127 @@ class myCP(ConfigParser):
     def optionxform(self, optionstr):
         return optionstr
 
-def aggregate(output_dir, cpts, no_compress, memory_size):
-    merged_config = None
-    page_ptr = 0
+def readConfig(cpt):
+    """Returns the sections of a checkpoint as [(section, items)]"""
+    config = myCP()
+    config.readfp(open(cpt + "/m5.cpt"))
+    return [ (sec, config.items(sec)) for sec in config.sections() ]
+
+def pageChunks(path, pages):
+    """Yields (first page, data) of the decompressed memory of a checkpoint"""
+    gf = gzip.GzipFile(path, mode="rb")
+    page = 0
+    while page < pages:
+        n = min(chunk_pages, pages - page)
+        data = gf.read(n * page_size)
+        if not data:
+            break
+        yield page, data
+        page += n
+    gf.close()
+
+def nonZeroRuns(data):
+    """Yields (first page, last page + 1) of the runs of non-zero pages"""
+    start = None
+    n = (len(data) + page_size - 1) // page_size
+    for p in xrange(n):
+        zero = data[p * page_size:(p + 1) * page_size] == \
+               zero_page[:len(data) - p * page_size]
+        if zero and start is not None:
+            yield start, p
+            start = None
+        elif not zero and start is None:
+            start = p
+    if start is not None:
+        yield start, n
+
+def writeZeroPages(f, pages):
+    while pages > 0:
+        n = min(chunk_pages, pages)
+        f.write(zero_page * n)
+        pages -= n
+
+def copyMemory(job):
+    """Copies the memory of one checkpoint into the aggregate. Runs in a
+    worker process, returns the number of non-zero pages."""
+    (cpt, pages, page_offset, output, mode, compress_level, last) = job
+    path = cpt + "/system.physmem.store0.pmem"
+    copied = 0
+
+    if mode == "compress":
+        # Every input becomes its own gzip member, the members are
+        # concatenated afterwards. gzread() reads concatenated members as one
+        # stream and unserializeStore() leaves memory past the end of the
+        # stream zeroed, so trailing zero pages of the last input are dropped.
+        gf = gzip.GzipFile(output, mode="wb", compresslevel=compress_level)
+        zeros = 0
+        seen = 0
+        for (first, data) in pageChunks(path, pages):
+            pos = 0
+            for (start, end) in nonZeroRuns(data):
+                writeZeroPages(gf, zeros + start - pos)
+                gf.write(data[start * page_size:end * page_size])
+                copied += end - start
+                zeros = 0
+                pos = end
+            n = (len(data) + page_size - 1) // page_size
+            zeros += n - pos
+            seen = first + n
+        if not last:
+            # keep the offsets of the following inputs
+            writeZeroPages(gf, zeros + pages - seen)
+        gf.close()
+        return copied
 
+    f = open(output, "r+b")
+    if mode == "mmap":
+        # page offsets are multiples of mmap.ALLOCATIONGRANULARITY
+        mm = mmap.mmap(f.fileno(), pages * page_size,
+                       offset=page_offset * page_size)
+    for (first, data) in pageChunks(path, pages):
+        # the output is preallocated and zero, skip the zero pages
+        for (start, end) in nonZeroRuns(data):
+            run = data[start * page_size:end * page_size]
+            offset = (first + start) * page_size
+            if mode == "mmap":
+                mm[offset:offset + len(run)] = run
+            else:
+                f.seek(page_offset * page_size + offset)
+                f.write(run)
+            copied += end - start
+    if mode == "mmap":
+        mm.flush()
+        mm.close()
+    f.close()
+    return copied
+
+def aggregate(output_dir, cpts, no_compress, memory_size, jobs=None,
+              use_mmap=False, compress_level=6):
     output_path = output_dir
     if not os.path.isdir(output_path):
-        os.system("mkdir -p " + output_path)
+        os.makedirs(output_path)
 
-    agg_mem_file = open(output_path + "/system.physmem.store0.pmem", "wb+")
-    agg_config_file = open(output_path + "/m5.cpt", "wb+")
+    agg_mem_path = output_path + "/system.physmem.store0.pmem"
 
-    if not no_compress:
-        merged_mem = gzip.GzipFile(fileobj= agg_mem_file, mode="wb")
+    pool = multiprocessing.Pool(jobs)
+    configs = pool.map(readConfig, cpts)
 
+    merged_config = myCP()
+    page_ptr = 0
+    page_offsets = []
+    num_pages = []
     max_curtick = 0
     num_digits = len(str(len(cpts)-1))
 
-    for (i, arg) in enumerate(cpts):
-        print arg
-        merged_config = myCP()
-        config = myCP()
-        config.readfp(open(cpts[i] + "/m5.cpt"))
+    for (i, sections) in enumerate(configs):
+        print cpts[i]
+        pages = 0
 
-        for sec in config.sections():
+        for (sec, items) in sections:
             if re.compile("cpu").search(sec):
                 newsec = re.sub("cpu", "cpu" + str(i).zfill(num_digits), sec)
                 merged_config.add_section(newsec)
 
-                items = config.items(sec)
                 for item in items:
                     if item[0] == "paddr":
                         merged_config.set(newsec, item[0], int(item[1]) + (page_ptr << 12))
@@ -80,54 +181,69 @@ def aggregate(output_dir, cpts, no_compress, memory_size):
                     merged_config.set(newsec, "M5_pid", i)
 
             elif sec == "system":
-                pass
+                pages = int(dict(items)["pagePtr"])
             elif sec == "Globals":
-                tick = config.getint(sec, "curTick")
+                tick = int(dict(items)["curTick"])
                 if tick > max_curtick:
                     max_curtick = tick
             else:
                 if i == len(cpts)-1:
                     merged_config.add_section(sec)
-                    for item in config.items(sec):
+                    for item in items:
                         merged_config.set(sec, item[0], item[1])
 
-        if i != len(cpts)-1:
-            merged_config.write(agg_config_file)
-
         ### memory stuff
-        pages = int(config.get("system", "pagePtr"))
+        page_offsets.append(page_ptr)
+        num_pages.append(pages)
         page_ptr = page_ptr + pages
         print "pages to be read: ", pages
 
-        f = open(cpts[i] + "/system.physmem.store0.pmem", "rb")
-        gf = gzip.GzipFile(fileobj=f, mode="rb")
-
-        x = 0
-        while x < pages:
-            bytesRead = gf.read(1 << 12)
-            if not no_compress:
-                merged_mem.write(bytesRead)
-            else:
-                agg_mem_file.write(bytesRead)
-            x += 1
-
-        gf.close()
-        f.close()
-
     merged_config.add_section("system")
     merged_config.set("system", "pagePtr", page_ptr)
     merged_config.set("system", "nextPID", len(cpts))
 
-    file_size = page_ptr * 4 * 1024
-    dummy_data = "".zfill(4096)
-    while file_size < memory_size:
-        if not no_compress:
-            merged_mem.write(dummy_data)
-        else:
-            agg_mem_file.write(dummy_data)
-        file_size += 4 * 1024
-        page_ptr += 1
+    # pad the image up to memory_size
+    if memory_size > page_ptr * page_size:
+        total_pages = (memory_size + page_size - 1) // page_size
+    else:
+        total_pages = page_ptr
 
+    # Every input is copied by a worker at its page offset
+    if no_compress:
+        mode = use_mmap and "mmap" or "raw"
+        # preallocate the (sparse) image, pages never written stay zero
+        agg_mem_file = open(agg_mem_path, "wb")
+        agg_mem_file.truncate(total_pages * page_size)
+        agg_mem_file.close()
+        outputs = [ agg_mem_path ] * len(cpts)
+    else:
+        mode = "compress"
+        outputs = [ "%s.%d" % (agg_mem_path, i) for i in xrange(len(cpts)) ]
+
+    jobs = [ (cpts[i], num_pages[i], page_offsets[i], outputs[i], mode,
+              compress_level, i == len(cpts)-1)
+             for i in xrange(len(cpts)) if num_pages[i] > 0 ]
+    copied = 0
+
+    if no_compress:
+        copied = sum(pool.imap_unordered(copyMemory, jobs))
+    else:
+        # append the members in order as soon as they are done
+        agg_mem_file = open(agg_mem_path, "wb")
+        for (job, n) in zip(jobs, pool.imap(copyMemory, jobs)):
+            part = open(job[3], "rb")
+            shutil.copyfileobj(part, agg_mem_file, 1 << 20)
+            part.close()
+            os.remove(job[3])
+            copied += n
+        agg_mem_file.close()
+
+    pool.close()
+    pool.join()
+
+    print "non-zero pages copied: ", copied, "of", page_ptr
+
+    page_ptr = total_pages
     print "WARNING: "
     print "Make sure the simulation using this checkpoint has at least ",
     print page_ptr, "x 4K of memory"
@@ -136,13 +252,9 @@ def aggregate(output_dir, cpts, no_compress, memory_size):
     merged_config.add_section("Globals")
     merged_config.set("Globals", "curTick", max_curtick)
 
+    agg_config_file = open(output_path + "/m5.cpt", "wb+")
     merged_config.write(agg_config_file)
-
-    if not no_compress:
-        merged_mem.close()
-        agg_mem_file.close()
-    else:
-        agg_mem_file.close()
+    agg_config_file.close()
 
 if __name__ == "__main__":
     from argparse import ArgumentParser
@@ -153,6 +265,12 @@ if __name__ == "__main__":
     parser.add_argument("-c", "--no-compress", action="store_true")
     parser.add_argument("--cpts", nargs='+')
     parser.add_argument("--memory-size", action="store", type=int)
+    parser.add_argument("-j", "--jobs", action="store", type=int,
+                        help="Worker processes (default: number of CPUs)")
+    parser.add_argument("--mmap", action="store_true",
+                        help="Write the uncompressed image through mmap")
+    parser.add_argument("--compress-level", action="store", type=int,
+                        default=6, help="gzip level of the compressed image")
 
     # Assume x86 ISA.  Any other ISAs would need extra stuff in this script
     # to appropriately parse their page tables and understand page sizes.
@@ -161,6 +279,9 @@ if __name__ == "__main__":
     if len(options.cpts) <= 1:
         parser.error("You must specify atleast two checkpoint files that "\
                      "need to be combined.")
+    if options.mmap and not options.no_compress:
+        parser.error("--mmap needs an uncompressed image (-c)")
 
     aggregate(options.output_dir, options.cpts, options.no_compress,
-              options.memory_size)
+              options.memory_size, options.jobs, options.mmap,
+              options.compress_level)
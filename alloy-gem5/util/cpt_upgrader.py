@@ -72,13 +72,23 @@
 # upgrader. This can be especially valuable when maintaining private
 # upgraders in private branches.
 
+# Many checkpoints can be upgraded at once by passing several files or
+# directories, optionally with -j to use a pool of worker processes. The
+# upgrade plan of each distinct tag set is only resolved once, checkpoints
+# that are already current are recognized from their [Globals] header
+# without parsing the rest of the file, and a summary is printed at the end.
+
 
 import ConfigParser
-import glob, types, sys, os
+import glob, types, sys, os, re
+import multiprocessing
 import os.path as osp
 
 verbose_print = False
 
+class UpgradeError(Exception):
+    pass
+
 def verboseprint(*args):
     if not verbose_print:
         return
@@ -91,6 +101,7 @@ class Upgrader:
     untag_set = set() # tags to remove by downgrading
     by_tag = {}
     legacy = {}
+    plans = {} # upgrade plan of every tag set seen so far
     def __init__(self, filename):
         self.filename = filename
         execfile(filename, {}, self.__dict__)
@@ -157,6 +168,38 @@ class Upgrader:
     def get(tag):
         return Upgrader.by_tag[tag]
 
+    @staticmethod
+    def plan(tags):
+        """Returns the tags to apply to a checkpoint with the given tags,
+        in an order respecting the dependences"""
+        key = frozenset(tags)
+        if key in Upgrader.plans:
+            return Upgrader.plans[key]
+
+        tags = set(tags)
+        plan = []
+        # Apply migrations for tags not in checkpoint and tags present for
+        # which downgraders are present, respecting dependences
+        to_apply = (Upgrader.tag_set - tags) | (Upgrader.untag_set & tags)
+        while to_apply:
+            ready = sorted([ t for t in to_apply
+                             if Upgrader.get(t).ready(tags) ])
+            if not ready:
+                raise UpgradeError("could not apply these upgrades: %s\n"
+                                   "update dependences impossible to "
+                                   "resolve; aborting" % ' '.join(to_apply))
+
+            for tag in ready:
+                if tag in Upgrader.tag_set:
+                    tags.add(tag)
+                else:
+                    tags.remove(tag)
+            plan += ready
+            to_apply -= set(ready)
+
+        Upgrader.plans[key] = plan
+        return plan
+
     @staticmethod
     def load_all():
         util_dir = osp.dirname(osp.abspath(__file__))
@@ -184,10 +227,35 @@ class Upgrader:
                           "nonexistent tag '%s'" % (tag, dep)
                     sys.exit(1)
 
+def read_tags(path):
+    """Returns the version tags of a checkpoint, reading only up to its
+    version information. Returns None for legacy (cpt_ver) checkpoints and
+    checkpoints without version information."""
+    section = None
+    with open(path, 'r') as f:
+        for line in f:
+            m = re.match(r'\s*\[(.*)\]', line)
+            if m:
+                section = m.group(1)
+                continue
+            if section == 'Globals':
+                m = re.match(r'\s*version_tags\s*[=:](.*)', line)
+                if m:
+                    return set(m.group(1).split())
+            elif section == 'root' and re.match(r'\s*cpt_ver\s*[=:]', line):
+                return None
+    return None
+
+def is_current(path):
+    """True if the checkpoint needs no upgrades"""
+    tags = read_tags(path)
+    return tags is not None and not Upgrader.plan(tags)
+
 def process_file(path, **kwargs):
+    """Upgrades a checkpoint, returns True if it was changed"""
     if not osp.isfile(path):
         import errno
-        raise IOError(ennro.ENOENT, "No such file", path)
+        raise IOError(errno.ENOENT, "No such file", path)
 
     verboseprint("Processing file %s...." % path)
 
@@ -223,8 +291,7 @@ def process_file(path, **kwargs):
     elif cpt.has_option('Globals','version_tags'):
         tags = set((''.join(cpt.get('Globals','version_tags'))).split())
     else:
-        print "fatal: no version information in checkpoint"
-        exit(1)
+        raise UpgradeError("no version information in checkpoint")
 
     verboseprint("has tags", ' '.join(tags))
     # If the current checkpoint has a tag we don't know about, we have
@@ -235,35 +302,68 @@ def process_file(path, **kwargs):
         print "warning: upgrade script does not recognize the following "\
               "tags in this checkpoint:", ' '.join(unknown_tags)
 
-    # Apply migrations for tags not in checkpoint and tags present for which
-    # downgraders are present, respecting dependences
-    to_apply = (Upgrader.tag_set - tags) | (Upgrader.untag_set & tags)
-    while to_apply:
-        ready = set([ t for t in to_apply if Upgrader.get(t).ready(tags) ])
-        if not ready:
-            print "could not apply these upgrades:", ' '.join(to_apply)
-            print "update dependences impossible to resolve; aborting"
-            exit(1)
-
-        for tag in ready:
-            Upgrader.get(tag).update(cpt, tags)
-            change = True
-
-        to_apply -= ready
+    for tag in Upgrader.plan(tags):
+        Upgrader.get(tag).update(cpt, tags)
+        change = True
 
     if not change:
         verboseprint("...nothing to do")
-        return
+        return False
 
     cpt.set('Globals', 'version_tags', ' '.join(tags))
 
     # Write the old data back
     verboseprint("...completed")
     cpt.write(file(path, 'w'))
+    return True
+
+def process_batch_file(args):
+    """Upgrades one checkpoint of a batch, returns (path, result) where
+    result is 'current', 'upgraded' or an error message"""
+    path, options = args
+    try:
+        if is_current(path):
+            return path, 'current'
+        if process_file(path, **options):
+            return path, 'upgraded'
+        return path, 'current'
+    except (UpgradeError, IOError, ConfigParser.Error) as e:
+        return path, str(e)
+
+def process_batch(paths, jobs=1, **kwargs):
+    """Upgrades many checkpoints and prints a summary. Returns the number
+    of checkpoints that failed."""
+    work = [ (path, kwargs) for path in paths ]
+    if jobs > 1:
+        # the workers inherit the loaded upgraders
+        pool = multiprocessing.Pool(jobs)
+        results = pool.imap_unordered(process_batch_file, work, chunksize=4)
+    else:
+        results = (process_batch_file(w) for w in work)
+
+    upgraded, current, failed = 0, 0, []
+    for (path, result) in results:
+        if result == 'upgraded':
+            upgraded += 1
+            verboseprint("upgraded", path)
+        elif result == 'current':
+            current += 1
+        else:
+            failed.append((path, result))
+
+    if jobs > 1:
+        pool.close()
+        pool.join()
+
+    print "%d checkpoints: %d upgraded, %d already current, %d failed" % \
+        (len(paths), upgraded, current, len(failed))
+    for (path, error) in sorted(failed):
+        print "failed: %s: %s" % (path, error)
+    return len(failed)
 
 if __name__ == '__main__':
     from optparse import OptionParser, SUPPRESS_HELP
-    parser = OptionParser("usage: %prog [options] <filename or directory>")
+    parser = OptionParser("usage: %prog [options] <filename or directory>...")
     parser.add_option("-r", "--recurse", action="store_true",
                       help="Recurse through all subdirectories modifying "\
                            "each checkpoint that is found")
@@ -272,6 +372,8 @@ if __name__ == '__main__':
                       help="Do no backup each checkpoint before modifying it")
     parser.add_option("-v", "--verbose", action="store_true",
                       help="Print out debugging information as")
+    parser.add_option("-j", "--jobs", type="int", default=1,
+                      help="Upgrade checkpoints in this many processes")
     parser.add_option("--get-cc-file", action="store_true",
                       # used during build; generate src/sim/tags.cc and exit
                       help=SUPPRESS_HELP)
@@ -291,33 +393,42 @@ if __name__ == '__main__':
             print "  \"%s\"," % tag
         print "};"
         exit(0)
-    elif len(args) != 1:
+    elif len(args) < 1:
         parser.error("You must specify a checkpoint file to modify or a "\
                      "directory of checkpoints to recursively update")
 
-    # Deal with shell variables and ~
-    path = osp.expandvars(osp.expanduser(args[0]))
-
-    # Process a single file if we have it
-    if osp.isfile(path):
-        process_file(path, **vars(options))
-    # Process an entire directory
-    elif osp.isdir(path):
-        cpt_file = osp.join(path, 'm5.cpt')
-        if options.recurse:
-            # Visit very file and see if it matches
-            for root,dirs,files in os.walk(path):
-                for name in files:
-                    if name == 'm5.cpt':
-                        process_file(osp.join(root,name), **vars(options))
-                for dir in dirs:
-                    pass
-        # Maybe someone passed a cpt.XXXXXXX directory and not m5.cpt
-        elif osp.isfile(cpt_file):
-            process_file(cpt_file, **vars(options))
-        else:
-            print "Error: checkpoint file not found at in %s " % path,
-            print "and recurse not specified"
+    # Collect the checkpoints of all arguments
+    cpts = []
+    for arg in args:
+        # Deal with shell variables and ~
+        path = osp.expandvars(osp.expanduser(arg))
+
+        # Process a single file if we have it
+        if osp.isfile(path):
+            cpts.append(path)
+        # Process an entire directory
+        elif osp.isdir(path):
+            cpt_file = osp.join(path, 'm5.cpt')
+            if options.recurse:
+                # Visit very file and see if it matches
+                for root,dirs,files in os.walk(path):
+                    for name in files:
+                        if name == 'm5.cpt':
+                            cpts.append(osp.join(root,name))
+            # Maybe someone passed a cpt.XXXXXXX directory and not m5.cpt
+            elif osp.isfile(cpt_file):
+                cpts.append(cpt_file)
+            else:
+                print "Error: checkpoint file not found at in %s " % path,
+                print "and recurse not specified"
+                sys.exit(1)
+
+    if len(cpts) == 1 and options.jobs == 1:
+        try:
+            process_file(cpts[0], **vars(options))
+        except UpgradeError as e:
+            print "fatal:", e
             sys.exit(1)
+    elif process_batch(cpts, **vars(options)):
+        sys.exit(1)
     sys.exit(0)
-
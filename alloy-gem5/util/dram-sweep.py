@@ -0,0 +1,246 @@
+#!/usr/bin/env python2.7
+
+# Parallel DRAM characterization sweep. Runs configs/dram/sweep.py over a
+# grid of memory types, ranks, read percentages, address maps and
+# generator modes, splitting every configuration by the number of banks
+# across processes, and collects the bus utilisation, bandwidth, row hit
+# rates and power of every (banks, stride) step into one columnar table.
+#
+# The table is written as <output>/sweep.npz with one NumPy array per
+# column (see columns), e.g.
+#
+#   t = numpy.load('dram-sweep/sweep.npz')
+#   sel = (t['mem_type'] == 'DDR4_2400_8x8') & (t['addr_map'] == 1)
+#   best = t['bus_util'][sel].max()
+#
+# and plotted with util/plot_dram/dram_sweep_plot.py -u dram-sweep/sweep.npz
+#
+# Every run keeps its gem5 output in <output>/runs/<run>/, --reuse skips
+# the runs which completed before.
+#
+# Example:
+#   util/dram-sweep.py --mem-types DDR3_1600_8x8,DDR4_2400_8x8 \
+#       --addr-maps 0,1 --rd-percs 0,50,100 -j 32
+
+from __future__ import print_function, division
+
+import argparse
+import itertools
+import json
+import multiprocessing
+import os
+import subprocess
+import sys
+from multiprocessing.pool import ThreadPool
+
+try:
+    import numpy as np
+except ImportError:
+    print("Failed to import numpy")
+    sys.exit(1)
+
+gem5_dir = os.path.abspath(os.path.join(os.path.dirname(__file__), '..'))
+sweep_script = os.path.join(gem5_dir, 'configs', 'dram', 'sweep.py')
+
+# Columns of the table: the grid, the step, and the stats of the memory
+# controller in the stats dump of the step. The power is summed over the
+# ranks.
+grid_columns = ('mem_type', 'ranks', 'rd_perc', 'addr_map', 'mode')
+step_columns = ('banks', 'stride', 'burst_size', 'page_size', 'nbr_banks')
+stat_columns = {
+    'bus_util'       : 'busUtil',
+    'bus_util_read'  : 'busUtilRead',
+    'bus_util_write' : 'busUtilWrite',
+    'peak_bw'        : 'peakBW',
+    'avg_rd_bw'      : 'avgRdBW',
+    'avg_wr_bw'      : 'avgWrBW',
+    'read_row_hits'  : 'readRowHitRate',
+    'write_row_hits' : 'writeRowHitRate',
+    'avg_power'      : 'averagePower',
+}
+columns = grid_columns + step_columns + tuple(sorted(stat_columns))
+
+mem_ctrl = 'system.mem_ctrls'
+
+def read_dumps(stats_file):
+    """Returns the memory controller stats of every dump in a stats file,
+    as [{column: value}]"""
+    stat_names = dict((v, k) for (k, v) in stat_columns.items())
+    dumps = []
+    with open(stats_file) as f:
+        for line in f:
+            if line.startswith('---------- Begin'):
+                dumps.append(dict((c, 0.0) for c in stat_columns))
+                continue
+            if not line.startswith(mem_ctrl) or not dumps:
+                continue
+            l = line.split()
+            if len(l) < 2:
+                continue
+            # system.mem_ctrls.<stat> or system.mem_ctrls.rank<n>.<stat>
+            column = stat_names.get(l[0].rsplit('.', 1)[1])
+            if column is None:
+                continue
+            try:
+                value = float(l[1])
+            except ValueError:
+                continue
+            if value != value:
+                continue
+            if column == 'avg_power':
+                dumps[-1][column] += value
+            else:
+                dumps[-1][column] = value
+    return dumps
+
+def run_name(run):
+    return '%s-r%d-rd%d-map%d-%s-%dof%d' % (
+        run['mem_type'], run['ranks'], run['rd_perc'], run['addr_map'],
+        run['mode'], run['slice'] + 1, run['slices'])
+
+def run_sweep(args_and_run):
+    """Runs one slice of a configuration, returns the run with its rows"""
+    args, run = args_and_run
+    outdir = os.path.join(args.output, 'runs', run_name(run))
+    stats_file = os.path.join(outdir, 'stats.txt')
+    sweep_file = os.path.join(outdir, 'sweep.json')
+    done_file = os.path.join(outdir, 'done')
+
+    run['rows'] = []
+    if not (args.reuse and os.path.isfile(done_file)):
+        if not os.path.isdir(outdir):
+            os.makedirs(outdir)
+        elif os.path.isfile(done_file):
+            os.remove(done_file)
+        cmd = [args.gem5_bin, '--outdir=' + outdir,
+               '--redirect-stdout', '--redirect-stderr',
+               '--listener-mode=off', sweep_script,
+               '--mem-type=' + run['mem_type'],
+               '--mem-ranks=%d' % run['ranks'],
+               '--rd_perc=%d' % run['rd_perc'],
+               '--addr_map=%d' % run['addr_map'],
+               '--mode=' + run['mode'],
+               '--bank-slice=%d/%d' % (run['slice'], run['slices'])]
+        if args.verbose:
+            print(' '.join(cmd))
+        run['returncode'] = subprocess.call(cmd, cwd=gem5_dir)
+        if run['returncode'] != 0 or not os.path.isfile(sweep_file) \
+                or not os.path.isfile(stats_file):
+            run['status'] = 'failed (%d)' % run['returncode']
+            return run
+        open(done_file, 'w').close()
+
+    with open(sweep_file) as f:
+        sweep = json.load(f)
+    dumps = read_dumps(stats_file)
+    steps = sweep['steps']
+    if len(dumps) < len(steps):
+        run['status'] = 'failed (%d of %d stats dumps)' % (len(dumps),
+                                                           len(steps))
+        return run
+
+    # the dump of step i is at the end of its period
+    for ((banks, stride), stats) in zip(steps, dumps):
+        row = dict((c, run[c]) for c in grid_columns)
+        row.update(stats)
+        row.update(banks=banks, stride=stride,
+                   burst_size=sweep['burst_size'],
+                   page_size=sweep['page_size'],
+                   nbr_banks=sweep['nbr_banks'])
+        run['rows'].append(row)
+    run['status'] = 'done'
+    return run
+
+def write_table(path, rows):
+    table = dict((c, np.array([row[c] for row in rows])) for c in columns)
+    # keep the string columns readable without pickle
+    for c in ('mem_type', 'mode'):
+        table[c] = table[c].astype(str)
+    tmp = path + '.tmp.npz'
+    np.savez_compressed(tmp, **table)
+    os.rename(tmp, path)
+
+def comma_list(convert):
+    return lambda s: [convert(v) for v in s.split(',') if v]
+
+def main():
+    parser = argparse.ArgumentParser(
+        description='Sweep DRAM configurations in parallel')
+    parser.add_argument('--mem-types', type=comma_list(str),
+                        default=['DDR3_1600_8x8'],
+                        help='Memory types [default: DDR3_1600_8x8]')
+    parser.add_argument('--ranks', type=comma_list(int), default=[1],
+                        help='Numbers of ranks [default: 1]')
+    parser.add_argument('--rd-percs', type=comma_list(int), default=[100],
+                        help='Read percentages [default: 100]')
+    parser.add_argument('--addr-maps', type=comma_list(int), default=[0, 1],
+                        help='Address maps, 0: RoCoRaBaCh, 1: RoRaBaCoCh '
+                             '[default: 0,1]')
+    parser.add_argument('--modes', type=comma_list(str), default=['DRAM'],
+                        help='Generator modes, DRAM or DRAM_ROTATE '
+                             '[default: DRAM]')
+    parser.add_argument('-j', '--jobs', type=int,
+                        default=multiprocessing.cpu_count(),
+                        help='gem5 processes run in parallel '
+                             '[default: %(default)s]')
+    parser.add_argument('--slices', type=int, default=0,
+                        help='Runs every configuration is split into by '
+                             'the number of banks [default: enough to use '
+                             'all jobs]')
+    parser.add_argument('-o', '--output', default='dram-sweep',
+                        help='Output directory [default: %(default)s]')
+    parser.add_argument('--gem5-bin',
+                        default=os.path.join(gem5_dir, 'build', 'RISCV',
+                                             'gem5.opt'),
+                        help='gem5 binary [default: %(default)s]')
+    parser.add_argument('--reuse', action='store_true',
+                        help='Do not rerun the runs which completed')
+    parser.add_argument('-v', '--verbose', action='store_true',
+                        help='Print the gem5 command lines')
+    args = parser.parse_args()
+    args.output = os.path.abspath(args.output)
+    if not os.path.isdir(args.output):
+        os.makedirs(args.output)
+
+    grid = list(itertools.product(args.mem_types, args.ranks,
+                                  args.rd_percs, args.addr_maps,
+                                  args.modes))
+    slices = args.slices or max(1, -(-args.jobs // len(grid)))
+
+    runs = []
+    for config in grid:
+        for i in range(slices):
+            run = dict(zip(grid_columns, config))
+            run.update(slice=i, slices=slices)
+            runs.append(run)
+
+    print('Sweeping %d configurations in %d runs, %d at a time' %
+          (len(grid), len(runs), args.jobs))
+
+    pool = ThreadPool(args.jobs)
+    rows = []
+    failed = []
+    for (i, run) in enumerate(pool.imap_unordered(
+            run_sweep, [(args, run) for run in runs])):
+        print('[%d/%d] %s: %s' % (i + 1, len(runs), run_name(run),
+                                  run['status']))
+        sys.stdout.flush()
+        rows.extend(run['rows'])
+        if run['status'] != 'done':
+            failed.append(run)
+    pool.close()
+    pool.join()
+
+    rows.sort(key=lambda row: tuple(row[c] for c in columns))
+    table_file = os.path.join(args.output, 'sweep.npz')
+    write_table(table_file, rows)
+    print('Wrote %d steps to %s' % (len(rows), table_file))
+
+    if failed:
+        print('%d runs failed, see %s' % (len(failed),
+                                          os.path.join(args.output, 'runs')))
+        return 1
+    return 0
+
+if __name__ == '__main__':
+    sys.exit(main())
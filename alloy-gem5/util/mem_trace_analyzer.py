@@ -0,0 +1,428 @@
+#!/usr/bin/env python2.7
+
+# Author: Akash Pal (AP)
+
+# Locality profile of a gem5 protobuf packet trace (e.g. recorded with a
+# CommMonitor trace_file) for sizing caches and the MLC predictor. In one
+# pass over the trace it computes
+#
+#   - the LRU stack reuse distance of every access at cache line
+#     granularity, and from it the miss ratio of a fully associative LRU
+#     cache of every size
+#   - the strides between consecutive accesses of every PC
+#   - the number of writes to every line and the bitmap of the subblocks
+#     written in it
+#
+# The trace is decoded and analyzed in chunks of --chunk packets. The state
+# kept between chunks is proportional to the number of distinct lines and
+# PCs, not to the length of the trace: reuse distances are counted with a
+# Fenwick tree over the position of the last access of every line, which
+# is compacted whenever it fills up.
+#
+# Example:
+#   mem_trace_analyzer.py m5out/monitor.trc.gz --line-size 64 \
+#       --subblocks 8 -o profile
+#
+# writes profile.npz (the full reuse distance histogram and miss ratio
+# curve, and the write locality histograms) and profile.strides.csv.
+
+from __future__ import print_function, division
+
+import argparse
+import csv
+import os
+import subprocess
+import sys
+
+import numpy as np
+
+# Request commands in src/mem/packet.hh Command enum
+read_cmds = {
+    1: 'ReadReq', 10: 'SoftPFReq', 11: 'SoftPFExReq', 12: 'HardPFReq',
+    21: 'ReadExReq', 23: 'ReadCleanReq', 24: 'ReadSharedReq',
+    25: 'LoadLockedReq',
+}
+write_cmds = {
+    4: 'WriteReq', 6: 'WritebackDirty', 8: 'WriteClean',
+    15: 'WriteLineReq', 26: 'StoreCondReq', 29: 'SwapReq',
+}
+
+def read_chunks(trace_file, chunk):
+    """
+    Decode a protobuf packet trace and yield it as dicts of NumPy arrays of
+    at most chunk packets. The header is returned as the first item.
+    """
+    util_dir = os.path.dirname(os.path.realpath(__file__))
+    # Make sure the proto definitions are up to date.
+    subprocess.check_call(['make', '--quiet', '-C', util_dir,
+                           'packet_pb2.py'])
+    sys.path.insert(0, util_dir)
+    import packet_pb2
+    import protolib
+
+    proto_in = protolib.openFileRd(trace_file)
+    if proto_in.read(4) != b"gem5":
+        print("Unrecognized file", trace_file)
+        exit(-1)
+
+    header = packet_pb2.PacketHeader()
+    protolib.decodeMessage(proto_in, header)
+    yield header
+
+    packet = packet_pb2.Packet()
+    more = True
+    while more:
+        cmd, addr, size, pc = [], [], [], []
+        while len(cmd) < chunk:
+            if not protolib.decodeMessage(proto_in, packet):
+                more = False
+                break
+            cmd.append(packet.cmd)
+            addr.append(packet.addr)
+            size.append(packet.size)
+            pc.append(packet.pc if packet.HasField('pc') else 0)
+        if cmd:
+            yield {
+                'cmd': np.array(cmd, dtype=np.int64),
+                'addr': np.array(addr, dtype=np.uint64),
+                'size': np.array(size, dtype=np.int64),
+                'pc': np.array(pc, dtype=np.uint64),
+            }
+    proto_in.close()
+
+def add_counts(total, counts):
+    """
+    Add a histogram to a running histogram, growing it as needed.
+    """
+    if len(counts) > len(total):
+        counts[:len(total)] += total
+        return counts
+    total[:len(counts)] += counts
+    return total
+
+def log2_buckets(hist):
+    """
+    Sum a histogram over the buckets [0], [1], [2, 3], [4, 7], ... and
+    return [(low, high, count)].
+    """
+    buckets = []
+    low = 0
+    while low < len(hist):
+        high = max(2 * low - 1, low)
+        buckets.append((low, high, int(hist[low:high + 1].sum())))
+        low = high + 1
+    return buckets
+
+class ReuseDistance(object):
+    """
+    LRU stack distances: the number of distinct lines accessed since the
+    previous access to the same line.
+
+    Every line has a mark in a Fenwick tree at the time of its last access,
+    so the distance of an access is the number of marks after the previous
+    access of its line. Times are renumbered from 1 whenever the tree is
+    full, keeping only the marks of the live lines.
+    """
+    def __init__(self, capacity=1 << 16):
+        self.capacity = capacity
+        self.tree = [0] * (capacity + 1)
+        self.time = 0
+        self.last = {}
+        self.hist = np.zeros(1, dtype=np.int64)
+        self.cold = 0
+
+    def compact(self):
+        live = sorted(self.last.items(), key=lambda item: item[1])
+        if 2 * len(live) > self.capacity:
+            self.capacity *= 2
+        for (pos, (line, _)) in enumerate(live, 1):
+            self.last[line] = pos
+
+        # build the tree in linear time, adding every node to its parent
+        # once the node is complete
+        tree = [1] * (len(live) + 1) + [0] * (self.capacity - len(live))
+        tree[0] = 0
+        for pos in range(1, self.capacity + 1):
+            parent = pos + (pos & -pos)
+            if parent <= self.capacity:
+                tree[parent] += tree[pos]
+        self.tree = tree
+        self.time = len(live)
+
+    def access(self, lines):
+        """
+        Account the accesses to an array of lines, in order.
+        """
+        dists = []
+        last = self.last
+        tree = self.tree
+        capacity = self.capacity
+        time = self.time
+        for line in lines.tolist():
+            if time == capacity:
+                self.time = time
+                self.compact()
+                tree = self.tree
+                capacity = self.capacity
+                time = self.time
+            time += 1
+
+            pos = last.get(line)
+            if pos is None:
+                self.cold += 1
+            else:
+                # marks up to pos
+                before = 0
+                i = pos
+                while i > 0:
+                    before += tree[i]
+                    i -= i & -i
+                # all marks are before time, one per live line
+                dists.append(len(last) - before)
+                i = pos
+                while i <= capacity:
+                    tree[i] -= 1
+                    i += i & -i
+
+            i = time
+            while i <= capacity:
+                tree[i] += 1
+                i += i & -i
+            last[line] = time
+        self.time = time
+
+        if dists:
+            self.hist = add_counts(self.hist, np.bincount(dists))
+
+    def miss_ratio(self):
+        """
+        Miss ratio of a fully associative LRU cache of 0, 1, 2, ... lines,
+        one entry per size up to the largest distance plus one.
+        """
+        total = self.hist.sum() + self.cold
+        if not total:
+            return np.ones(1)
+        hits = np.concatenate(([0], np.cumsum(self.hist)))
+        return 1.0 - hits / total
+
+class Strides(object):
+    """
+    Counts of the strides between consecutive accesses of every PC. Only
+    the most common strides of a PC are kept once it has many.
+    """
+    def __init__(self, max_strides):
+        self.max_strides = max_strides
+        self.last = {}
+        self.accesses = {}
+        self.counts = {}
+
+    def access(self, pc, addr):
+        order = np.argsort(pc, kind='stable')
+        pc = pc[order]
+        addr = addr[order].astype(np.int64)
+
+        first = np.ones(len(pc), dtype=bool)
+        first[1:] = pc[1:] != pc[:-1]
+        stride = np.zeros(len(pc), dtype=np.int64)
+        stride[1:] = addr[1:] - addr[:-1]
+
+        # the first access of a PC in the chunk continues from the last
+        # access of the PC in the previous chunks
+        valid = ~first
+        for i in np.flatnonzero(first).tolist():
+            p = int(pc[i])
+            prev = self.last.get(p)
+            if prev is not None:
+                stride[i] = addr[i] - prev
+                valid[i] = True
+        last = np.flatnonzero(np.append(first[1:], True))
+        self.last.update(zip(pc[last].tolist(), addr[last].tolist()))
+
+        for (p, n) in zip(*np.unique(pc, return_counts=True)):
+            self.accesses[int(p)] = self.accesses.get(int(p), 0) + int(n)
+
+        pairs = np.stack((pc[valid].astype(np.int64), stride[valid]), axis=1)
+        if not len(pairs):
+            return
+        pairs, counts = np.unique(pairs, axis=0, return_counts=True)
+        for ((p, s), n) in zip(pairs.tolist(), counts.tolist()):
+            strides = self.counts.setdefault(p, {})
+            strides[s] = strides.get(s, 0) + n
+            if len(strides) > 4 * self.max_strides:
+                top = sorted(strides.items(), key=lambda i: -i[1])
+                self.counts[p] = dict(top[:self.max_strides])
+
+    def top(self, pc, n):
+        strides = self.counts.get(pc, {})
+        return sorted(strides.items(), key=lambda i: -i[1])[:n]
+
+class WriteLocality(object):
+    """
+    Number of writes to every line and the union of the subblocks they
+    wrote, plus the histogram of subblocks written per write.
+    """
+    def __init__(self, line_size, subblocks):
+        if line_size % subblocks or subblocks > 64:
+            raise ValueError("a %d byte line can not be split into %d "
+                             "subblocks" % (line_size, subblocks))
+        self.line_size = line_size
+        self.subblocks = subblocks
+        self.writes = {}
+        self.masks = {}
+        self.per_write = np.zeros(subblocks + 1, dtype=np.int64)
+
+    def access(self, addr, size):
+        granularity = self.line_size // self.subblocks
+        line = addr // np.uint64(self.line_size)
+        offset = (addr % np.uint64(self.line_size)).astype(np.int64)
+        first = offset // granularity
+        # writes crossing a line are clipped to their first line
+        end = np.minimum(offset + np.maximum(size, 1), self.line_size)
+        last = (end - 1) // granularity
+
+        ones = np.uint64(1)
+        high = np.where(last == 63, ~np.uint64(0),
+                        (ones << (last + 1).astype(np.uint64)) - ones)
+        mask = high & ~((ones << first.astype(np.uint64)) - ones)
+        self.per_write += np.bincount(last - first + 1,
+                                      minlength=self.subblocks + 1)
+
+        lines, inverse = np.unique(line, return_inverse=True)
+        counts = np.bincount(inverse)
+        masks = np.zeros(len(lines), dtype=np.uint64)
+        np.bitwise_or.at(masks, inverse, mask)
+        for (l, n, m) in zip(lines.tolist(), counts.tolist(),
+                             masks.tolist()):
+            self.writes[l] = self.writes.get(l, 0) + n
+            self.masks[l] = self.masks.get(l, 0) | m
+
+    def histograms(self):
+        """
+        Histograms of the writes per written line and of the subblocks
+        written per line.
+        """
+        writes = np.array(list(self.writes.values()), dtype=np.int64)
+        written = np.array([bin(m).count('1') for m in self.masks.values()],
+                           dtype=np.int64)
+        return (np.bincount(writes) if len(writes) else np.zeros(1),
+                np.bincount(written, minlength=self.subblocks + 1))
+
+def size_name(size):
+    for (unit, shift) in (('MB', 20), ('KB', 10)):
+        if size >= 1 << shift and size % (1 << shift) == 0:
+            return '%d%s' % (size >> shift, unit)
+    return '%dB' % size
+
+def int_list(value):
+    return [int(v) for v in value.split(',')]
+
+def main():
+    parser = argparse.ArgumentParser(
+        description="Reuse distance, stride and write locality profile of "
+        "a gem5 packet trace")
+    parser.add_argument("trace", help="protobuf packet trace")
+    parser.add_argument("--line-size", type=int, default=64,
+                        help="cache line size in bytes")
+    parser.add_argument("--subblocks", type=int, default=8,
+                        help="subblocks per line for the write bitmaps")
+    parser.add_argument("--cache-sizes", type=int_list, default=None,
+                        help="cache sizes in bytes to report the miss "
+                        "ratio of (default: powers of two up to the "
+                        "footprint)")
+    parser.add_argument("--chunk", type=int, default=1 << 18,
+                        help="packets decoded and analyzed at a time")
+    parser.add_argument("--strides", type=int, default=4,
+                        help="most common strides reported per PC")
+    parser.add_argument("--pcs", type=int, default=20,
+                        help="PCs with the most accesses reported")
+    parser.add_argument("-o", "--output", default=None,
+                        help="prefix of the .npz and .strides.csv outputs")
+    args = parser.parse_args()
+
+    chunks = read_chunks(args.trace, args.chunk)
+    header = next(chunks)
+
+    reuse = ReuseDistance()
+    strides = Strides(4 * args.strides)
+    writes = WriteLocality(args.line_size, args.subblocks)
+    num_reads = num_writes = num_other = 0
+
+    for trace in chunks:
+        is_read = np.isin(trace['cmd'], list(read_cmds))
+        is_write = np.isin(trace['cmd'], list(write_cmds))
+        num_reads += int(is_read.sum())
+        num_writes += int(is_write.sum())
+        num_other += int((~is_read & ~is_write).sum())
+
+        access = is_read | is_write
+        addr = trace['addr'][access]
+        reuse.access(addr // np.uint64(args.line_size))
+        strides.access(trace['pc'][access], addr)
+        writes.access(trace['addr'][is_write], trace['size'][is_write])
+
+    accesses = num_reads + num_writes
+    lines = len(reuse.last)
+    print("Trace %s (%s)" % (args.trace, header.obj_id))
+    print("  %d accesses (%d reads, %d writes), %d other packets" %
+          (accesses, num_reads, num_writes, num_other))
+    print("  %d distinct %d-byte lines, footprint %s" %
+          (lines, args.line_size, size_name(lines * args.line_size)))
+
+    print("\nReuse distance (distinct lines between accesses to a line)")
+    print("  %-22s %12s %8s" % ("distance", "accesses", "%"))
+    for (low, high, count) in log2_buckets(reuse.hist):
+        print("  %-22s %12d %8.2f" % ("%d-%d" % (low, high), count,
+              100.0 * count / max(accesses, 1)))
+    print("  %-22s %12d %8.2f" % ("cold", reuse.cold,
+          100.0 * reuse.cold / max(accesses, 1)))
+
+    miss_ratio = reuse.miss_ratio()
+    if args.cache_sizes:
+        sizes = args.cache_sizes
+    else:
+        sizes = [args.line_size << i
+                 for i in range(max(lines, 1).bit_length() + 1)]
+    print("\nMiss ratio of a fully associative LRU cache")
+    for size in sizes:
+        n = min(size // args.line_size, len(miss_ratio) - 1)
+        print("  %10s %8.4f" % (size_name(size), miss_ratio[n]))
+
+    top_pcs = sorted(strides.accesses.items(), key=lambda i: -i[1])
+    print("\nStrides of the %d PCs with the most accesses" %
+          min(args.pcs, len(top_pcs)))
+    if list(strides.accesses) == [0]:
+        print("  (the trace has no PCs)")
+    for (pc, n) in top_pcs[:args.pcs]:
+        common = ", ".join("%+d: %.1f%%" % (s, 100.0 * c / n)
+                           for (s, c) in strides.top(pc, args.strides))
+        print("  %#18x %10d  %s" % (pc, n, common))
+
+    writes_per_line, written_per_line = writes.histograms()
+    print("\nWrites per written line (%d lines)" % len(writes.writes))
+    for (low, high, count) in log2_buckets(writes_per_line)[1:]:
+        print("  %-22s %12d" % ("%d-%d" % (low, high), count))
+    print("\nSubblocks (of %d) written per write, and per line over the "
+          "trace" % args.subblocks)
+    for n in range(1, args.subblocks + 1):
+        print("  %4d %12d %12d" % (n, writes.per_write[n],
+                                   written_per_line[n]))
+
+    if args.output:
+        np.savez(args.output + '.npz',
+                 line_size=args.line_size,
+                 subblocks=args.subblocks,
+                 reuse_hist=reuse.hist,
+                 cold=reuse.cold,
+                 miss_ratio=miss_ratio,
+                 writes_per_line=writes_per_line,
+                 subblocks_per_line=written_per_line,
+                 subblocks_per_write=writes.per_write)
+        with open(args.output + '.strides.csv', 'w') as f:
+            writer = csv.writer(f)
+            writer.writerow(['pc', 'accesses', 'stride', 'count'])
+            for (pc, n) in top_pcs:
+                for (s, c) in strides.top(pc, args.strides):
+                    writer.writerow(['%#x' % pc, n, s, c])
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,348 @@
+#!/usr/bin/env python2.7
+
+# Author: Akash Pal (AP)
+
+# Offline, trace-driven model of the MLC subblock predictor in
+# src/mem/ruby/structures/CachePredictor.cc. It replays an L2 write trace
+# recorded with RubyCache.write_trace_file against a set of predictor
+# configurations and reports, for every configuration, how many writes
+# only touched subblocks that the predictor placed in soft bits and the
+# resulting mean write latency.
+#
+# Every configuration is evaluated with whole-trace NumPy operations, so a
+# sweep over hundreds of configurations takes minutes instead of one gem5
+# run per configuration.
+#
+# Example:
+#   mlc_predictor_sim.py m5out/l2_writes.trc.gz --entries 128,256,512 \
+#       --subblocks 2,4,8 --soft-latency 1 --hard-latency 2,3 -o sweep.csv
+
+from __future__ import print_function, division
+
+import argparse
+import csv
+import itertools
+import multiprocessing
+import os
+import subprocess
+import sys
+
+import numpy as np
+
+# Loaded trace, shared with the worker processes through fork()
+_trace = None
+
+def decode_trace(trace_file):
+    """
+    Decode a protobuf MLC write trace into a dict of NumPy arrays plus the
+    header fields.
+    """
+    util_dir = os.path.dirname(os.path.realpath(__file__))
+    # Make sure the proto definitions are up to date.
+    subprocess.check_call(['make', '--quiet', '-C', util_dir,
+                           'mlc_write_pb2.py'])
+    sys.path.insert(0, util_dir)
+    import mlc_write_pb2
+    import protolib
+
+    proto_in = protolib.openFileRd(trace_file)
+    if proto_in.read(4) != b"gem5":
+        print("Unrecognized file", trace_file)
+        exit(-1)
+
+    header = mlc_write_pb2.MLCWriteHeader()
+    protolib.decodeMessage(proto_in, header)
+
+    tick, addr, mask, pc, frame = [], [], [], [], []
+    write = mlc_write_pb2.MLCWrite()
+    while protolib.decodeMessage(proto_in, write):
+        tick.append(write.tick)
+        addr.append(write.addr)
+        mask.append(write.mask)
+        pc.append(write.pc if write.HasField('pc') else 0)
+        frame.append(write.frame if write.HasField('frame') else 0)
+    proto_in.close()
+
+    return {
+        'tick': np.array(tick, dtype=np.uint64),
+        'addr': np.array(addr, dtype=np.uint64),
+        'mask': np.array(mask, dtype=np.uint64),
+        'pc': np.array(pc, dtype=np.uint64),
+        'frame': np.array(frame, dtype=np.int64),
+        'block_size': header.block_size,
+        'granularity': header.granularity,
+    }
+
+def load_trace(trace_file, use_cache=True):
+    """
+    Load a trace, reusing a .npz cache next to it if it is newer than the
+    trace. Decoding the protobuf messages is by far the slowest step.
+    """
+    if trace_file.endswith('.npz'):
+        return dict(np.load(trace_file))
+
+    cache_file = trace_file + '.npz'
+    if use_cache and os.path.exists(cache_file) and \
+       os.path.getmtime(cache_file) >= os.path.getmtime(trace_file):
+        return dict(np.load(cache_file))
+
+    trace = decode_trace(trace_file)
+    if use_cache:
+        with open(cache_file, 'wb') as f:
+            np.savez(f, **trace)
+    return trace
+
+def subblock_masks(trace, subblocks):
+    """
+    Return an (n, subblocks) bool matrix of the subblocks touched by each
+    write, merging the finer grained trace mask bits as needed.
+    """
+    parts = int(trace['block_size']) // int(trace['granularity'])
+    if parts % subblocks:
+        raise ValueError("a trace with %d mask bits per block can not be "
+                         "split into %d subblocks" % (parts, subblocks))
+    group = parts // subblocks
+    group_mask = np.uint64((1 << group) - 1)
+    mask = trace['mask']
+    return np.stack([((mask >> np.uint64(s * group)) & group_mask) != 0
+                     for s in range(subblocks)], axis=1)
+
+def group_cumsum(keys, values):
+    """
+    Running sum of the rows of values over the rows sharing the same key,
+    in trace order and including the current row.
+    """
+    order = np.argsort(keys, kind='stable')
+    sorted_keys = keys[order]
+    sorted_values = values[order].astype(np.int64)
+
+    csum = np.cumsum(sorted_values, axis=0)
+    is_start = np.ones(len(keys), dtype=bool)
+    is_start[1:] = sorted_keys[1:] != sorted_keys[:-1]
+    start = np.maximum.accumulate(np.where(is_start, np.arange(len(keys)), 0))
+    sorted_result = csum - csum[start] + sorted_values[start]
+
+    result = np.empty_like(sorted_result)
+    result[order] = sorted_result
+    return result
+
+def previous_in_group(keys):
+    """
+    For every row, the index of the previous row with the same key, or -1.
+    """
+    order = np.argsort(keys, kind='stable')
+    sorted_keys = keys[order]
+    prev_sorted = np.full(len(keys), -1, dtype=np.int64)
+    same = sorted_keys[1:] == sorted_keys[:-1]
+    prev_sorted[1:][same] = order[:-1][same]
+    prev = np.empty_like(prev_sorted)
+    prev[order] = prev_sorted
+    return prev
+
+def table_index(pc, addr, entries):
+    """
+    Vectorized version of CachePredictor::getTableIndex: mid-square hash of
+    the concatenated pc and block offset.
+    """
+    with np.errstate(over='ignore'):
+        key = (pc << np.uint64(6)) | (addr & np.uint64(0x3F))
+        square = key * key
+    return ((square >> np.uint64(22)) % np.uint64(entries)).astype(np.int64)
+
+class Placement(object):
+    """
+    Per-write soft-bit placement produced by one predictor organization.
+    The latency assumptions are applied afterwards by latency(), so the
+    placement is only computed once per organization.
+    """
+    def __init__(self, written, soft):
+        self.written = written
+        self.nonsilent = written.any(axis=1)
+        self.in_soft = ~(written & ~soft).any(axis=1)
+
+    def latency(self, soft_latency, hard_latency, silent_latency):
+        return np.where(~self.nonsilent, silent_latency,
+                        np.where(self.in_soft, soft_latency, hard_latency))
+
+def simulate(trace, subblocks, soft_slots, entries, scope, key, tagged,
+             cache=None):
+    """
+    Replay the trace against one predictor organization and return the
+    predicted, static and oracle placements.
+    """
+    if cache is None:
+        cache = {}
+
+    written = cache.get(('written', subblocks))
+    if written is None:
+        written = subblock_masks(trace, subblocks)
+        cache[('written', subblocks)] = written
+
+    line = trace['frame'] if scope == 'frame' else trace['addr']
+
+    # Subblock order after each write, most written first with ties broken
+    # by subblock index like CacheMemory::getSubblockSequence
+    soft_after = cache.get(('soft', subblocks, soft_slots, scope))
+    if soft_after is None:
+        counts = group_cumsum(line, written)
+        order = np.argsort(-counts, axis=1, kind='stable')
+        soft_after = np.zeros_like(written)
+        np.put_along_axis(soft_after, order[:, :soft_slots], True, axis=1)
+        cache[('soft', subblocks, soft_slots, scope)] = soft_after
+
+    # Every write updates the table entry it hashes to, and the placement of
+    # a write is whatever the entry held before it
+    pc = trace['pc'] if key == 'pc' else trace['addr']
+    index = table_index(pc, trace['addr'], entries)
+    prev = previous_in_group(index)
+    hit = prev >= 0
+    if tagged:
+        hit &= (pc[prev] == pc) & (trace['addr'][prev] == trace['addr'])
+
+    static = np.zeros(subblocks, dtype=bool)
+    static[:soft_slots] = True
+    soft = np.where(hit[:, None], soft_after[prev], static[None, :])
+
+    oracle = Placement(written, written)
+    oracle.in_soft = written.sum(axis=1) <= soft_slots
+
+    return (Placement(written, soft),
+            Placement(written, np.broadcast_to(static, written.shape)),
+            oracle, hit)
+
+def evaluate(config):
+    """
+    Evaluate one predictor organization for all its latency assumptions
+    and return one result row per latency combination.
+    """
+    (subblocks, soft_slots, entries, scope, key, tagged, latencies) = config
+    predicted, static, oracle, hit = simulate(
+        _trace, subblocks, soft_slots, entries, scope, key, tagged,
+        _sim_cache)
+
+    writes = len(hit)
+    nonsilent = max(int(predicted.nonsilent.sum()), 1)
+    rows = []
+    for soft_latency, hard_latency, silent_latency in latencies:
+        lat = [p.latency(soft_latency, hard_latency, silent_latency).mean()
+               if writes else 0.0 for p in (predicted, static, oracle)]
+        rows.append({
+            'subblocks': subblocks,
+            'soft_slots': soft_slots,
+            'entries': entries,
+            'scope': scope,
+            'key': key,
+            'tagged': int(tagged),
+            'soft_latency': soft_latency,
+            'hard_latency': hard_latency,
+            'silent_latency': silent_latency,
+            'writes': writes,
+            'table_hit_rate': hit.mean() if writes else 0.0,
+            'soft_coverage':
+                (predicted.in_soft & predicted.nonsilent).sum() / nonsilent,
+            'static_coverage':
+                (static.in_soft & static.nonsilent).sum() / nonsilent,
+            'oracle_coverage':
+                (oracle.in_soft & oracle.nonsilent).sum() / nonsilent,
+            'mean_latency': lat[0],
+            'static_mean_latency': lat[1],
+            'oracle_mean_latency': lat[2],
+            'speedup': lat[1] / lat[0] if lat[0] else 1.0,
+        })
+    return rows
+
+_sim_cache = {}
+
+def _init_worker(trace):
+    global _trace
+    _trace = trace
+
+def int_list(value):
+    return [int(v) for v in value.split(',')]
+
+def float_list(value):
+    return [float(v) for v in value.split(',')]
+
+def str_list(value):
+    return value.split(',')
+
+def main():
+    global _trace
+
+    parser = argparse.ArgumentParser(
+        description="Replay an L2 write trace against MLC subblock "
+        "predictor configurations. List arguments are comma separated and "
+        "the cross product of all of them is evaluated.")
+    parser.add_argument("trace", help="protobuf write trace or .npz cache")
+    parser.add_argument("--entries", type=int_list, default=[512],
+                        help="predictor table entries")
+    parser.add_argument("--subblocks", type=int_list, default=[4],
+                        help="subblocks per cache block")
+    parser.add_argument("--soft-slots", type=int_list, default=None,
+                        help="subblocks held in soft bits "
+                        "(default: half of the subblocks)")
+    parser.add_argument("--scope", type=str_list, default=['frame'],
+                        help="write counters per cache 'frame' (like "
+                        "CacheMemory) or per 'line' address")
+    parser.add_argument("--key", type=str_list, default=['addr'],
+                        help="hash the block 'addr' twice like CacheMemory "
+                        "does today, or the 'pc' recorded in the trace")
+    parser.add_argument("--tagged", action="store_true",
+                        help="also evaluate tagged tables that only hit "
+                        "on an exact key match")
+    parser.add_argument("--soft-latency", type=float_list, default=[1.0],
+                        help="latency of a write that only touches soft bits")
+    parser.add_argument("--hard-latency", type=float_list, default=[2.0],
+                        help="latency of a (two-step) write that touches "
+                        "hard bits")
+    parser.add_argument("--silent-latency", type=float_list, default=[0.0],
+                        help="latency of a write that changed no data")
+    parser.add_argument("-j", "--jobs", type=int, default=1,
+                        help="number of worker processes")
+    parser.add_argument("--no-cache", action="store_true",
+                        help="do not read or write the .npz trace cache")
+    parser.add_argument("-o", "--output", default=None,
+                        help="CSV output file (default: stdout)")
+    args = parser.parse_args()
+
+    _trace = load_trace(args.trace, not args.no_cache)
+
+    latencies = list(itertools.product(args.soft_latency, args.hard_latency,
+                                       args.silent_latency))
+    configs = []
+    for subblocks in args.subblocks:
+        slots = args.soft_slots or [max(subblocks // 2, 1)]
+        for soft_slots, entries, scope, key, tagged in itertools.product(
+                slots, args.entries, args.scope, args.key,
+                [False, True] if args.tagged else [False]):
+            if soft_slots > subblocks:
+                continue
+            configs.append((subblocks, soft_slots, entries, scope, key,
+                            tagged, latencies))
+
+    # Configurations sharing a subblock count reuse the same intermediate
+    # results, so keep them together when splitting the work
+    if args.jobs > 1:
+        pool = multiprocessing.Pool(args.jobs, _init_worker, (_trace,))
+        results = pool.map(evaluate, configs,
+                           chunksize=max(len(configs) // (4 * args.jobs), 1))
+        pool.close()
+        pool.join()
+    else:
+        results = [evaluate(config) for config in configs]
+
+    fields = ['subblocks', 'soft_slots', 'entries', 'scope', 'key', 'tagged',
+              'soft_latency', 'hard_latency', 'silent_latency', 'writes',
+              'table_hit_rate', 'soft_coverage', 'static_coverage',
+              'oracle_coverage', 'mean_latency', 'static_mean_latency',
+              'oracle_mean_latency', 'speedup']
+    out = open(args.output, 'w') if args.output else sys.stdout
+    writer = csv.DictWriter(out, fieldnames=fields)
+    writer.writeheader()
+    for rows in results:
+        writer.writerows(rows)
+    if args.output:
+        out.close()
+
+if __name__ == "__main__":
+    main()
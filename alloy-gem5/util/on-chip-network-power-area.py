@@ -25,35 +25,43 @@
 # OF THIS SOFTWARE, EVEN IF ADVISED OF THE POSSIBILITY OF SUCH DAMAGE.
 
 
+from __future__ import print_function
+
 from ConfigParser import ConfigParser
 import string, sys, subprocess, os
+import argparse, csv, hashlib, json, multiprocessing
+
+dsent = None
 
 # Compile DSENT to generate the Python module and then import it.
 # This script assumes it is executed from the gem5 root.
-print("Attempting compilation")
-from subprocess import call
+def buildDsent():
+    global dsent
 
-src_dir = 'ext/dsent'
-build_dir = 'build/ext/dsent'
+    print("Attempting compilation")
+    from subprocess import call
 
-if not os.path.exists(build_dir):
-    os.makedirs(build_dir)
-os.chdir(build_dir)
+    src_dir = 'ext/dsent'
+    build_dir = 'build/ext/dsent'
 
-error = call(['cmake', '../../../%s' % src_dir])
-if error:
-    print("Failed to run cmake")
-    exit(-1)
+    if not os.path.exists(build_dir):
+        os.makedirs(build_dir)
+    os.chdir(build_dir)
+
+    error = call(['cmake', '../../../%s' % src_dir])
+    if error:
+        print("Failed to run cmake")
+        exit(-1)
 
-error = call(['make'])
-if error:
-    print("Failed to run make")
-    exit(-1)
+    error = call(['make'])
+    if error:
+        print("Failed to run make")
+        exit(-1)
 
-print("Compiled dsent")
-os.chdir("../../../")
-sys.path.append("build/ext/dsent")
-import dsent
+    print("Compiled dsent")
+    os.chdir("../../../")
+    sys.path.append("build/ext/dsent")
+    import dsent
 
 # Parse gem5 config.ini file for the configuration parameters related to
 # the on-chip network.
@@ -193,14 +201,206 @@ def parseStats(stats_file, config, router_config_file, link_config_file,
     # Finalize DSENT
     dsent.finalize()
 
+#------------------------------------------------------------------------------
+# Batch mode
+#------------------------------------------------------------------------------
+# Evaluates the networks of many simulation directories. Every run is
+# reduced to the DSENT inputs of its routers and links, identical inputs are
+# evaluated only once (and remembered across invocations in --cache), and
+# the unique evaluations are spread over a process pool. The result is one
+# CSV row per run with the summed router and link outputs of DSENT.
+
+def linkSections(link, config):
+    """The uni-directional forward links of a network link"""
+    names = [ "nls0", "nls1",                      # garnet
+              "network_link",                      # garnet2.0 int links
+              "network_links0", "network_links1" ] # garnet2.0 ext links
+    return [ "%s.%s" % (link, n) for n in names
+             if config.has_section("%s.%s" % (link, n)) ]
+
+def parseRun(sim_dir):
+    """Returns the DSENT inputs of the routers and links of one run"""
+    config = ConfigParser()
+    if not config.read(os.path.join(sim_dir, "config.ini")):
+        return sim_dir, None, "config.ini not found"
+
+    net = "system.ruby.network"
+    if not config.has_section(net) or \
+       not config.get(net, "type").startswith("GarnetNetwork"):
+        return sim_dir, None, "no garnet network"
+
+    vnets = config.getint(net, "number_of_virtual_networks")
+    vcs_per_vnet = config.getint(net, "vcs_per_vnet")
+    buffers_per_data_vc = config.getint(net, "buffers_per_data_vc")
+    flit_bits = 8 * config.getint(net, "ni_flit_size")
+
+    routers = config.get(net, "routers").split()
+    int_links = config.get(net, "int_links").split()
+    ext_links = config.get(net, "ext_links").split()
+
+    in_ports = dict((r, 0) for r in routers)
+    out_ports = dict((r, 0) for r in routers)
+    for link in int_links:
+        if config.has_option(link, "src_node"):
+            # garnet2.0 internal links are uni-directional
+            out_ports[config.get(link, "src_node")] += 1
+            in_ports[config.get(link, "dst_node")] += 1
+        else:
+            for node in (config.get(link, "node_a"),
+                         config.get(link, "node_b")):
+                in_ports[node] += 1
+                out_ports[node] += 1
+    for link in ext_links:
+        router = config.get(link, "int_node")
+        in_ports[router] += 1
+        out_ports[router] += 1
+
+    router_keys = [ (getClock(r, config), in_ports[r], out_ports[r], vnets,
+                     vcs_per_vnet, buffers_per_data_vc, flit_bits)
+                    for r in routers ]
+    link_keys = [ getClock(section, config)
+                  for link in int_links + ext_links
+                  for section in linkSections(link, config) ]
+
+    sim_seconds = None
+    stats_file = os.path.join(sim_dir, "stats.txt")
+    if os.path.isfile(stats_file):
+        with open(stats_file) as f:
+            for line in f:
+                if line.startswith("sim_seconds"):
+                    sim_seconds = float(line.split()[1])
+                    break
+
+    return sim_dir, (sim_seconds, router_keys, link_keys), None
+
+def initWorker(config_file):
+    dsent.initialize(config_file)
+
+def evalRouter(key):
+    return key, dict(dsent.computeRouterPowerAndArea(*key))
+
+def evalLink(frequency):
+    return frequency, dict(dsent.computeLinkPower(frequency))
+
+def evaluate(func, keys, config_file, jobs):
+    """Evaluates the keys with DSENT initialized with config_file"""
+    if not keys:
+        return {}
+    if jobs == 1:
+        initWorker(config_file)
+        results = dict(map(func, keys))
+        dsent.finalize()
+        return results
+
+    # DSENT keeps one global model, so every worker holds its own
+    pool = multiprocessing.Pool(jobs, initWorker, (config_file,))
+    results = dict(pool.map(func, keys, chunksize=1))
+    pool.close()
+    pool.join()
+    return results
+
+def fileHash(path):
+    with open(path, 'rb') as f:
+        return hashlib.sha1(f.read()).hexdigest()
+
+def batchMain(argv):
+    parser = argparse.ArgumentParser(
+        prog="%s batch" % sys.argv[0],
+        description="Network power and area of many simulation directories")
+    parser.add_argument("router_config", help="DSENT router config file")
+    parser.add_argument("link_config", help="DSENT link config file")
+    parser.add_argument("sim_dirs", nargs="+",
+                        help="simulation directories with config.ini and "
+                             "stats.txt")
+    parser.add_argument("-o", "--output", default="network-power-area.csv",
+                        help="output CSV file")
+    parser.add_argument("-j", "--jobs", type=int,
+                        default=multiprocessing.cpu_count(),
+                        help="worker processes")
+    parser.add_argument("--cache", default="",
+                        help="JSON file to remember DSENT results in")
+    args = parser.parse_args(argv)
+
+    # Parse all the runs
+    pool = multiprocessing.Pool(args.jobs)
+    runs = pool.map(parseRun, args.sim_dirs, chunksize=1)
+    pool.close()
+    pool.join()
+
+    for (sim_dir, run, error) in runs:
+        if error:
+            print("Skipping %s: %s" % (sim_dir, error))
+    runs = [ (sim_dir, run) for (sim_dir, run, error) in runs if run ]
+
+    # Results are only valid for the DSENT config they were computed with
+    router_tag = fileHash(args.router_config)
+    link_tag = fileHash(args.link_config)
+    cache = {}
+    if args.cache and os.path.isfile(args.cache):
+        with open(args.cache) as f:
+            cache = json.load(f)
+
+    def cached(tag, key):
+        return cache.get("%s %s" % (tag, json.dumps(key)))
+
+    router_keys = set(k for (_, run) in runs for k in run[1]
+                      if cached(router_tag, k) is None)
+    link_keys = set(k for (_, run) in runs for k in run[2]
+                    if cached(link_tag, k) is None)
+    print("%d runs, %d router and %d link evaluations" %
+          (len(runs), len(router_keys), len(link_keys)))
+
+    buildDsent()
+    for (key, outputs) in evaluate(evalRouter, sorted(router_keys),
+                                   args.router_config, args.jobs).items():
+        cache["%s %s" % (router_tag, json.dumps(key))] = outputs
+    for (key, outputs) in evaluate(evalLink, sorted(link_keys),
+                                   args.link_config, args.jobs).items():
+        cache["%s %s" % (link_tag, json.dumps(key))] = outputs
+
+    if args.cache:
+        with open(args.cache, "w") as f:
+            json.dump(cache, f)
+
+    # Sum the outputs of all routers and links of every run
+    rows = []
+    columns = set()
+    for (sim_dir, (sim_seconds, routers, links)) in runs:
+        row = { "run": sim_dir, "sim_seconds": sim_seconds,
+                "routers": len(routers), "links": len(links) }
+        for (kind, tag, keys) in (("router", router_tag, routers),
+                                  ("link", link_tag, links)):
+            for key in keys:
+                for (name, value) in cached(tag, key).items():
+                    column = "%s %s" % (kind, name)
+                    row[column] = row.get(column, 0.0) + value
+                    columns.add(column)
+        rows.append(row)
+
+    fields = [ "run", "sim_seconds", "routers", "links" ] + sorted(columns)
+    with open(args.output, "w") as f:
+        writer = csv.DictWriter(f, fields)
+        writer.writeheader()
+        writer.writerows(rows)
+    print("Wrote %s" % args.output)
+
 # This script parses the config.ini and the stats.txt from a run and
 # generates the power and the area of the on-chip network using DSENT
 def main():
+    if len(sys.argv) > 1 and sys.argv[1] == "batch":
+        batchMain(sys.argv[2:])
+        return
+
     if len(sys.argv) != 5:
         print("Usage: ", sys.argv[0], " <gem5 root directory> " \
               "<simulation directory> <router config file> <link config file>")
+        print("       ", sys.argv[0], " batch [-j jobs] [-o csv] " \
+              "[--cache json] <router config file> <link config file> " \
+              "<simulation directories>...")
         exit(-1)
 
+    buildDsent()
+
     print("WARNING: configuration files for DSENT and McPAT are separate. " \
           "Changes made to one are not reflected in the other.")
 
@@ -49,14 +49,62 @@ except ImportError:
 import sys
 import re
 
+# Load the steps of one configuration from the table written by
+# util/dram-sweep.py, selected by column=value filters, and return the
+# stride sizes, the bank counts and the selected metric on their grid
+def load_table(mode, table_file, filters):
+    table = np.load(table_file)
+
+    sel = np.ones(len(table['banks']), dtype=bool)
+    for f in filters:
+        column, value = f.split('=')
+        if table[column].dtype.kind in 'SU':
+            sel &= table[column] == value
+        else:
+            sel &= table[column] == float(value)
+
+    grid = ('mem_type', 'ranks', 'rd_perc', 'addr_map', 'mode')
+    configs = set(zip(*[table[c][sel] for c in grid]))
+    if len(configs) != 1:
+        print "Select one of the configurations with column=value " \
+            "arguments:"
+        for config in sorted(configs):
+            print "  " + " ".join("%s=%s" % c for c in zip(grid, config))
+        exit(-1)
+
+    banks = table['banks'][sel]
+    strides = table['stride'][sel]
+    bus_util = table['bus_util'][sel]
+    peak_bw = table['peak_bw'][sel]
+    avg_pwr = table['avg_power'][sel]
+
+    if mode == 'u':
+        z = bus_util
+    elif mode == 'p':
+        z = avg_pwr
+    else:
+        # avg_pwr is in mW, peak_bw in MiByte/s, bus_util in percent
+        z = avg_pwr / (bus_util / 100.0 * peak_bw / 1000.0)
+
+    # scatter the steps onto the banks x strides grid, steps which were
+    # not simulated stay NaN
+    X = np.unique(strides)
+    Y = np.unique(banks)
+    Z = np.full((len(Y), len(X)), np.nan)
+    Z[np.searchsorted(Y, banks), np.searchsorted(X, strides)] = z
+
+    return X, Y, Z
+
 # Determine the parameters of the sweep from the simout output, and
 # then parse the stats and plot the 3D surface corresponding to the
 # different combinations of parallel banks, and stride size, as
-# generated by the config/dram/sweep.py script
+# generated by the config/dram/sweep.py script, or load them from
+# the table written by util/dram-sweep.py
 def main():
 
-    if len(sys.argv) != 3:
+    if len(sys.argv) < 3:
         print "Usage: ", sys.argv[0], "-u|p|e <simout directory>"
+        print "       ", sys.argv[0], "-u|p|e <sweep.npz> [column=value ...]"
         exit(-1)
 
     if len(sys.argv[1]) != 2 or sys.argv[1][0] != '-' or \
@@ -69,16 +117,25 @@ def main():
     # efficiency
     mode = sys.argv[1][1]
 
+    if sys.argv[2].endswith('.npz'):
+        X, Y, Z = load_table(mode, sys.argv[2], sys.argv[3:])
+    else:
+        X, Y, Z = parse_stats(mode, sys.argv[2])
+
+    plot(mode, X, Y, Z)
+
+# Parse the simout and stats of a single sweep.py run
+def parse_stats(mode, simout_dir):
     try:
-        stats = open(sys.argv[2] + '/stats.txt', 'r')
+        stats = open(simout_dir + '/stats.txt', 'r')
     except IOError:
-        print "Failed to open ", sys.argv[2] + '/stats.txt', " for reading"
+        print "Failed to open ", simout_dir + '/stats.txt', " for reading"
         exit(-1)
 
     try:
-        simout = open(sys.argv[2] + '/simout', 'r')
+        simout = open(simout_dir + '/simout', 'r')
     except IOError:
-        print "Failed to open ", sys.argv[2] + '/simout', " for reading"
+        print "Failed to open ", simout_dir + '/simout', " for reading"
         exit(-1)
 
     # Get the burst size, number of banks and the maximum stride from
@@ -157,16 +214,20 @@ def main():
         print "Unexpected number of data points in stats output"
         exit(-1)
 
-    fig = plt.figure()
-    ax = fig.gca(projection='3d')
     X = np.arange(burst_size, max_size + 1, burst_size)
     Y = np.arange(1, banks + 1, 1)
-    X, Y = np.meshgrid(X, Y)
 
     # the values in the util are banks major, so we see groups for each
     # stride size in order
     Z = np.array(zs)
 
+    return X, Y, Z
+
+def plot(mode, X, Y, Z):
+    fig = plt.figure()
+    ax = fig.gca(projection='3d')
+    X, Y = np.meshgrid(X, Y)
+
     surf = ax.plot_surface(X, Y, Z, rstride=1, cstride=1, cmap=cm.coolwarm,
                            linewidth=0, antialiased=False)
 
@@ -0,0 +1,264 @@
+#!/usr/bin/env python2.7
+
+# Simulator speed benchmarks. Runs a fixed matrix of short workloads,
+# records how fast gem5 simulated them in a history file and flags the
+# benchmarks which got slower than the previous runs on the same host.
+#
+# For every benchmark the median over --repeat runs of these metrics is
+# recorded:
+#
+#   host_inst_rate   simulated instructions per host second (higher is better)
+#   host_tick_rate   simulated ticks per host second (higher is better)
+#   host_mem_usage   peak host memory in bytes (lower is better)
+#   startup          wall time not spent simulating, i.e. building and
+#                    instantiating the config, in seconds (lower is better)
+#
+# A metric regressed if it is worse than the median of the last --window
+# runs of the same benchmark on the same host by more than --threshold or
+# by more than the spread of the current repeats, whichever is larger.
+# The script exits with 1 if any benchmark regressed.
+#
+# Example:
+#   util/sim-speed-bench.py --history ~/gem5-speed.json -n 3
+#   util/sim-speed-bench.py --only 'hello_se' --label my-branch
+
+from __future__ import print_function, division
+
+import argparse
+import json
+import os
+import re
+import shutil
+import socket
+import subprocess
+import sys
+import tempfile
+import time
+
+gem5_dir = os.path.abspath(os.path.join(os.path.dirname(__file__), '..'))
+
+# name, build, config script, config options. Paths are relative to the
+# gem5 directory.
+hello = 'tests/test-progs/hello/bin/riscv/linux/hello'
+benchmarks = [
+    ('hello_se-%s' % cpu, 'RISCV', 'configs/example/se.py',
+     ['--cpu-type=%s' % cpu, '--caches', '--cmd=' + hello])
+    for cpu in ('AtomicSimpleCPU', 'TimingSimpleCPU', 'IOCPU', 'DerivO3CPU')
+] + [
+    ('ruby_memtest-MESI_Two_Level', 'RISCV',
+     'configs/example/ruby_mem_test.py',
+     ['--num-cpus=4', '--maxloads=10000']),
+    ('garnet_synth_traffic', 'Garnet_standalone',
+     'configs/example/garnet_synth_traffic.py',
+     ['--network=garnet2.0', '--topology=Mesh_XY', '--num-cpus=16',
+      '--num-dirs=16', '--mesh-rows=4', '--sim-cycles=100000',
+      '--injectionrate=0.1']),
+    ('dram_sweep', 'RISCV', 'configs/dram/sweep.py',
+     ['--mem-type=DDR3_1600_8x8', '--mode=DRAM']),
+]
+
+# metric: True if higher is better
+metrics = {
+    'host_inst_rate' : True,
+    'host_tick_rate' : True,
+    'host_mem_usage' : False,
+    'startup'        : False,
+}
+
+def read_last_dump(stats_file):
+    """Returns {stat: value} of the last stats dump in a stats file"""
+    stats = {}
+    if not os.path.isfile(stats_file):
+        return stats
+    with open(stats_file) as f:
+        for line in f:
+            if line.startswith('---------- Begin'):
+                stats = {}
+                continue
+            l = line.split('#')[0].split()
+            if len(l) < 2:
+                continue
+            try:
+                stats[l[0]] = float(l[1])
+            except ValueError:
+                pass
+    return stats
+
+def median(values):
+    values = sorted(values)
+    n = len(values)
+    if n == 0:
+        return None
+    return (values[(n - 1) // 2] + values[n // 2]) / 2
+
+def run_once(gem5, config, config_args):
+    """Runs gem5 once, returns the metrics or None if the run failed"""
+    outdir = tempfile.mkdtemp(prefix='gem5bench')
+    try:
+        cmd = [gem5, '--outdir=' + outdir, '--redirect-stdout',
+               '--redirect-stderr', '--listener-mode=off',
+               '--dump-stats-at-exit',
+               os.path.join(gem5_dir, config)] + config_args
+        start = time.time()
+        returncode = subprocess.call(cmd, cwd=gem5_dir)
+        wall = time.time() - start
+
+        stats = read_last_dump(os.path.join(outdir, 'stats.txt'))
+        if returncode != 0 or 'host_seconds' not in stats:
+            return None
+
+        return {
+            'host_inst_rate' : stats.get('host_inst_rate', 0.0),
+            'host_tick_rate' : stats.get('host_tick_rate', 0.0),
+            'host_mem_usage' : stats.get('host_mem_usage', 0.0),
+            'startup'        : max(wall - stats['host_seconds'], 0.0),
+            'host_seconds'   : stats['host_seconds'],
+            'sim_insts'      : stats.get('sim_insts', 0.0),
+        }
+    finally:
+        shutil.rmtree(outdir, ignore_errors=True)
+
+def run_benchmark(args, name, build, config, config_args):
+    """Returns the median metrics and their spread over the repeats"""
+    gem5 = os.path.join(gem5_dir, 'build', build, 'gem5.' + args.variant)
+    if not os.path.isfile(gem5):
+        print('%s: skipped, %s is not built' % (name, gem5))
+        return None
+    if name.startswith('hello_se') and \
+            not os.path.isfile(os.path.join(gem5_dir, hello)):
+        print('%s: skipped, %s is missing' % (name, hello))
+        return None
+
+    runs = []
+    for i in range(args.repeat):
+        run = run_once(gem5, config, config_args)
+        if run is None:
+            print('%s: run %d failed' % (name, i))
+            return None
+        runs.append(run)
+
+    result = {}
+    spread = {}
+    for metric in runs[0]:
+        values = [run[metric] for run in runs]
+        result[metric] = median(values)
+        spread[metric] = (max(values) - min(values)) / result[metric] \
+                         if result[metric] else 0.0
+    return result, spread
+
+def git_label():
+    try:
+        with open(os.devnull, 'w') as devnull:
+            return subprocess.check_output(
+                ['git', 'describe', '--always', '--dirty'],
+                cwd=gem5_dir, stderr=devnull).strip()
+    except (OSError, subprocess.CalledProcessError):
+        return 'unknown'
+
+def load_history(path):
+    if not os.path.isfile(path):
+        return []
+    with open(path) as f:
+        return json.load(f)
+
+def save_history(path, history):
+    tmp = path + '.tmp'
+    with open(tmp, 'w') as f:
+        json.dump(history, f, indent=2, sort_keys=True)
+    os.rename(tmp, path)
+
+def baseline(history, host, name, metric, window):
+    """Median of the metric over the last window runs on this host"""
+    values = [entry['results'][name][metric] for entry in history
+              if entry['host'] == host and name in entry['results']
+              and entry['results'][name].get(metric)]
+    return median(values[-window:])
+
+def regressions(args, history, host, name, result, spread):
+    """Returns [(metric, baseline, value, change)] of the regressed metrics"""
+    found = []
+    for (metric, higher_is_better) in sorted(metrics.items()):
+        base = baseline(history, host, name, metric, args.window)
+        value = result[metric]
+        if not base or not value:
+            continue
+        change = (value - base) / base
+        worse = -change if higher_is_better else change
+        if worse > max(args.threshold, spread[metric]):
+            found.append((metric, base, value, change))
+    return found
+
+def main():
+    parser = argparse.ArgumentParser(
+        description='Benchmark the simulation speed of gem5')
+    parser.add_argument('--history', default='sim-speed-history.json',
+                        help='History file [default: %(default)s]')
+    parser.add_argument('-n', '--repeat', type=int, default=3,
+                        help='Runs per benchmark [default: %(default)s]')
+    parser.add_argument('--variant', default='opt',
+                        help='gem5 binary variant [default: %(default)s]')
+    parser.add_argument('--only', default=None,
+                        help='Only run the benchmarks matching this regex')
+    parser.add_argument('--label', default=None,
+                        help='Label of this run [default: git describe]')
+    parser.add_argument('--threshold', type=float, default=0.05,
+                        help='Relative change treated as noise '
+                             '[default: %(default)s]')
+    parser.add_argument('--window', type=int, default=5,
+                        help='Previous runs the baseline is taken from '
+                             '[default: %(default)s]')
+    parser.add_argument('--no-record', action='store_true',
+                        help='Compare only, do not add to the history')
+    parser.add_argument('-l', '--list', action='store_true',
+                        help='List the benchmarks and exit')
+    args = parser.parse_args()
+
+    selected = [b for b in benchmarks
+                if args.only is None or re.search(args.only, b[0])]
+    if args.list:
+        for (name, build, config, config_args) in selected:
+            print('%-32s build/%s %s %s' % (name, build, config,
+                                            ' '.join(config_args)))
+        return 0
+
+    host = socket.gethostname()
+    history = load_history(args.history)
+    entry = {
+        'label'   : args.label or git_label(),
+        'host'    : host,
+        'time'    : time.strftime('%Y-%m-%d %H:%M:%S'),
+        'results' : {},
+    }
+
+    print('%-32s %12s %14s %10s %9s' % ('benchmark', 'inst/s', 'tick/s',
+                                        'mem (MB)', 'startup'))
+    regressed = []
+    for (name, build, config, config_args) in selected:
+        measured = run_benchmark(args, name, build, config, config_args)
+        if measured is None:
+            continue
+        result, spread = measured
+        entry['results'][name] = result
+
+        print('%-32s %12.0f %14.0f %10.1f %8.2fs' %
+              (name, result['host_inst_rate'], result['host_tick_rate'],
+               result['host_mem_usage'] / (1 << 20), result['startup']))
+        for (metric, base, value, change) in \
+                regressions(args, history, host, name, result, spread):
+            print('  REGRESSION %s: %g -> %g (%+.1f%%)' %
+                  (metric, base, value, 100 * change))
+            regressed.append((name, metric))
+        sys.stdout.flush()
+
+    if entry['results'] and not args.no_record:
+        history.append(entry)
+        save_history(args.history, history)
+
+    if regressed:
+        print('%d regressions in %d benchmarks' %
+              (len(regressed), len(set(name for (name, m) in regressed))))
+        return 1
+    return 0
+
+if __name__ == '__main__':
+    sys.exit(main())
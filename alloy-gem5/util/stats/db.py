@@ -154,21 +154,28 @@ class Database(object):
         if run is None:
             return None
 
-        from info import ProxyError, scalar, vector, value, values, total, len
+        from info import ProxyError
         if system is None and hasattr(job, 'system'):
             system = job.system
 
         if system is not None:
             stat.system = self[system]
         try:
-            if scalar(stat):
-                return value(stat, run.run)
-            if vector(stat):
-                return values(stat, run.run)
+            return self.evaluator().value(stat, run.run)
         except ProxyError:
             return None
 
-        return None
+    def evaluator(self):
+        """The Evaluator of the selected runs, shared by all the stats
+        until the runs, ticks or method change"""
+        if self.__dict__.get('_evaluator') is None:
+            from info import Evaluator
+            if self.runs:
+                runs = self.runs
+            else:
+                runs = [ run.run for run in self.allRuns ]
+            self._evaluator = Evaluator(runs)
+        return self._evaluator
 
     def query(self, sql):
         self.cursor.execute(sql)
@@ -392,6 +399,8 @@ class Database(object):
 
     def __setattr__(self, attr, value):
         super(Database, self).__setattr__(attr, value)
+        if attr in ('runs', 'ticks', 'method'):
+            self.__dict__.pop('_evaluator', None)
         if attr != 'method':
             return
 
@@ -29,6 +29,8 @@
 from __future__ import division
 import operator, re, types
 
+import numpy
+
 class ProxyError(Exception):
     pass
 
@@ -69,6 +71,57 @@ def len(stat):
     stat = unproxy(stat)
     return stat.__len__()
 
+class Evaluator(object):
+    """Evaluate stats and formulas for a set of runs at once.
+
+    Every node of an expression tree is evaluated to a numpy array with
+    one row per run: shape (runs,) for scalars and (runs, len) for
+    vectors.  Missing values and divisions by zero are NaN.  The result
+    of every node whose value cannot change, i.e. that is not reached
+    through a Proxy, is remembered, so stats and subexpressions shared by
+    several formulas are only evaluated once per run set."""
+
+    def __init__(self, runs):
+        self.runs = list(runs)
+        self.index = dict((run, i) for i,run in enumerate(self.runs))
+        self.memo = {}
+
+    def __call__(self, stat):
+        return self.evaluate(stat)[0]
+
+    def evaluate(self, stat):
+        """Returns the array of stat and whether it may be remembered"""
+        if isinstance(stat, Proxy):
+            # a proxy may resolve to a different stat next time
+            result, pure = self.evaluate(unproxy(stat))
+            return result, False
+
+        key = id(stat)
+        if key in self.memo:
+            return self.memo[key][1], True
+
+        result, pure = stat.__evaluate__(self)
+        if pure:
+            # keep the stat alive so that its id is not reused
+            self.memo[key] = (stat, result)
+        return result, pure
+
+    def value(self, stat, run):
+        """The value(s) of stat in run like value() or values(), None if
+        any is missing"""
+        if run not in self.index:
+            return None
+        row = self(stat)[self.index[run]]
+        if numpy.isnan(row).any():
+            return None
+        if numpy.ndim(row) == 0:
+            return float(row)
+        return row.tolist()
+
+def division(op):
+    return op in (operator.__div__, operator.__truediv__,
+                  operator.__floordiv__)
+
 class Value(object):
     def __scalar__(self):
         raise AttributeError, "must define __scalar__ for %s" % (type (self))
@@ -132,6 +185,10 @@ class VectorItemProxy(Value):
     def __value__(self, run):
         return value(self.proxy, run, self.index)
 
+    def __evaluate__(self, evaluator):
+        result, pure = evaluator.evaluate(self.proxy)
+        return result[:, self.index], pure
+
 class Vector(Value):
     def __scalar__(self):
         return False
@@ -150,6 +207,8 @@ class ScalarConstant(Scalar):
         self.constant = constant
     def __value__(self, run):
         return self.constant
+    def __evaluate__(self, evaluator):
+        return numpy.repeat(float(self.constant), len(evaluator.runs)), True
     def __str__(self):
         return str(self.constant)
 
@@ -158,6 +217,9 @@ class VectorConstant(Vector):
         self.constant = constant
     def __value__(self, run, index):
         return self.constant[index]
+    def __evaluate__(self, evaluator):
+        row = numpy.array(self.constant, dtype=float)
+        return numpy.tile(row, (len(evaluator.runs), 1)), True
     def __len__(self):
         return len(self.constant)
     def __str__(self):
@@ -233,6 +295,10 @@ class UnaryProxy(ValueProxy):
     def __vectorlen__(self):
         return len(unproxy(self.arg))
 
+    def __evaluate__(self, evaluator):
+        val, pure = evaluator.evaluate(self.arg)
+        return self.op(val), pure
+
     def __str__(self):
         if self.op == operator.__neg__:
             return '-%s' % str(self.arg)
@@ -297,6 +363,26 @@ class BinaryProxy(ValueProxy):
 
         return len0
 
+    def __evaluate__(self, evaluator):
+        val0, pure0 = evaluator.evaluate(self.arg0)
+        val1, pure1 = evaluator.evaluate(self.arg1)
+
+        # a scalar applies to every element of a vector
+        if val0.ndim < val1.ndim:
+            val0 = val0[:, numpy.newaxis]
+        elif val1.ndim < val0.ndim:
+            val1 = val1[:, numpy.newaxis]
+        elif val0.shape != val1.shape:
+            raise AttributeError, \
+                  "vectors of different lengths %d != %d" % \
+                  (val0.shape[1], val1.shape[1])
+
+        with numpy.errstate(divide='ignore', invalid='ignore'):
+            result = self.op(val0, val1)
+        if division(self.op):
+            result = numpy.where(val1 == 0, numpy.nan, result)
+        return result, pure0 and pure1
+
     def __str__(self):
         ops = { operator.__add__ : '+',
                 operator.__sub__ : '-',
@@ -373,6 +459,11 @@ class ScalarStat(Statistic,Scalar):
             return None
         return self.data[run][0][0]
 
+    def __evaluate__(self, evaluator):
+        data = self.data
+        return numpy.array([ data[run][0][0] if run in data else numpy.nan
+                             for run in evaluator.runs ], dtype=float), True
+
     def display(self, run=None):
         import display
         p = display.Print()
@@ -390,6 +481,15 @@ class VectorStat(Statistic,Vector):
             return None
         return self.data[run][item][0]
 
+    def __evaluate__(self, evaluator):
+        data = self.data
+        result = numpy.empty((len(evaluator.runs), self.x))
+        result.fill(numpy.nan)
+        for i,run in enumerate(evaluator.runs):
+            if run in data:
+                result[i] = [ item[0] for item in data[run] ]
+        return result, True
+
     def __len__(self):
         return self.x
 
@@ -405,12 +505,17 @@ class VectorStat(Statistic,Vector):
 
 class Formula(Value):
     def __getattribute__(self, attr):
-        if attr not in ( '__scalar__', '__vector__', '__value__', '__len__' ):
+        if attr not in ( '__scalar__', '__vector__', '__value__', '__len__',
+                         '__evaluate__' ):
             return super(Formula, self).__getattribute__(attr)
 
-        formula = re.sub(':', '__', self.formula)
-        value = eval(formula, self.source.stattop)
-        return getattr(value, attr)
+        # the formula only refers to the stats of its source, so it is
+        # parsed once
+        d = super(Formula, self).__getattribute__('__dict__')
+        if '_expr' not in d:
+            formula = re.sub(':', '__', self.formula)
+            d['_expr'] = eval(formula, self.source.stattop)
+        return getattr(d['_expr'], attr)
 
     def __str__(self):
         return self.name